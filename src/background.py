@@ -0,0 +1,170 @@
+import numpy as np
+import fitz  # PyMuPDF
+
+from src.utils.metrics import metrics
+
+
+def page_pixels(page: fitz.Page, dpi: int = 72) -> np.ndarray:
+    """
+    Render a page once and view its samples as an (height, width, 3) uint8 array.
+    """
+    zoom = dpi / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    rows = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return rows[:, : pix.width * pix.n].reshape(pix.height, pix.width, pix.n)[..., :3]
+
+
+def _ring_pixels(pixels: np.ndarray, bbox: tuple, zoom: float, ring: int):
+    """
+    Return the pixels of a `ring`-pixel-wide border just outside `bbox`.
+    """
+    height, width = pixels.shape[:2]
+    x0, y0, x1, y1 = bbox
+    left = max(int(x0 * zoom) - ring, 0)
+    top = max(int(y0 * zoom) - ring, 0)
+    right = min(int(np.ceil(x1 * zoom)) + ring, width)
+    bottom = min(int(np.ceil(y1 * zoom)) + ring, height)
+    if right <= left or bottom <= top:
+        return pixels[:0, :0].reshape(0, 3)
+
+    region = pixels[top:bottom, left:right]
+    inner = ring if min(region.shape[:2]) > 2 * ring else 0
+    if not inner:
+        return region.reshape(-1, 3)
+    return np.concatenate(
+        [
+            region[:inner].reshape(-1, 3),
+            region[-inner:].reshape(-1, 3),
+            region[inner:-inner, :inner].reshape(-1, 3),
+            region[inner:-inner, -inner:].reshape(-1, 3),
+        ]
+    )
+
+
+def estimate_background_colors(
+    page: fitz.Page,
+    bboxes: list,
+    dpi: int = 72,
+    ring: int = 2,
+    tolerance: int = 8,
+    pixels: np.ndarray = None,
+) -> list:
+    """
+    Estimate the background color behind every bbox of a page in one pass.
+
+    The page is rendered once. For each bbox, the ring of pixels just
+    outside it is collected, colors are bucketed by `tolerance` so
+    anti-aliasing and gentle gradients vote together, and the mean color
+    of the most populated bucket is returned as an (R, G, B) tuple of ints.
+    Histograms for all blocks are computed together with one `np.unique`.
+
+    Args:
+        page (fitz.Page): Page to sample; must not carry the fills yet.
+        bboxes (list): Block bounding boxes in PDF points.
+        dpi (int): Resolution of the single page render.
+        ring (int): Width of the sampled border, in pixels.
+        tolerance (int): Size of a color bucket per channel, at least 1.
+        pixels (np.ndarray): Pre-rendered page pixels, to skip rendering.
+    """
+    if tolerance < 1:
+        raise ValueError(f"tolerance must be at least 1, got {tolerance}")
+    if not bboxes:
+        return []
+    if pixels is None:
+        with metrics.timer("background_page_render"):
+            pixels = page_pixels(page, dpi)
+    zoom = dpi / 72
+
+    rings = [_ring_pixels(pixels, bbox, zoom, ring) for bbox in bboxes]
+    block_ids = np.repeat(np.arange(len(rings)), [len(ring_px) for ring_px in rings])
+    samples = np.concatenate(rings).astype(np.int64)
+
+    # One histogram key per (block, color bucket)
+    buckets = samples // tolerance
+    keys = (block_ids << 24) | (buckets[:, 0] << 16) | (buckets[:, 1] << 8) | buckets[:, 2]
+    unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+    # Pick the most populated bucket of every block
+    key_blocks = unique_keys >> 24
+    order = np.lexsort((-counts, key_blocks))
+    blocks_present, first = np.unique(key_blocks[order], return_index=True)
+    modes = order[first]
+
+    # Average the real colors inside each winning bucket
+    sums = np.stack(
+        [np.bincount(inverse, weights=samples[:, channel]) for channel in range(3)],
+        axis=1,
+    )
+    means = np.rint(sums[modes] / counts[modes, None]).astype(int)
+
+    # Boxes entirely off-page have no samples; fall back to white
+    colors = [(255, 255, 255)] * len(bboxes)
+    for block_id, color in zip(blocks_present, means):
+        colors[block_id] = tuple(int(channel) for channel in color)
+    return colors
+
+
+def ring_uniformity(
+    pixels: np.ndarray,
+    bboxes: list,
+    colors: list,
+    zoom: float,
+    ring: int = 2,
+    tolerance: int = 8,
+) -> list:
+    """
+    Share of each bbox's border ring that lies within `tolerance` of its color.
+
+    A value close to 1 means a flat fill of that color will be invisible;
+    photos, gradients and watermarks score lower.
+    """
+    shares = []
+    for bbox, color in zip(bboxes, colors):
+        ring_px = _ring_pixels(pixels, bbox, zoom, ring)
+        if not len(ring_px):
+            shares.append(1.0)
+            continue
+        distance = np.abs(ring_px.astype(np.int16) - np.array(color, dtype=np.int16))
+        shares.append(float(np.mean(distance.max(axis=1) <= tolerance)))
+    return shares
+
+
+if __name__ == "__main__":
+    # Benchmark against the per-block corner vote of Redactor
+    # python -m src.background [input.pdf]; defaults to a synthetic PDF
+    import os
+    import sys
+    import tempfile
+    import time
+
+    from src.redact_text import Redactor
+    from src.text_extraction import TextExtractor
+    from src.utils.synthetic_pdf import make_synthetic_pdf
+
+    if len(sys.argv) > 1:
+        pdf_path = sys.argv[1]
+    else:
+        pdf_path = make_synthetic_pdf(
+            os.path.join(tempfile.gettempdir(), "synthetic.pdf"), pages=2
+        )
+    pdf_info = TextExtractor(pdf_path).extract_text()
+    doc = fitz.open(pdf_path)
+    block_count = sum(len(page_info) for page_info in pdf_info.values())
+    redactor = Redactor(background="corners")
+
+    start = time.perf_counter()
+    for page_info in pdf_info.values():
+        for block in page_info:
+            redactor._get_background_color(block["image"])
+    corners_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for page_num, page_info in pdf_info.items():
+        estimate_background_colors(
+            doc.load_page(page_num), [block["bbox"] for block in page_info]
+        )
+    ring_time = time.perf_counter() - start
+
+    print(f"{block_count / len(pdf_info):.1f} blocks/page")
+    print(f"corners: {corners_time * 1000 / block_count:.3f} ms/block")
+    print(f"ring   : {ring_time * 1000 / block_count:.3f} ms/block")
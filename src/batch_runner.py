@@ -0,0 +1,355 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+
+from src.utils.config_utils import get_config
+from src.utils.file_utils import write_json
+from src.utils.languages import language_name
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def count_pages(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+def load_jobs(source: str, output_dir: str = None, suffix: str = "_translated") -> list:
+    """
+    Read translation jobs from a directory of PDFs or a manifest file.
+
+    A manifest is a JSON list (or `{"jobs": [...]}`) or JSON lines of
+    objects with at least "input"; "output", "source", "target" and the
+    other per-job options of `BatchRunner.run_job` are optional. Missing
+    outputs are named after the input with `suffix`, in `output_dir`.
+    """
+    if os.path.isdir(source):
+        jobs = [
+            {"input": os.path.join(source, name)}
+            for name in sorted(os.listdir(source))
+            if name.lower().endswith(".pdf")
+        ]
+    else:
+        with open(source, encoding="utf-8") as f:
+            if source.endswith(".jsonl"):
+                jobs = [json.loads(line) for line in f if line.strip()]
+            else:
+                jobs = json.load(f)
+        if isinstance(jobs, dict):
+            jobs = jobs["jobs"]
+
+    for job in jobs:
+        if not job.get("output"):
+            stem = os.path.splitext(os.path.basename(job["input"]))[0]
+            job["output"] = os.path.join(
+                output_dir or os.path.dirname(job["input"]), f"{stem}{suffix}.pdf"
+            )
+    return jobs
+
+
+class BatchRunner:
+    """
+    Translate many documents with shared workers, cache and rate limits.
+
+    Up to `max_documents` documents are in flight at once, each in its own
+    thread, so one document's translation requests overlap with another's
+    PDF work. The translator (and through it the API client and rate
+    limiter), the translation memory and the redactor are created once and
+    shared by every document; with `workers > 1` the page shards of all
+    documents go to one process pool. PyMuPDF stages of different documents
+    are serialized by a lock, since PyMuPDF is not thread-safe.
+
+    Args:
+        translator (str): Translator backend; defaults to the configured one.
+        source_language (str): Default source language code or name.
+        target_language (str): Default target language code or name.
+        backend (str): Render backend; defaults to `render.backend`.
+        font_path (str): Font for the translated text; defaults to `render.font_path`.
+        font_name (str): Name the font is registered under.
+        workers (int): Processes in the shared page pool; 1 runs pages in-thread.
+        max_documents (int): Documents processed concurrently.
+        checkpoint_dir (str): Resume interrupted documents from here.
+        use_layout_detection (bool): Defaults to the config.
+        use_ocr (bool): Defaults to the config.
+        stream (bool): Process documents a window of pages at a time.
+        window_size (int): Pages per window when streaming.
+        redactor (BaseRedactor): Shared redactor; flat fills by default.
+        write_manifest (bool): Save a run manifest next to each output, which
+            a later job can pass as "previous" to translate a revision
+            incrementally.
+    """
+
+    def __init__(
+        self,
+        translator: str = None,
+        source_language: str = "en",
+        target_language: str = "vi",
+        backend: str = None,
+        font_path: str = None,
+        font_name: str = None,
+        workers: int = 1,
+        max_documents: int = 2,
+        checkpoint_dir: str = None,
+        use_layout_detection: bool = None,
+        use_ocr: bool = None,
+        stream: bool = False,
+        window_size: int = 8,
+        redactor=None,
+        write_manifest: bool = True,
+    ):
+        self.translator_backend = translator
+        self.source_language = source_language
+        self.target_language = target_language
+        self.backend = backend or get_config("render", "backend", default="reportlab")
+        font_path = font_path or get_config(
+            "render", "font_path", default="font_family/Roboto-Regular.ttf"
+        )
+        self.font_path = (
+            font_path if os.path.isabs(font_path) else os.path.join(REPO_DIR, font_path)
+        )
+        self.font_name = font_name or get_config(
+            "render",
+            "font_name",
+            default=os.path.splitext(os.path.basename(font_path))[0],
+        )
+        self.workers = workers
+        self.max_documents = max_documents
+        self.checkpoint_dir = checkpoint_dir
+        self.use_layout_detection = use_layout_detection
+        self.use_ocr = use_ocr
+        self.stream = stream
+        self.window_size = window_size
+        self.redactor = redactor
+        self.write_manifest = write_manifest
+
+        self.pdf_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._translator = None
+        self._translation_memory = None
+        self._process_pool = None
+        self._document_pool = None
+        self.pages_done = 0
+        self.started_at = None
+
+    @classmethod
+    def from_config(cls, **overrides) -> "BatchRunner":
+        options = {
+            "workers": get_config("batch", "workers", default=1),
+            "max_documents": get_config("batch", "max_documents", default=2),
+            "checkpoint_dir": get_config("batch", "checkpoint_dir"),
+            "write_manifest": get_config("incremental", "write_manifest", default=True),
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def _shared(self) -> tuple:
+        # Created with the first document and kept for every later one
+        with self._state_lock:
+            if self._translator is None:
+                from src.redact_text import Redactor
+                from src.translation_memory import TranslationMemory
+                from src.translator import get_translator
+
+                self._translator = get_translator(self.translator_backend)
+                self._translation_memory = TranslationMemory.from_config()
+                self.redactor = self.redactor or Redactor()
+                if self.workers > 1:
+                    self._process_pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._translator, self._translation_memory
+
+    def pages_per_minute(self) -> float:
+        if not self.started_at:
+            return 0.0
+        elapsed = time.perf_counter() - self.started_at
+        return round(self.pages_done * 60 / elapsed, 1) if elapsed else 0.0
+
+    def run_job(self, job: dict) -> dict:
+        """
+        Translate one document; keys of `job` override the runner's defaults.
+
+        With "previous" (a run manifest path), the document is translated
+        incrementally against that earlier run; see `Pipeline.update`.
+
+        Returns the job's result record. Errors propagate to the caller.
+        """
+        from src.incremental import manifest_path_for
+        from src.pipeline import Pipeline
+
+        translator, translation_memory = self._shared()
+        input_path, output_path = job["input"], job["output"]
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        font_path = job.get("font_path", self.font_path)
+        font_name = job.get("font_name", self.font_name)
+        # The reportlab backend needs a redacted intermediate file
+        redacted_path = f"{os.path.splitext(output_path)[0]}.redacted.pdf"
+
+        start = time.perf_counter()
+        self.started_at = self.started_at or start
+        pipeline = Pipeline(
+            input_path,
+            redacted_path,
+            translator=translator,
+            translation_memory=translation_memory,
+            workers=job.get("workers", self.workers),
+            backend=job.get("backend", self.backend),
+            checkpoint_dir=job.get("checkpoint_dir", self.checkpoint_dir),
+            use_layout_detection=job.get("layout", self.use_layout_detection),
+            use_ocr=job.get("ocr", self.use_ocr),
+            redactor=self.redactor,
+            source_language=language_name(job.get("source") or self.source_language),
+            target_language=language_name(job.get("target") or self.target_language),
+            executor=self._process_pool,
+            pdf_lock=self.pdf_lock,
+        )
+        if job.get("previous"):
+            # A revision of an earlier job: only changed pages are redone
+            pipeline.update(job["previous"], font_path, font_name, output_path)
+            pages = len(pipeline.manifest.pages)
+        elif job.get("stream", self.stream):
+            pages = sum(
+                1
+                for _ in pipeline.stream(
+                    font_path,
+                    font_name,
+                    output_path,
+                    window_size=job.get("window_size", self.window_size),
+                )
+            )
+        else:
+            pdf_info, redacted_pdf_path = pipeline.invoke()
+            pipeline.draw_pdf(
+                pdf_info, redacted_pdf_path, font_path, font_name, output_path
+            )
+            pages = len(pdf_info)
+            if redacted_pdf_path == redacted_path and os.path.exists(redacted_path):
+                os.remove(redacted_path)
+
+        manifest_path = None
+        if self.write_manifest:
+            manifest_path = pipeline.manifest.save(manifest_path_for(output_path))
+
+        seconds = time.perf_counter() - start
+        with self._state_lock:
+            self.pages_done += pages
+        metrics.incr("batch_documents_done")
+        metrics.incr("batch_pages_done", pages)
+        return {
+            "input": input_path,
+            "output": output_path,
+            "status": "done",
+            "pages": pages,
+            "manifest": manifest_path,
+            "seconds": round(seconds, 3),
+            "pages_per_minute": round(pages * 60 / seconds, 1) if seconds else None,
+        }
+
+    def submit(self, job: dict, on_update=None) -> Future:
+        """
+        Queue `job` on the document pool; `on_update(job)` sees each status change.
+
+        The job dict itself is updated with "status" (running, done or
+        failed) and, when finished, its result or "error".
+        """
+        if self._document_pool is None:
+            self._document_pool = ThreadPoolExecutor(
+                max_workers=self.max_documents, thread_name_prefix="document"
+            )
+
+        def run():
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            if on_update:
+                on_update(job)
+            try:
+                job.update(self.run_job(job))
+            except Exception as error:
+                logger.exception(f"Translating {job['input']} failed")
+                metrics.incr("batch_documents_failed")
+                job.update(status="failed", error=f"{type(error).__name__}: {error}")
+            job["finished_at"] = time.time()
+            if on_update:
+                on_update(job)
+            return job
+
+        return self._document_pool.submit(run)
+
+    def run(self, jobs: list, manifest_path: str = None) -> dict:
+        """
+        Translate all `jobs`, smallest documents first, and return a summary.
+
+        Starting with the fewest pages gets most documents done early and
+        keeps one large file from holding up the rest. With `manifest_path`,
+        the status and result of every job is rewritten there as it changes.
+        """
+        for job in jobs:
+            job.setdefault("status", "pending")
+            if "pages" not in job:
+                try:
+                    job["pages"] = count_pages(job["input"])
+                except Exception as error:
+                    job.update(status="failed", error=f"{type(error).__name__}: {error}")
+        pending = sorted(
+            (job for job in jobs if job["status"] == "pending"), key=lambda job: job["pages"]
+        )
+        logger.info(
+            f"Translating {len(pending)} documents, {sum(job['pages'] for job in pending)} "
+            f"pages, {self.max_documents} at a time"
+        )
+
+        start = time.perf_counter()
+        manifest_lock = threading.Lock()
+
+        def summary() -> dict:
+            counts = {}
+            for job in jobs:
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            elapsed = time.perf_counter() - start
+            pages = sum(job.get("pages", 0) for job in jobs if job["status"] == "done")
+            return {
+                "documents": counts,
+                "pages_done": pages,
+                "seconds": round(elapsed, 3),
+                "pages_per_minute": round(pages * 60 / elapsed, 1) if elapsed else 0.0,
+            }
+
+        def on_update(job):
+            if manifest_path:
+                with manifest_lock:
+                    write_json(manifest_path, {"summary": summary(), "jobs": jobs})
+
+        on_update(None)
+        futures = [self.submit(job, on_update) for job in pending]
+        for future in futures:
+            future.result()
+        result = summary()
+        on_update(None)
+        logger.info(
+            f"Batch done: {result['documents']}, {result['pages_done']} pages "
+            f"at {result['pages_per_minute']} pages/min"
+        )
+        return result
+
+    def close(self):
+        if self._document_pool is not None:
+            self._document_pool.shutdown()
+            self._document_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+        if self._translation_memory is not None:
+            self._translation_memory.close()
+
+    def __enter__(self) -> "BatchRunner":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,381 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.utils.config_utils import get_config
+from src.utils.file_utils import write_json
+from src.utils.metrics import peak_rss_bytes
+from src.utils.synthetic_pdf import SyntheticSpec, make_synthetic_pdf
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BENCHMARK_DIR = os.path.join(REPO_DIR, "benchmarks")
+FONT_PATH = os.path.join(REPO_DIR, "font_family", "Roboto-Regular.ttf")
+
+SUITES = {
+    "quick": {
+        "text_20": SyntheticSpec(pages=20),
+        "two_columns_20": SyntheticSpec(pages=20, columns=2, blocks_per_page=16),
+        "scanned_10": SyntheticSpec(pages=10, scanned_ratio=0.5),
+    },
+    "full": {
+        "text_100": SyntheticSpec(pages=100),
+        "two_columns_100": SyntheticSpec(pages=100, columns=2, blocks_per_page=16),
+        "dense_50": SyntheticSpec(pages=50, columns=3, blocks_per_page=40),
+        "scanned_50": SyntheticSpec(pages=50, scanned_ratio=0.5),
+        "no_headers_100": SyntheticSpec(pages=100, repeated_header_ratio=0.0),
+        "report_300": SyntheticSpec(pages=300, blocks_per_page=10),
+    },
+}
+
+# Relative increase over the baseline that counts as a regression
+DEFAULT_TOLERANCES = {"seconds": 0.25, "peak_rss_mib": 0.2, "output_bytes": 0.05}
+# Below this, timings are mostly noise and are not gated
+MIN_GATED_SECONDS = 0.05
+
+
+def _measure(fn, output_path: str = None) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return result, {
+        "seconds": round(time.perf_counter() - start, 4),
+        # Peak of the whole process so far; stages run in order in a fresh one
+        "peak_rss_mib": round(peak_rss_bytes() / 2**20, 1),
+        "output_bytes": os.path.getsize(output_path) if output_path else None,
+    }
+
+
+def _make_pipeline(pdf_path: str, output_path: str, backend: str, use_ocr: bool, latency: float):
+    from src.pipeline import Pipeline
+    from src.translation_memory import TranslationMemory
+    from src.translator import StubTranslator
+
+    # No persistent translation memory: every run translates everything
+    return Pipeline(
+        pdf_path,
+        output_path,
+        translator=StubTranslator(latency=latency),
+        translation_memory=TranslationMemory(),
+        backend=backend,
+        use_layout_detection=False,
+        use_ocr=use_ocr,
+    )
+
+
+def run_stages(
+    pdf_path: str, work_dir: str, backend: str, use_ocr: bool = False, latency: float = 0.0
+) -> dict:
+    """
+    Time each stage on its own: extract, redact, translate and draw_pdf.
+    """
+    from src.batch_translation import BatchTranslationEngine
+    from src.redact_text import Redactor
+    from src.translator import StubTranslator
+
+    pipeline = _make_pipeline(
+        pdf_path, os.path.join(work_dir, "redacted.pdf"), backend, use_ocr, latency
+    )
+    stages = {}
+    pdf_info, stages["extract"] = _measure(pipeline.text_extractor.extract_text)
+
+    redacted_path = os.path.join(work_dir, "redacted.pdf")
+    _, stages["redact"] = _measure(
+        lambda: Redactor().redact(pdf_info, pdf_path, redacted_path), redacted_path
+    )
+
+    engine = BatchTranslationEngine(StubTranslator(latency=latency))
+    _, stages["translate"] = _measure(
+        lambda: engine.translate_pdf_info(pdf_info, "english", "vietnamese")
+    )
+    stages["translate"]["requests"] = engine.last_report.get("requests")
+
+    output_path = os.path.join(work_dir, "stages_output.pdf")
+    # The fitz backend redacts while drawing, on the original
+    source_path = pdf_path if backend == "fitz" else redacted_path
+    _, stages["draw_pdf"] = _measure(
+        lambda: pipeline.draw_pdf(pdf_info, source_path, FONT_PATH, "Roboto", output_path),
+        output_path,
+    )
+    return stages
+
+
+def run_end_to_end(
+    pdf_path: str, work_dir: str, backend: str, use_ocr: bool = False, latency: float = 0.0
+) -> dict:
+    """
+    Time `Pipeline.invoke` plus `Pipeline.draw_pdf`, as `pdf-translate` runs them.
+    """
+    output_path = os.path.join(work_dir, "output.pdf")
+    pipeline = _make_pipeline(
+        pdf_path, os.path.join(work_dir, "e2e_redacted.pdf"), backend, use_ocr, latency
+    )
+
+    def run():
+        pdf_info, redacted_pdf_path = pipeline.invoke()
+        pipeline.draw_pdf(pdf_info, redacted_pdf_path, FONT_PATH, "Roboto", output_path)
+        return len(pdf_info)
+
+    pages, result = _measure(run, output_path)
+    result["pages_per_minute"] = round(pages * 60 / result["seconds"], 1)
+    return result
+
+
+def _in_fresh_process(fn, *args):
+    # A new interpreter per measurement, so peak RSS is that run's alone
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(fn, *args).result()
+
+
+def _best(runs: list) -> dict:
+    """
+    Pick the fastest of repeated measurements of one stage.
+
+    All metrics come from that one run, so e.g. `pages_per_minute` matches
+    its `seconds`.
+    """
+    return dict(min(runs, key=lambda run: run["seconds"]))
+
+
+def run_suite(
+    suite: str,
+    backend: str,
+    repeat: int = 1,
+    scenarios: list = None,
+    work_dir: str = None,
+    use_ocr: bool = False,
+    latency: float = 0.0,
+) -> dict:
+    """
+    Run every scenario of `suite` and return one history record.
+    """
+    specs = {
+        name: spec
+        for name, spec in SUITES[suite].items()
+        if not scenarios or name in scenarios
+    }
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "suite": suite,
+        "backend": backend,
+        "repeat": repeat,
+        "translator_latency": latency,
+        "ocr": use_ocr,
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as tmp_dir:
+        work_dir = work_dir or tmp_dir
+        for name, spec in specs.items():
+            scenario_dir = os.path.join(work_dir, name)
+            os.makedirs(scenario_dir, exist_ok=True)
+            pdf_path = make_synthetic_pdf(os.path.join(scenario_dir, "input.pdf"), spec)
+            args = (pdf_path, scenario_dir, backend, use_ocr, latency)
+            stage_runs = [_in_fresh_process(run_stages, *args) for _ in range(repeat)]
+            end_to_end_runs = [_in_fresh_process(run_end_to_end, *args) for _ in range(repeat)]
+            record["scenarios"][name] = {
+                "spec": spec.to_dict(),
+                "input_bytes": os.path.getsize(pdf_path),
+                "stages": {
+                    stage: _best([run[stage] for run in stage_runs])
+                    for stage in stage_runs[0]
+                },
+                "end_to_end": _best(end_to_end_runs),
+            }
+            result = record["scenarios"][name]["end_to_end"]
+            print(
+                f"{name:18s} {result['seconds']:7.2f}s "
+                f"{result['pages_per_minute']:8.0f} pages/min "
+                f"{result['peak_rss_mib']:7.0f} MiB peak "
+                f"{result['output_bytes'] / 1024:8.0f} KiB out",
+                file=sys.stderr,
+            )
+    return record
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def append_history(path: str, record: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def baseline_key(record: dict) -> str:
+    return f"{record['suite']}/{record['backend']}"
+
+
+def load_baseline(path: str, record: dict) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get(baseline_key(record))
+
+
+def save_baseline(path: str, record: dict):
+    """
+    Store `record` as the baseline of its suite and backend in `path`.
+
+    Scenarios of the stored baseline that `record` did not run (e.g. with
+    --scenario) are kept, so they stay gated.
+    """
+    baselines = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            baselines = json.load(f)
+    previous = baselines.get(baseline_key(record))
+    if previous is not None:
+        record = {**record, "scenarios": {**previous["scenarios"], **record["scenarios"]}}
+    baselines[baseline_key(record)] = record
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    write_json(path, baselines)
+
+
+def compare(record: dict, baseline: dict, tolerances: dict = None) -> tuple:
+    """
+    Compare a run with its baseline; return (rows, regressions).
+
+    Each row is (scenario, stage, metric, baseline value, current value,
+    relative change). A row is a regression when the metric grew by more
+    than its tolerance; timings under MIN_GATED_SECONDS are not gated.
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    rows, regressions = [], []
+    for name, scenario in record["scenarios"].items():
+        base_scenario = baseline["scenarios"].get(name)
+        if base_scenario is None or base_scenario["spec"] != scenario["spec"]:
+            continue
+        measured = {**scenario["stages"], "end_to_end": scenario["end_to_end"]}
+        expected = {**base_scenario["stages"], "end_to_end": base_scenario["end_to_end"]}
+        for stage, values in measured.items():
+            for metric, tolerance in tolerances.items():
+                current = values.get(metric)
+                previous = expected.get(stage, {}).get(metric)
+                if current is None or not previous:
+                    continue
+                change = (current - previous) / previous
+                row = (name, stage, metric, previous, current, change)
+                rows.append(row)
+                if change > tolerance and not (
+                    metric == "seconds" and max(current, previous) < MIN_GATED_SECONDS
+                ):
+                    regressions.append(row)
+    return rows, regressions
+
+
+def format_rows(rows: list, regressions: list) -> str:
+    lines = [
+        f"{'scenario':18s} {'stage':10s} {'metric':13s} {'baseline':>12s} {'current':>12s} {'change':>8s}"
+    ]
+    for row in rows:
+        name, stage, metric, previous, current, change = row
+        flag = "  REGRESSION" if row in regressions else ""
+        lines.append(
+            f"{name:18s} {stage:10s} {metric:13s} {previous:12g} {current:12g} "
+            f"{change:+8.1%}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.benchmark",
+        description="Offline benchmarks on synthetic PDFs, with a regression gate.",
+    )
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument(
+        "--scenario", action="append", help="Run only this scenario (repeatable)"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("reportlab", "fitz"),
+        help="Render backend (default: render.backend)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, help="Runs per scenario; the best is kept (default: benchmark.repeat)"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds the fake translator sleeps per request",
+    )
+    parser.add_argument("--ocr", action="store_true", help="OCR the scanned pages")
+    parser.add_argument("--work-dir", help="Keep generated inputs and outputs here")
+    parser.add_argument(
+        "--history", default=os.path.join(BENCHMARK_DIR, "history.jsonl")
+    )
+    parser.add_argument("--no-history", action="store_true", help="Do not record this run")
+    parser.add_argument(
+        "--baseline", default=os.path.join(BENCHMARK_DIR, "baseline.json")
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store this run as the baseline of its suite and backend",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 if any metric regressed beyond its tolerance",
+    )
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    record = run_suite(
+        args.suite,
+        args.backend or get_config("render", "backend", default="reportlab"),
+        repeat=args.repeat or get_config("benchmark", "repeat", default=3),
+        scenarios=args.scenario,
+        work_dir=args.work_dir,
+        use_ocr=args.ocr,
+        latency=args.latency,
+    )
+    if not args.no_history:
+        append_history(args.history, record)
+
+    status = 0
+    baseline = load_baseline(args.baseline, record)
+    if baseline is None:
+        print(f"No baseline for {baseline_key(record)} in {args.baseline}", file=sys.stderr)
+    else:
+        tolerances = get_config("benchmark", "tolerance", default={})
+        rows, regressions = compare(record, baseline, tolerances)
+        print(format_rows(rows, regressions), file=sys.stderr)
+        if regressions:
+            print(
+                f"{len(regressions)} metrics regressed against the baseline "
+                f"from {baseline['timestamp']} ({baseline.get('commit')})",
+                file=sys.stderr,
+            )
+            status = 1 if args.check else 0
+    if args.update_baseline:
+        save_baseline(args.baseline, record)
+    print(json.dumps(record, ensure_ascii=False))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,659 @@
+import json
+import mmap
+import os
+from collections.abc import Mapping
+
+import numpy as np
+
+from src.text_extraction import BlockImage
+
+MAGIC = b"BLKTBL01"
+ALIGNMENT = 64
+
+# Fields kept in columns; anything else set on a block goes to `extras`
+COLUMNS = (
+    "block_num",
+    "text",
+    "bbox",
+    "font_size",
+    "font_color",
+    "font_family",
+    "translated_text",
+    "repeat_key",
+)
+
+
+class StringColumn:
+    """
+    Variable-length strings as one UTF-8 buffer plus row offsets.
+
+    Rows may be missing (None). Values set after construction are kept in
+    `overrides` until the column is packed again, so a memory-mapped
+    buffer is never written to.
+    """
+
+    __slots__ = ("data", "offsets", "valid", "overrides")
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, valid: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+        self.valid = valid
+        self.overrides = {}
+
+    @classmethod
+    def from_values(cls, values: list) -> "StringColumn":
+        encoded = [value.encode("utf-8") if value is not None else b"" for value in values]
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        valid = np.array([value is not None for value in values], dtype=np.bool_)
+        return cls(data, offsets, valid)
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def get(self, row: int) -> str | None:
+        if row in self.overrides:
+            return self.overrides[row]
+        if not self.valid[row]:
+            return None
+        return self.data[self.offsets[row] : self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def set(self, row: int, value: str | None):
+        self.overrides[row] = value
+
+    def values(self) -> list:
+        return [self.get(row) for row in range(len(self))]
+
+    def packed(self) -> "StringColumn":
+        return self if not self.overrides else StringColumn.from_values(self.values())
+
+    def take(self, rows: np.ndarray) -> "StringColumn":
+        return StringColumn.from_values([self.get(int(row)) for row in rows])
+
+
+class BlockTable:
+    """
+    Column store for the text blocks of a document.
+
+    One row per block, sorted by page: bboxes and font sizes are float64
+    arrays, colors packed uint32, and font families and repeat keys indices
+    into an interned string table. Text and translations are UTF-8 buffers
+    with offsets. Block images are not stored; they are lazy `BlockImage`
+    handles rebuilt from `pdf_path`, the page, the bbox and `dpi`.
+
+    A table pickles as a handful of arrays instead of one dict per block,
+    and `save`/`load` use an aligned binary layout whose columns are
+    memory-mapped without copying. `view()` gives the `pdf_info` mapping
+    that the extraction, translation, redaction and rendering stages use.
+    """
+
+    __slots__ = (
+        "pdf_path",
+        "dpi",
+        "pages",
+        "page_offsets",
+        "block_num",
+        "bbox",
+        "font_size",
+        "font_color",
+        "font_family",
+        "repeat_key",
+        "strings",
+        "text",
+        "translated_text",
+        "extras",
+        "_string_ids",
+        "_buffer",
+    )
+
+    def __init__(
+        self,
+        pdf_path: str,
+        dpi: int,
+        pages: np.ndarray,
+        page_offsets: np.ndarray,
+        block_num: np.ndarray,
+        bbox: np.ndarray,
+        font_size: np.ndarray,
+        font_color: np.ndarray,
+        font_family: np.ndarray,
+        repeat_key: np.ndarray,
+        strings: list,
+        text: StringColumn,
+        translated_text: StringColumn,
+        extras: dict = None,
+    ):
+        self.pdf_path = pdf_path
+        self.dpi = dpi
+        self.pages = pages
+        self.page_offsets = page_offsets
+        self.block_num = block_num
+        self.bbox = bbox
+        self.font_size = font_size
+        self.font_color = font_color
+        self.font_family = font_family
+        # Written by RepeatedElements; copied on first write if memory-mapped
+        self.repeat_key = repeat_key
+        self.strings = strings
+        self.text = text
+        self.translated_text = translated_text
+        # Rare per-block fields, {row: {key: value}}
+        self.extras = extras or {}
+        self._string_ids = {string: index for index, string in enumerate(strings)}
+        self._buffer = None
+
+    def __len__(self) -> int:
+        return len(self.block_num)
+
+    def __getstate__(self):
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if name not in ("_string_ids", "_buffer")
+        } | {
+            "text": self.text.packed(),
+            "translated_text": self.translated_text.packed(),
+        }
+
+    def __setstate__(self, state: dict):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self._string_ids = {string: index for index, string in enumerate(self.strings)}
+        self._buffer = None
+
+    def intern(self, string: str | None) -> int:
+        if string is None:
+            return -1
+        index = self._string_ids.get(string)
+        if index is None:
+            index = self._string_ids[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    @classmethod
+    def from_pdf_info(cls, pdf_info: dict, pdf_path: str = None, dpi: int = 300):
+        """
+        Build a table from a `pdf_info` dict of page number -> list of block dicts.
+        """
+        table = cls.empty(pdf_path, dpi)
+        pages = sorted(pdf_info)
+        rows = [block for page_num in pages for block in pdf_info[page_num]]
+        counts = [len(pdf_info[page_num]) for page_num in pages]
+
+        table.pages = np.array(pages, dtype=np.int32)
+        table.page_offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        np.cumsum(counts, out=table.page_offsets[1:])
+        table.block_num = np.array([block["block_num"] for block in rows], dtype=np.int32)
+        table.bbox = np.array(
+            [tuple(block["bbox"]) for block in rows], dtype=np.float64
+        ).reshape(-1, 4)
+        table.font_size = np.array([block["font_size"] for block in rows], dtype=np.float64)
+        table.font_color = np.array([block["font_color"] for block in rows], dtype=np.uint32)
+        table.font_family = np.array(
+            [table.intern(block["font_family"]) for block in rows], dtype=np.int32
+        )
+        table.repeat_key = np.array(
+            [table.intern(block.get("repeat_key")) for block in rows], dtype=np.int32
+        )
+        table.text = StringColumn.from_values([block["text"] for block in rows])
+        table.translated_text = StringColumn.from_values(
+            [block.get("translated_text") for block in rows]
+        )
+        for row, block in enumerate(rows):
+            extra = {
+                key: value
+                for key, value in block.items()
+                if key not in COLUMNS and key != "image"
+            }
+            if extra:
+                table.extras[row] = extra
+        return table
+
+    @classmethod
+    def empty(cls, pdf_path: str = None, dpi: int = 300) -> "BlockTable":
+        return cls(
+            pdf_path,
+            dpi,
+            pages=np.zeros(0, dtype=np.int32),
+            page_offsets=np.zeros(1, dtype=np.int64),
+            block_num=np.zeros(0, dtype=np.int32),
+            bbox=np.zeros((0, 4), dtype=np.float64),
+            font_size=np.zeros(0, dtype=np.float64),
+            font_color=np.zeros(0, dtype=np.uint32),
+            font_family=np.zeros(0, dtype=np.int32),
+            repeat_key=np.zeros(0, dtype=np.int32),
+            strings=[],
+            text=StringColumn.from_values([]),
+            translated_text=StringColumn.from_values([]),
+        )
+
+    @classmethod
+    def concat(cls, tables: list) -> "BlockTable":
+        """
+        Join tables of disjoint pages (e.g. shards from worker processes).
+        """
+        tables = sorted((table for table in tables if len(table.pages)), key=lambda t: t.pages[0])
+        if not tables:
+            return cls.empty()
+        result = cls.empty(tables[0].pdf_path, tables[0].dpi)
+
+        def remap(table: BlockTable, column: np.ndarray) -> np.ndarray:
+            # String indices are per table; re-intern into the joined table
+            lookup = np.array(
+                [result.intern(string) for string in table.strings] + [-1], dtype=np.int32
+            )
+            return lookup[column]
+
+        def join(name: str) -> np.ndarray:
+            return np.concatenate([getattr(table, name) for table in tables])
+
+        row_starts = np.cumsum([0] + [len(table) for table in tables])
+        result.pages = join("pages")
+        result.page_offsets = np.concatenate(
+            [table.page_offsets[:-1] + start for table, start in zip(tables, row_starts)]
+            + [row_starts[-1:]]
+        ).astype(np.int64)
+        for name in ("block_num", "bbox", "font_size", "font_color"):
+            setattr(result, name, join(name))
+        result.font_family = np.concatenate(
+            [remap(table, table.font_family) for table in tables]
+        )
+        result.repeat_key = np.concatenate([remap(table, table.repeat_key) for table in tables])
+        result.text = StringColumn.from_values(
+            [value for table in tables for value in table.text.values()]
+        )
+        result.translated_text = StringColumn.from_values(
+            [value for table in tables for value in table.translated_text.values()]
+        )
+        result.extras = {
+            int(start) + row: extra
+            for table, start in zip(tables, row_starts)
+            for row, extra in table.extras.items()
+        }
+        return result
+
+    def page_rows(self, page_num: int) -> range:
+        index = int(np.searchsorted(self.pages, page_num))
+        if index == len(self.pages) or self.pages[index] != page_num:
+            raise KeyError(page_num)
+        return range(int(self.page_offsets[index]), int(self.page_offsets[index + 1]))
+
+    def select_pages(self, page_nums) -> "BlockTable":
+        """
+        Return a new table with only the pages in `page_nums`, for shipping to a worker.
+        """
+        wanted = np.isin(self.pages, np.asarray(list(page_nums), dtype=np.int32))
+        pages = self.pages[wanted]
+        starts, stops = self.page_offsets[:-1][wanted], self.page_offsets[1:][wanted]
+        rows = np.concatenate(
+            [np.arange(start, stop) for start, stop in zip(starts, stops)]
+            or [np.zeros(0, dtype=np.int64)]
+        ).astype(np.int64)
+        page_offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        np.cumsum(stops - starts, out=page_offsets[1:])
+        extras = {
+            new_row: self.extras[int(row)]
+            for new_row, row in enumerate(rows)
+            if int(row) in self.extras
+        }
+        return BlockTable(
+            self.pdf_path,
+            self.dpi,
+            pages=pages,
+            page_offsets=page_offsets,
+            block_num=self.block_num[rows],
+            bbox=self.bbox[rows],
+            font_size=self.font_size[rows],
+            font_color=self.font_color[rows],
+            font_family=self.font_family[rows],
+            repeat_key=self.repeat_key[rows],
+            strings=list(self.strings),
+            text=self.text.take(rows),
+            translated_text=self.translated_text.take(rows),
+            extras=extras,
+        )
+
+    def block(self, row: int, with_image: bool = True) -> dict:
+        """
+        Materialize one row as the block dict the stages were written against.
+        """
+        page_index = int(np.searchsorted(self.page_offsets, row, side="right")) - 1
+        page_num = int(self.pages[page_index])
+        bbox = tuple(self.bbox[row].tolist())
+        block = {
+            "block_num": int(self.block_num[row]),
+            "text": self.text.get(row),
+            "bbox": bbox,
+            "font_size": float(self.font_size[row]),
+            "font_color": int(self.font_color[row]),
+            "font_family": self.strings[self.font_family[row]],
+        }
+        if with_image:
+            block["image"] = BlockImage(self.pdf_path, page_num, bbox, self.dpi)
+        translated_text = self.translated_text.get(row)
+        if translated_text is not None:
+            block["translated_text"] = translated_text
+        if self.repeat_key[row] >= 0:
+            block["repeat_key"] = self.strings[self.repeat_key[row]]
+        block.update(self.extras.get(row, {}))
+        return block
+
+    def to_pdf_info(self, with_images: bool = True) -> dict:
+        return {
+            int(page_num): [
+                self.block(row, with_images)
+                for row in range(int(self.page_offsets[index]), int(self.page_offsets[index + 1]))
+            ]
+            for index, page_num in enumerate(self.pages)
+        }
+
+    def view(self) -> "PdfInfoView":
+        return PdfInfoView(self)
+
+    def save(self, path: str):
+        """
+        Write the table in an aligned binary layout that `load` can memory-map.
+
+        Layout: magic, header length (uint64), JSON header, then each array
+        at a 64-byte-aligned offset recorded in the header.
+        """
+        text, translated_text = self.text.packed(), self.translated_text.packed()
+        arrays = {
+            "pages": self.pages,
+            "page_offsets": self.page_offsets,
+            "block_num": self.block_num,
+            "bbox": self.bbox,
+            "font_size": self.font_size,
+            "font_color": self.font_color,
+            "font_family": self.font_family,
+            "repeat_key": self.repeat_key,
+            "text.data": text.data,
+            "text.offsets": text.offsets,
+            "text.valid": text.valid,
+            "translated_text.data": translated_text.data,
+            "translated_text.offsets": translated_text.offsets,
+            "translated_text.valid": translated_text.valid,
+        }
+        header = {
+            "pdf_path": self.pdf_path,
+            "dpi": self.dpi,
+            "strings": self.strings,
+            "extras": {str(row): extra for row, extra in self.extras.items()},
+            "arrays": {},
+        }
+        # Offsets depend on the header size, which depends on the offsets
+        offset = 0
+        for name, array in arrays.items():
+            header["arrays"][name] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            }
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        data_start = -(-(len(MAGIC) + 8 + len(encoded)) // ALIGNMENT) * ALIGNMENT
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(encoded).to_bytes(8, "little"))
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.seek(data_start + header["arrays"][name]["offset"])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BlockTable":
+        """
+        Memory-map a table written by `save`; columns are views of the file.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a block table")
+        header_length = int.from_bytes(buffer[len(MAGIC) : len(MAGIC) + 8], "little")
+        header_start = len(MAGIC) + 8
+        header = json.loads(buffer[header_start : header_start + header_length])
+        data_start = -(-(header_start + header_length) // ALIGNMENT) * ALIGNMENT
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(
+                buffer, dtype=dtype, count=count, offset=data_start + spec["offset"]
+            ).reshape(spec["shape"])
+
+        table = cls(
+            header["pdf_path"],
+            header["dpi"],
+            pages=arrays["pages"],
+            page_offsets=arrays["page_offsets"],
+            block_num=arrays["block_num"],
+            bbox=arrays["bbox"],
+            font_size=arrays["font_size"],
+            font_color=arrays["font_color"],
+            font_family=arrays["font_family"],
+            repeat_key=arrays["repeat_key"],
+            strings=header["strings"],
+            text=StringColumn(
+                arrays["text.data"], arrays["text.offsets"], arrays["text.valid"]
+            ),
+            translated_text=StringColumn(
+                arrays["translated_text.data"],
+                arrays["translated_text.offsets"],
+                arrays["translated_text.valid"],
+            ),
+            extras={int(row): extra for row, extra in header["extras"].items()},
+        )
+        table._buffer = buffer
+        return table
+
+
+class BlockView:
+    """
+    Dict-like access to one row of a BlockTable.
+
+    Reads come from the columns; writes of `translated_text` and
+    `repeat_key` go back to them, and other keys to the table's extras.
+    """
+
+    __slots__ = ("table", "row", "page_num")
+
+    def __init__(self, table: BlockTable, row: int, page_num: int):
+        self.table = table
+        self.row = row
+        self.page_num = page_num
+
+    def __reduce__(self):
+        # Sent to other processes as a plain dict, not with the whole table
+        return dict, (self.to_dict(),)
+
+    def __getitem__(self, key: str):
+        table, row = self.table, self.row
+        if key == "block_num":
+            return int(table.block_num[row])
+        if key == "text":
+            return table.text.get(row)
+        if key == "bbox":
+            return tuple(table.bbox[row].tolist())
+        if key == "font_size":
+            return float(table.font_size[row])
+        if key == "font_color":
+            return int(table.font_color[row])
+        if key == "font_family":
+            return table.strings[table.font_family[row]]
+        if key == "image":
+            return BlockImage(table.pdf_path, self.page_num, self["bbox"], table.dpi)
+        if key == "translated_text":
+            value = table.translated_text.get(row)
+        elif key == "repeat_key":
+            index = table.repeat_key[row]
+            value = table.strings[index] if index >= 0 else None
+        else:
+            value = table.extras.get(row, {}).get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        table, row = self.table, self.row
+        if key == "translated_text":
+            table.translated_text.set(row, value)
+        elif key == "repeat_key":
+            if not table.repeat_key.flags.writeable:
+                table.repeat_key = table.repeat_key.copy()
+            table.repeat_key[row] = table.intern(value)
+        elif key in COLUMNS or key == "image":
+            raise KeyError(f"{key} is read-only in a block table")
+        else:
+            table.extras.setdefault(row, {})[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> list:
+        return [key for key in (*COLUMNS, "image") if key in self] + list(
+            self.table.extras.get(self.row, {})
+        )
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"BlockView({self.to_dict()!r})"
+
+
+class PdfInfoView(Mapping):
+    """
+    Read-mostly `pdf_info` mapping (page number -> list of blocks) over a BlockTable.
+    """
+
+    __slots__ = ("table",)
+
+    def __init__(self, table: BlockTable):
+        self.table = table
+
+    def __getitem__(self, page_num: int) -> list:
+        return [
+            BlockView(self.table, row, page_num)
+            for row in self.table.page_rows(page_num)
+        ]
+
+    def __iter__(self):
+        return (int(page_num) for page_num in self.table.pages)
+
+    def __len__(self) -> int:
+        return len(self.table.pages)
+
+    def __contains__(self, page_num) -> bool:
+        try:
+            self.table.page_rows(page_num)
+        except KeyError:
+            return False
+        return True
+
+    def select(self, page_nums) -> "PdfInfoView":
+        return self.table.select_pages(page_nums).view()
+
+
+if __name__ == "__main__":
+    # Memory, pickling and load cost of 1,000 pages as dicts vs. a block table
+    import pickle
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+
+    def measure(label: str, build):
+        tracemalloc.start()
+        start = time.perf_counter()
+        value = build()
+        elapsed = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{label:32s} {size / 2**20:8.1f} MiB {elapsed * 1000:8.1f} ms")
+        return value
+
+    if len(sys.argv) > 1:
+        from src.text_extraction import TextExtractor
+
+        pdf_path = sys.argv[1]
+        pdf_info = TextExtractor(pdf_path).extract_text()
+    else:
+        pdf_path = "synthetic.pdf"
+        fonts = ["Helvetica", "Helvetica-Bold", "Times-Roman", "ArialMT"]
+
+        def synthetic():
+            return {
+                page_num: [
+                    {
+                        "block_num": block_num + 1,
+                        "text": f"Block {block_num} of page {page_num}: "
+                        "consolidated statement of cash flows for the year\n" * 2,
+                        "bbox": (72.0, 60.0 + block_num * 18, 540.0, 74.0 + block_num * 18),
+                        "image": BlockImage(pdf_path, page_num, (72, 60, 540, 74), 300),
+                        "font_size": 10.5,
+                        "font_color": 0x1F1F1F,
+                        "font_family": str(fonts[block_num % len(fonts)]),
+                    }
+                    for block_num in range(40)
+                ]
+                for page_num in range(1000)
+            }
+
+        pdf_info = measure("pdf_info dicts", synthetic)
+    blocks = sum(len(page_info) for page_info in pdf_info.values())
+    print(f"{len(pdf_info)} pages, {blocks} blocks")
+
+    table = measure("block table", lambda: BlockTable.from_pdf_info(pdf_info, pdf_path))
+
+    for label, value in [("pdf_info", pdf_info), ("block table", table)]:
+        start = time.perf_counter()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        dumped = time.perf_counter() - start
+        start = time.perf_counter()
+        pickle.loads(data)
+        loaded = time.perf_counter() - start
+        print(
+            f"pickle {label:25s} {len(data) / 2**20:8.1f} MiB "
+            f"dump {dumped * 1000:7.1f} ms load {loaded * 1000:7.1f} ms"
+        )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "blocks.bin")
+        start = time.perf_counter()
+        table.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = BlockTable.load(path)
+        mapped = time.perf_counter() - start
+        print(
+            f"binary file {os.path.getsize(path) / 2**20:.1f} MiB, "
+            f"save {saved * 1000:.1f} ms, mmap load {mapped * 1000:.2f} ms"
+        )
+        last_page = max(pdf_info)
+        assert [block["text"] for block in loaded.view()[last_page]] == [
+            block["text"] for block in pdf_info[last_page]
+        ]
+        del loaded
+
+    middle = len(pdf_info) // 2
+    shards = [table.select_pages(range(middle)), table.select_pages(range(middle, len(pdf_info)))]
+    start = time.perf_counter()
+    joined = BlockTable.concat(shards[::-1])
+    print(f"concat of two shards {(time.perf_counter() - start) * 1000:.1f} ms")
+    assert joined.to_pdf_info(False) == table.to_pdf_info(False)
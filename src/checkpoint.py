@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+
+import fitz  # PyMuPDF
+
+# Block fields that are worth persisting; images are re-created lazily
+BLOCK_FIELDS = ("block_num", "text", "bbox", "font_size", "font_color", "font_family")
+
+
+def _stream_hash(doc: fitz.Document, xref: int) -> str:
+    return hashlib.sha256(doc.xref_stream_raw(xref) or b"").hexdigest()
+
+
+def page_content_hash(page: fitz.Page) -> str:
+    """
+    Hash what determines a page's extraction result.
+
+    Covers the page's size, rotation and content stream, and everything
+    the stream draws through its resources: the streams of form XObjects
+    (nested ones too), image and soft-mask data, and the fonts used.
+    Resources are hashed by name and content, never by xref, so equal
+    pages of two different files hash the same.
+    """
+    doc = page.parent
+    digest = hashlib.sha256(repr((tuple(page.rect), page.rotation)).encode("utf-8"))
+    digest.update(page.read_contents())
+    # Pages drawn through `/Fm0 Do` or `/Im0 Do` share their content stream
+    resources = []
+    for xref, name, _, bbox in page.get_xobjects():
+        matrix = doc.xref_get_key(xref, "Matrix")[1]
+        resources.append(("form", name, repr(bbox), matrix, _stream_hash(doc, xref)))
+    for image in page.get_images(full=True):
+        xref, smask, name = image[0], image[1], image[7]
+        smask_hash = _stream_hash(doc, smask) if smask else ""
+        resources.append(("image", name, _stream_hash(doc, xref), smask_hash))
+    for _, _, font_type, base_font, name, encoding, *_ in page.get_fonts(full=True):
+        resources.append(("font", name, font_type, base_font, encoding))
+    for resource in sorted(resources):
+        digest.update("\x00".join(resource).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """
+    Append-only, on-disk progress of one translation job.
+
+    Extraction results are stored per page together with the page's content
+    hash, and translations per block together with a hash of the source
+    text. Both live in JSON-lines files that are appended to and flushed as
+    work finishes, so a crash loses at most the line being written. On
+    restart, a page is only re-extracted if its content changed and a block
+    is only re-translated if its text changed.
+
+    Args:
+        checkpoint_dir (str): Root directory for all job checkpoints.
+        job_id (str): Name of this job's sub-directory.
+    """
+
+    def __init__(self, checkpoint_dir: str, job_id: str):
+        self.job_dir = os.path.join(checkpoint_dir, job_id)
+        os.makedirs(self.job_dir, exist_ok=True)
+        self.pages_path = os.path.join(self.job_dir, "pages.jsonl")
+        self.translations_path = os.path.join(self.job_dir, "translations.jsonl")
+
+        self.pages = {}
+        for record in self._read(self.pages_path):
+            self.pages[record["page_num"]] = (record["page_hash"], record["blocks"])
+        self.translations = {}
+        for record in self._read(self.translations_path):
+            key = (record["page_num"], record["block_num"])
+            self.translations[key] = (record["text_hash"], record["translated_text"])
+
+        self._pages_file = open(self.pages_path, "a", encoding="utf-8")
+        self._translations_file = open(self.translations_path, "a", encoding="utf-8")
+
+    @classmethod
+    def for_job(
+        cls,
+        checkpoint_dir: str,
+        pdf_path: str,
+        source_language: str,
+        target_language: str,
+    ) -> "CheckpointStore":
+        """
+        Open the checkpoint of a job, identified by input path and language pair.
+
+        The id does not depend on the file contents, so a revised PDF at
+        the same path reuses every page and block that did not change.
+        """
+        job = "\x1f".join([os.path.abspath(pdf_path), source_language, target_language])
+        return cls(checkpoint_dir, hashlib.sha256(job.encode("utf-8")).hexdigest()[:16])
+
+    @staticmethod
+    def _read(path: str) -> list:
+        """
+        Return the records of a JSON-lines file, skipping lines cut short by a crash.
+
+        Such lines are removed from the file, so records appended after a
+        restart start on a line of their own and are read back.
+        """
+        if not os.path.exists(path):
+            return []
+        records, lines, repaired = [], [], False
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    repaired = True
+                    continue
+                if not line.endswith(b"\n"):
+                    line += b"\n"
+                    repaired = True
+                lines.append(line)
+        if repaired:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.writelines(lines)
+            os.replace(tmp_path, path)
+        return records
+
+    @staticmethod
+    def _append(f, record: dict):
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        f.flush()
+
+    def load_page(self, page_num: int, page_hash: str) -> list | None:
+        """
+        Return the stored blocks of a page, or None if missing or stale.
+        """
+        stored = self.pages.get(page_num)
+        if stored is None or stored[0] != page_hash:
+            return None
+        return [dict(block) for block in stored[1]]
+
+    def save_page(self, page_num: int, page_hash: str, blocks: list):
+        blocks = [{field: block[field] for field in BLOCK_FIELDS} for block in blocks]
+        self.pages[page_num] = (page_hash, blocks)
+        self._append(
+            self._pages_file,
+            {"page_num": page_num, "page_hash": page_hash, "blocks": blocks},
+        )
+
+    def get_translation(self, page_num: int, block_num: int, text: str) -> str | None:
+        stored = self.translations.get((page_num, block_num))
+        if stored is None or stored[0] != text_hash(text):
+            return None
+        return stored[1]
+
+    def save_translation(
+        self, page_num: int, block_num: int, text: str, translated_text: str
+    ):
+        self.translations[(page_num, block_num)] = (text_hash(text), translated_text)
+        self._append(
+            self._translations_file,
+            {
+                "page_num": page_num,
+                "block_num": block_num,
+                "text_hash": text_hash(text),
+                "translated_text": translated_text,
+            },
+        )
+
+    def close(self):
+        self._pages_file.close()
+        self._translations_file.close()
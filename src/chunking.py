@@ -0,0 +1,115 @@
+import re
+from typing import Hashable
+
+# Whitespace after ., !, ? (or their CJK forms), optionally behind a closing quote
+SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+|(?<=[.!?。！？][\"'”’)\]])\s+")
+
+# Hyphenated word broken across two lines, e.g. "transla-\ntion"
+HYPHEN_BREAK = re.compile(r"(\w)-\n(\w)")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for budgeting requests (about 4 characters per token).
+    """
+    return len(text) // 4 + 1
+
+
+def unwrap_lines(text: str) -> str:
+    """
+    Join the visual lines of a block back into flowing text.
+
+    PyMuPDF yields one span per line, so wrapped sentences reach the model
+    as fragments. Blank lines are kept as paragraph breaks.
+    """
+    paragraphs = re.split(r"\n\s*\n", text.strip())
+    return "\n\n".join(
+        " ".join(HYPHEN_BREAK.sub(r"\1\2", paragraph).split())
+        for paragraph in paragraphs
+    )
+
+
+def split_sentences(text: str, max_tokens: int) -> list[str]:
+    """
+    Split `text` into pieces under `max_tokens`, cutting only between sentences.
+
+    A single sentence longer than the limit is cut between words instead.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    pieces, piece = [], ""
+    for sentence in SENTENCE_END.split(text):
+        candidate = f"{piece} {sentence}" if piece else sentence
+        if piece and estimate_tokens(candidate) > max_tokens:
+            pieces.append(piece)
+            candidate = sentence
+        piece = candidate
+        # Oversized sentence: fall back to word boundaries
+        while estimate_tokens(piece) > max_tokens:
+            words = piece.split(" ")
+            head = ""
+            for index, word in enumerate(words):
+                longer = f"{head} {word}" if head else word
+                if head and estimate_tokens(longer) > max_tokens:
+                    break
+                head = longer
+            else:
+                break
+            pieces.append(head)
+            piece = " ".join(words[index:])
+    if piece:
+        pieces.append(piece)
+    return pieces
+
+
+def page_context(page_info: list, max_tokens: int) -> str:
+    """
+    Short page-level context for the model: the page's largest-font text.
+    """
+    if max_tokens <= 0 or not page_info:
+        return ""
+    largest = max(block["font_size"] for block in page_info)
+    headings = [
+        unwrap_lines(block["text"]) for block in page_info if block["font_size"] >= largest
+    ]
+    return " / ".join(headings)[: max_tokens * 4]
+
+
+class TextChunker:
+    """
+    Turn the blocks of a document into translation segments with stable IDs.
+
+    Each block is unwrapped into flowing text and, if it exceeds
+    `max_segment_tokens`, split at sentence boundaries. Segment keys are
+    `(page_num, block_num, part)`, so translations can be joined back in
+    order whatever the batch they came from. Small segments are packed
+    together into one request by the batch engine.
+
+    Args:
+        max_segment_tokens (int): Largest segment sent in one item.
+        unwrap (bool): Join wrapped lines before translating.
+        context_tokens (int): Budget of the page context sent once per request;
+            0 disables it.
+    """
+
+    def __init__(
+        self, max_segment_tokens: int = 500, unwrap: bool = True, context_tokens: int = 32
+    ):
+        self.max_segment_tokens = max_segment_tokens
+        self.unwrap = unwrap
+        self.context_tokens = context_tokens
+
+    def segments(self, page_num: int, block: dict) -> list[tuple[Hashable, str]]:
+        text = unwrap_lines(block["text"]) if self.unwrap else block["text"]
+        return [
+            ((page_num, block["block_num"], part), piece)
+            for part, piece in enumerate(split_sentences(text, self.max_segment_tokens))
+        ]
+
+    def context(self, page_info: list) -> str:
+        return page_context(page_info, self.context_tokens)
+
+    @staticmethod
+    def join(pieces: list[str]) -> str:
+        return " ".join(piece.strip() for piece in pieces)
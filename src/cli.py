@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import sys
+
+# Only the standard library is imported here: `--help`, argument errors and
+# health checks return before any PDF, model or API module is loaded.
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pdf-translate",
+        description="Translate the text of a PDF while keeping its layout.",
+    )
+    parser.add_argument("input", nargs="?", help="PDF to translate")
+    parser.add_argument("output", nargs="?", help="Where to write the translated PDF")
+    parser.add_argument("--source", default="en", help="Source language code or name")
+    parser.add_argument("--target", default="vi", help="Target language code or name")
+    parser.add_argument(
+        "--translator", help="Translator backend (default: translator.backend in the config)"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("reportlab", "fitz"),
+        help="Render backend (default: render.backend in the config)",
+    )
+    parser.add_argument("--font-path", help="TrueType font for the translated text")
+    parser.add_argument("--font-name", help="Name to register the font under")
+    parser.add_argument(
+        "--workers", type=int, help="Page-parallel processes (default: batch.workers)"
+    )
+    parser.add_argument("--checkpoint-dir", help="Resume interrupted jobs from here")
+    parser.add_argument(
+        "--layout", action=argparse.BooleanOptionalAction, help="Use layout detection"
+    )
+    parser.add_argument(
+        "--ocr", action=argparse.BooleanOptionalAction, help="OCR scanned pages"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Process and write a window of pages at a time (bounded memory)",
+    )
+    parser.add_argument("--window-size", type=int, default=8)
+    parser.add_argument(
+        "--previous",
+        metavar="MANIFEST",
+        help="Run manifest of an earlier translation of this document; "
+        "only pages that changed since are redone",
+    )
+    parser.add_argument(
+        "--metrics",
+        choices=("json", "prometheus"),
+        help="Print stage timings and counters when done",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help=(
+            "Warm worker: read JSON jobs ({'input', 'output', ...}) from stdin, one per "
+            "line, reusing loaded fonts, models and clients; print one JSON result each"
+        ),
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="SOURCE",
+        help="Translate every PDF in a directory, or the jobs in a JSON/JSON-lines manifest",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the local HTTP job API over a file-backed queue (see --queue-dir)",
+    )
+    parser.add_argument(
+        "--max-documents",
+        type=int,
+        help="Documents in flight at once (default: batch.max_documents)",
+    )
+    parser.add_argument("--output-dir", default="outputs", help="Outputs of --batch/--serve")
+    parser.add_argument(
+        "--manifest", help="Status manifest of --batch (default: OUTPUT_DIR/manifest.json)"
+    )
+    parser.add_argument("--queue-dir", default="queue", help="Job queue of --serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--check", action="store_true", help="Load the config and exit (health check)"
+    )
+    return parser
+
+
+def serve_worker(runner, lines) -> int:
+    """
+    Run one job per JSON line of `lines`; return the number of failed jobs.
+    """
+    failed = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        job = {}
+        try:
+            job = json.loads(line)
+            result = runner.run_job(job)
+        except Exception as error:
+            failed += 1
+            result = {
+                "input": job.get("input") if isinstance(job, dict) else None,
+                "status": "error",
+                "error": f"{type(error).__name__}: {error}",
+            }
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+    return failed
+
+
+def main(argv: list[str] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    from src.utils import log_utils
+
+    log_utils.DEFAULT_LOG_STREAM = sys.stderr
+
+    if args.check:
+        from src.utils.config_utils import load_config
+
+        load_config()
+        print(json.dumps({"status": "ok"}))
+        return 0
+
+    if not (args.worker or args.batch or args.serve) and not (args.input and args.output):
+        parser.error(
+            "input and output are required unless --worker, --batch or --serve is given"
+        )
+
+    from src.batch_runner import BatchRunner, load_jobs
+
+    runner = BatchRunner.from_config(
+        translator=args.translator,
+        source_language=args.source,
+        target_language=args.target,
+        backend=args.backend,
+        font_path=args.font_path,
+        font_name=args.font_name,
+        workers=args.workers,
+        max_documents=args.max_documents,
+        checkpoint_dir=args.checkpoint_dir,
+        use_layout_detection=args.layout,
+        use_ocr=args.ocr,
+        stream=args.stream,
+        window_size=args.window_size,
+    )
+    failed = 0
+    with runner:
+        if args.serve:
+            from src.job_server import FileJobQueue, JobServer
+
+            server = JobServer(
+                runner,
+                FileJobQueue(args.queue_dir),
+                host=args.host,
+                port=args.port,
+                output_dir=args.output_dir,
+            )
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                server.stop()
+        elif args.batch:
+            jobs = load_jobs(args.batch, args.output_dir)
+            manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+            os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+            summary = runner.run(jobs, manifest_path=manifest_path)
+            print(json.dumps(summary, ensure_ascii=False))
+            failed = summary["documents"].get("failed", 0)
+        elif args.worker:
+            failed = serve_worker(runner, sys.stdin)
+        else:
+            job = {"input": args.input, "output": args.output, "previous": args.previous}
+            print(json.dumps(runner.run_job(job), ensure_ascii=False))
+
+    if args.metrics:
+        from src.utils.metrics import metrics
+
+        print(metrics.to_json() if args.metrics == "json" else metrics.to_prometheus())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
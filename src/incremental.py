@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+
+import fitz  # PyMuPDF
+
+from src.checkpoint import page_content_hash, text_hash
+from src.utils.file_utils import write_json
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(output_path: str) -> str:
+    """
+    Where the run manifest of a translated PDF is kept: next to it.
+    """
+    return f"{os.path.splitext(output_path)[0]}.manifest.json"
+
+
+def block_hash(block: dict) -> str:
+    """
+    Hash a block's text, position and style; equal hashes render identically.
+    """
+    bbox = ",".join(f"{value:.1f}" for value in block["bbox"])
+    key = "\x00".join(
+        [
+            block["text"],
+            bbox,
+            f"{block['font_size']:.2f}",
+            str(block["font_color"]),
+            block["font_family"],
+        ]
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def page_hashes(doc: fitz.Document) -> list:
+    return [page_content_hash(doc.load_page(page_num)) for page_num in range(len(doc))]
+
+
+class RunManifest:
+    """
+    What a translation run produced, page by page, for diffing a revised input.
+
+    Each page records the content hash of the input page and, per block,
+    a hash of its text, bbox and style, a hash of its text alone, and its
+    translation. A revised PDF is compared against it by `Pipeline.update`:
+    pages with an unchanged hash are copied from `output`, and blocks whose
+    text was seen before reuse their translation.
+
+    Args:
+        input_path (str): The translated PDF's source.
+        output_path (str): The translated PDF.
+        source_language (str): Language translated from.
+        target_language (str): Language translated to.
+        render (dict): Settings the output was rendered with (backend, font);
+            pages are only copied into an output rendered the same way.
+        pages (list): One {"page_hash", "blocks"} record per page, in order.
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str = None,
+        source_language: str = None,
+        target_language: str = None,
+        render: dict = None,
+        pages: list = None,
+    ):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.source_language = source_language
+        self.target_language = target_language
+        self.render = render or {}
+        self.pages = pages or []
+
+    def set_page(self, page_num: int, page_hash: str, page_info: list):
+        """
+        Record the translated blocks of one page.
+        """
+        self.copy_page(
+            page_num,
+            {
+                "page_hash": page_hash,
+                "blocks": [
+                    {
+                        "block_num": block["block_num"],
+                        "hash": block_hash(block),
+                        "text_hash": text_hash(block["text"]),
+                        "translated_text": block.get("translated_text"),
+                    }
+                    for block in page_info
+                ],
+            },
+        )
+
+    def copy_page(self, page_num: int, record: dict):
+        """
+        Store a page record as is, e.g. one carried over from a previous run.
+        """
+        if len(self.pages) <= page_num:
+            self.pages.extend([None] * (page_num + 1 - len(self.pages)))
+        self.pages[page_num] = record
+
+    def translations(self) -> dict:
+        """
+        Return {text_hash: translated_text} over every translated block.
+        """
+        return {
+            block["text_hash"]: block["translated_text"]
+            for page in self.pages
+            if page is not None
+            for block in page["blocks"]
+            if block["translated_text"] is not None
+        }
+
+    def block_hashes(self) -> set:
+        return {
+            block["hash"]
+            for page in self.pages
+            if page is not None
+            for block in page["blocks"]
+        }
+
+    def match_pages(self, hashes: list) -> dict:
+        """
+        Map new page numbers to previous pages with the same content hash.
+
+        A page keeps its own number when that page is unchanged; otherwise
+        any unclaimed previous page with its hash is used, so pages shifted
+        by an insertion or deletion still match.
+        """
+        by_hash = {}
+        for old_num, page in enumerate(self.pages):
+            if page is not None:
+                by_hash.setdefault(page["page_hash"], []).append(old_num)
+        matches, claimed = {}, set()
+        for new_num, page_hash in enumerate(hashes):
+            candidates = by_hash.get(page_hash, ())
+            if new_num in candidates:
+                matches[new_num] = new_num
+                claimed.add(new_num)
+        for new_num, page_hash in enumerate(hashes):
+            if new_num in matches:
+                continue
+            for old_num in by_hash.get(page_hash, ()):
+                if old_num not in claimed:
+                    matches[new_num] = old_num
+                    claimed.add(old_num)
+                    break
+        return matches
+
+    def to_dict(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "input": self.input_path,
+            "output": self.output_path,
+            "source_language": self.source_language,
+            "target_language": self.target_language,
+            "render": self.render,
+            "pages": self.pages,
+        }
+
+    def save(self, path: str = None) -> str:
+        path = path or manifest_path_for(self.output_path)
+        write_json(path, self.to_dict())
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "RunManifest":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"{path}: unsupported run manifest version {data.get('version')}")
+        return cls(
+            data["input"],
+            data["output"],
+            data["source_language"],
+            data["target_language"],
+            data.get("render"),
+            data["pages"],
+        )
+
+
+def assemble(
+    output_path: str,
+    sources: list,
+    garbage: int = 3,
+) -> str:
+    """
+    Write `output_path` from pages of other PDFs.
+
+    `sources` lists (path, page_num) per output page. Consecutive pages of
+    one file are copied in a single `insert_pdf` call.
+    """
+    docs = {}
+    doc = fitz.open()
+    tmp_path = f"{output_path}.tmp"
+    try:
+        start = 0
+        while start < len(sources):
+            path, first = sources[start]
+            stop = start + 1
+            while (
+                stop < len(sources)
+                and sources[stop][0] == path
+                and sources[stop][1] == first + stop - start
+            ):
+                stop += 1
+            if path not in docs:
+                docs[path] = fitz.open(path)
+            doc.insert_pdf(docs[path], from_page=first, to_page=first + stop - start - 1)
+            start = stop
+        with metrics.timer("save_output_pdf"):
+            doc.save(tmp_path, garbage=garbage, deflate=True)
+    finally:
+        doc.close()
+        for source in docs.values():
+            source.close()
+    # The output may be one of the sources, so it is replaced once they are closed
+    os.replace(tmp_path, output_path)
+    metrics.incr("bytes_written", os.path.getsize(output_path))
+    return output_path
+
+
+if __name__ == "__main__":
+    # Translate a one-page PDF, revise text drawn through a form XObject only,
+    # and check that the update re-renders the page instead of copying it
+    import tempfile
+
+    from src.pipeline import Pipeline
+    from src.translation_memory import TranslationMemory
+    from src.translator import StubTranslator
+
+    font_path = os.path.join(os.path.dirname(__file__), "..", "font_family", "Roboto-Regular.ttf")
+
+    def write_form_pdf(path: str, text: str) -> str:
+        # The page's own content stream is just "q /fzFrm0 Do Q" either way
+        with fitz.open() as source, fitz.open() as doc:
+            source.new_page().insert_text((72, 72), text, fontsize=14)
+            page = doc.new_page()
+            page.show_pdf_page(page.rect, source, 0)
+            doc.save(path)
+        return path
+
+    def translate(input_path: str, output_path: str, previous: str = None) -> str:
+        pipeline = Pipeline(
+            input_path,
+            output_path,
+            translator=StubTranslator(),
+            translation_memory=TranslationMemory(),
+            use_layout_detection=False,
+            use_ocr=False,
+        )
+        if previous:
+            pipeline.update(previous, font_path, "Roboto", output_path)
+        else:
+            pdf_info, redacted_pdf_path = pipeline.invoke()
+            pipeline.draw_pdf(pdf_info, redacted_pdf_path, font_path, "Roboto", output_path)
+        return pipeline.manifest.save()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, "input.pdf")
+        output_path = os.path.join(tmp_dir, "output.pdf")
+        write_form_pdf(input_path, "Hello world")
+        manifest_path = translate(input_path, output_path)
+
+        write_form_pdf(input_path, "Goodbye moon")
+        metrics.reset()
+        translate(input_path, output_path, previous=manifest_path)
+        changed = metrics.snapshot()["counters"].get("incremental_pages_changed", 0)
+        with fitz.open(output_path) as doc:
+            text = doc[0].get_text()
+        print(f"{changed} of 1 pages changed; output: {text.strip()!r}")
+        assert changed == 1 and "Goodbye" in text and "Hello" not in text
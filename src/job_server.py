@@ -0,0 +1,350 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.batch_runner import BatchRunner, count_pages
+from src.utils.file_utils import write_json
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+JOB_STATES = ("pending", "running", "done", "failed")
+# Job ids double as file names, so only the generated form is accepted
+JOB_ID = re.compile(r"^[0-9a-f]{12}$")
+# What an API client may set; paths, workers and checkpoints come from the server
+JOB_KEYS = {
+    "id",
+    "input",
+    "output",
+    "source",
+    "target",
+    "backend",
+    "layout",
+    "ocr",
+    "stream",
+    "window_size",
+}
+
+
+class FileJobQueue:
+    """
+    Job queue kept as one JSON file per job under a directory per state.
+
+    Moving a file between `pending/`, `running/`, `done/` and `failed/`
+    is an atomic rename, so the queue survives restarts and can be fed by
+    any process that can write a file. Jobs left in `running/` by a crash
+    are put back in `pending/` by `recover`.
+    """
+
+    def __init__(self, queue_dir: str):
+        self.queue_dir = queue_dir
+        for state in JOB_STATES:
+            os.makedirs(os.path.join(queue_dir, state), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, state: str, job_id: str) -> str:
+        return os.path.join(self.queue_dir, state, f"{job_id}.json")
+
+    @staticmethod
+    def _read(path: str) -> dict:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def submit(self, job: dict) -> dict:
+        """
+        Queue `job` as pending; a given "id" must be 12 hex digits and unused.
+        """
+        job_id = job.get("id") or uuid.uuid4().hex[:12]
+        if not isinstance(job_id, str) or not JOB_ID.match(job_id):
+            raise ValueError(f"invalid job id {job_id!r}, expected 12 hex digits")
+        job = {**job, "id": job_id, "status": "pending", "submitted_at": time.time()}
+        with self._lock:
+            if any(os.path.exists(self._path(state, job_id)) for state in JOB_STATES):
+                raise ValueError(f"job {job_id} already exists")
+            write_json(self._path("pending", job_id), job)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        if not JOB_ID.match(job_id):
+            return None
+        for state in JOB_STATES:
+            try:
+                return self._read(self._path(state, job_id))
+            except FileNotFoundError:
+                continue
+        return None
+
+    def list(self, state: str = None) -> list:
+        if state and state not in JOB_STATES:
+            raise ValueError(f"unknown job status {state!r}, expected one of {JOB_STATES}")
+        jobs = []
+        for job_state in (state,) if state else JOB_STATES:
+            directory = os.path.join(self.queue_dir, job_state)
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".json"):
+                    try:
+                        jobs.append(self._read(os.path.join(directory, name)))
+                    except FileNotFoundError:
+                        # Moved to another state since listdir
+                        continue
+        return jobs
+
+    def claim(self) -> dict | None:
+        """
+        Move the pending job with the fewest pages to `running/` and return it.
+        """
+        with self._lock:
+            pending = sorted(
+                self.list("pending"),
+                key=lambda job: (job.get("pages", 0), job["submitted_at"]),
+            )
+            for job in pending:
+                try:
+                    os.rename(
+                        self._path("pending", job["id"]), self._path("running", job["id"])
+                    )
+                except FileNotFoundError:
+                    # Claimed by another worker
+                    continue
+                return job
+        return None
+
+    def update(self, job: dict):
+        """
+        Save `job` under its current status, removing it from any other state.
+        """
+        with self._lock:
+            write_json(self._path(job["status"], job["id"]), job)
+            for state in JOB_STATES:
+                if state != job["status"]:
+                    try:
+                        os.remove(self._path(state, job["id"]))
+                    except FileNotFoundError:
+                        pass
+
+    def recover(self) -> int:
+        jobs = self.list("running")
+        for job in jobs:
+            job["status"] = "pending"
+            self.update(job)
+        if jobs:
+            logger.info(f"Re-queued {len(jobs)} jobs interrupted by a restart")
+        return len(jobs)
+
+    def counts(self) -> dict:
+        return {
+            state: sum(
+                name.endswith(".json")
+                for name in os.listdir(os.path.join(self.queue_dir, state))
+            )
+            for state in JOB_STATES
+        }
+
+
+class JobServer:
+    """
+    Local HTTP API in front of a `FileJobQueue`, worked off by a `BatchRunner`.
+
+    Endpoints:
+        POST /jobs        {"input", "output"?, "source"?, "target"?, ...} -> 202 job
+                          (only JOB_KEYS; "output" must stay inside `output_dir`)
+        GET  /jobs        all jobs; `?status=pending` filters
+        GET  /jobs/<id>   one job with its status and result
+        GET  /stats       job counts and throughput in pages/minute
+        GET  /health
+
+    Args:
+        runner (BatchRunner): Runs the jobs; up to its `max_documents` at once.
+        queue (FileJobQueue): Where jobs are kept.
+        host (str): Interface to listen on; local only by default.
+        port (int): Port to listen on.
+        output_dir (str): Where outputs go; a job's "output" is relative to it.
+        poll_interval (float): Seconds between checks for new jobs when idle.
+    """
+
+    def __init__(
+        self,
+        runner: BatchRunner,
+        queue: FileJobQueue,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        output_dir: str = "outputs",
+        poll_interval: float = 1.0,
+    ):
+        self.runner = runner
+        self.queue = queue
+        self.output_dir = output_dir
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._in_flight = threading.Semaphore(runner.max_documents)
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+
+    def submit(self, job: dict) -> dict:
+        from src.pipeline import RENDER_BACKENDS
+
+        unknown = set(job) - JOB_KEYS
+        if unknown:
+            raise ValueError(f"unsupported job keys: {', '.join(sorted(unknown))}")
+        if not job.get("input"):
+            raise ValueError("job needs an input path")
+        if not os.path.isfile(job["input"]):
+            raise ValueError(f"no such file: {job['input']}")
+        if job.get("backend") not in (None, *RENDER_BACKENDS):
+            raise ValueError(
+                f"unknown backend {job['backend']!r}, expected one of {RENDER_BACKENDS}"
+            )
+        window_size = job.get("window_size")
+        if window_size is not None and (not isinstance(window_size, int) or window_size < 1):
+            raise ValueError("window_size must be a positive integer")
+        output_dir = os.path.realpath(self.output_dir)
+        if job.get("output"):
+            output_path = os.path.realpath(os.path.join(output_dir, job["output"]))
+            if os.path.commonpath([output_path, output_dir]) != output_dir:
+                raise ValueError(f"output must stay inside {self.output_dir}")
+        else:
+            stem = os.path.splitext(os.path.basename(job["input"]))[0]
+            output_path = os.path.join(output_dir, f"{stem}_translated.pdf")
+        job["output"] = output_path
+        try:
+            with self.runner.pdf_lock:
+                job["pages"] = count_pages(job["input"])
+        except RuntimeError as error:
+            # PyMuPDF's FileDataError for corrupt or non-PDF inputs
+            raise ValueError(f"cannot open {job['input']} as a PDF: {error}") from error
+        job = self.queue.submit(job)
+        metrics.incr("jobs_submitted")
+        self._wake.set()
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "jobs": self.queue.counts(),
+            "pages_done": self.runner.pages_done,
+            "pages_per_minute": self.runner.pages_per_minute(),
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                if path == "/health":
+                    self._send(200, {"status": "ok"})
+                elif path == "/stats":
+                    self._send(200, server.stats())
+                elif path == "/jobs":
+                    params = dict(
+                        param.split("=", 1) for param in query.split("&") if "=" in param
+                    )
+                    try:
+                        self._send(200, server.queue.list(params.get("status")))
+                    except ValueError as error:
+                        self._send(400, {"error": str(error)})
+                elif path.startswith("/jobs/"):
+                    job = server.queue.get(path[len("/jobs/") :])
+                    if job:
+                        self._send(200, job)
+                    else:
+                        self._send(404, {"error": "not found"})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/jobs":
+                    self._send(404, {"error": "not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    job = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(job, dict):
+                        raise ValueError("expected a JSON object")
+                    self._send(202, server.submit(job))
+                except ValueError as error:
+                    self._send(400, {"error": str(error)})
+                except Exception as error:
+                    logger.exception(f"Failed to submit a job: {error}")
+                    self._send(500, {"error": "internal error"})
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def _on_update(self, job: dict):
+        self.queue.update(job)
+        if job["status"] in ("done", "failed"):
+            self._in_flight.release()
+            self._wake.set()
+
+    def serve_forever(self):
+        """
+        Serve the API in a background thread and work off the queue until `stop`.
+        """
+        self.queue.recover()
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        host, port = self.httpd.server_address[:2]
+        logger.info(f"Job API listening on http://{host}:{port}")
+        try:
+            while not self._stop.is_set():
+                if not self._in_flight.acquire(timeout=self.poll_interval):
+                    continue
+                job = self.queue.claim()
+                if job is None:
+                    self._in_flight.release()
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    continue
+                self.runner.submit(job, on_update=self._on_update)
+        finally:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+if __name__ == "__main__":
+    # Submit the PDFs given on the command line to a local server and report throughput
+    import sys
+    import tempfile
+    import urllib.request
+
+    queue_dir = tempfile.mkdtemp(prefix="job_queue_")
+    runner = BatchRunner.from_config(translator="stub")
+    server = JobServer(runner, FileJobQueue(queue_dir), port=0, output_dir=queue_dir)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = "http://127.0.0.1:%d" % server.httpd.server_address[1]
+
+    for pdf_path in sys.argv[1:]:
+        request = urllib.request.Request(
+            f"{base_url}/jobs",
+            data=json.dumps({"input": pdf_path}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        print(json.load(urllib.request.urlopen(request))["id"], pdf_path)
+
+    while True:
+        stats = json.load(urllib.request.urlopen(f"{base_url}/stats"))
+        if stats["jobs"]["pending"] == stats["jobs"]["running"] == 0:
+            break
+        time.sleep(0.5)
+    print(json.dumps(stats))
+    server.stop()
+    runner.close()
@@ -0,0 +1,138 @@
+import threading
+from functools import lru_cache
+
+from src.translator import BaseTranslator
+from src.utils.languages import language_code
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+_load_lock = threading.Lock()
+
+
+def load_marian(model_name: str, ctranslate2_dir: str = None, threads: int = 0):
+    """
+    Load a MarianMT tokenizer and model (or its CTranslate2 conversion) once per process.
+    """
+    # Threads asking for a model that is still loading wait for it
+    with _load_lock:
+        return _load_marian(model_name, ctranslate2_dir, threads)
+
+
+@lru_cache(maxsize=4)
+def _load_marian(model_name: str, ctranslate2_dir: str, threads: int):
+    from transformers import MarianTokenizer
+
+    tokenizer = MarianTokenizer.from_pretrained(model_name)
+    if ctranslate2_dir:
+        import ctranslate2
+
+        logger.info(f"Loading CTranslate2 model from {ctranslate2_dir}")
+        model = ctranslate2.Translator(
+            ctranslate2_dir, device="cpu", compute_type="int8", intra_threads=threads
+        )
+    else:
+        import torch
+        from transformers import MarianMTModel
+
+        logger.info(f"Loading MarianMT model {model_name}")
+        if threads:
+            torch.set_num_threads(threads)
+        model = MarianMTModel.from_pretrained(model_name).eval()
+    return tokenizer, model
+
+
+class MarianTranslator(BaseTranslator):
+    """
+    Offline CPU translator based on OPUS-MT MarianMT models.
+
+    One model is loaded per language pair and kept for the whole process.
+    With `ctranslate2_dir` (a model converted by `ct2-transformers-converter`),
+    inference runs on CTranslate2 with int8 weights, which is several times
+    faster on CPU than PyTorch. Context is not used by these models.
+    Needs `transformers` and `sentencepiece` (and `ctranslate2` for the
+    converted models), which are not installed with the base dependencies.
+
+    Args:
+        model_name (str): Hugging Face model name; "{source}" and "{target}"
+            are replaced by language codes.
+        ctranslate2_dir (str): Optional converted model directory, same placeholders.
+        batch_size (int): Texts per forward pass.
+        max_length (int): Longest input/output, in model tokens.
+        threads (int): CPU threads; 0 lets the runtime decide.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "Helsinki-NLP/opus-mt-{source}-{target}",
+        ctranslate2_dir: str = None,
+        batch_size: int = 16,
+        max_length: int = 512,
+        threads: int = 0,
+    ):
+        self.model_name = model_name
+        self.ctranslate2_dir = ctranslate2_dir
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.threads = threads
+        self.model = f"marian:{model_name}"
+
+    def _load(self, source_language: str, target_language: str):
+        codes = {
+            "source": language_code(source_language),
+            "target": language_code(target_language),
+        }
+        ctranslate2_dir = (
+            self.ctranslate2_dir.format(**codes) if self.ctranslate2_dir else None
+        )
+        return load_marian(self.model_name.format(**codes), ctranslate2_dir, self.threads)
+
+    def _translate_chunk(self, tokenizer, model, texts: list[str]) -> list[str]:
+        if self.ctranslate2_dir:
+            tokens = [
+                tokenizer.convert_ids_to_tokens(
+                    tokenizer.encode(text, truncation=True, max_length=self.max_length)
+                )
+                for text in texts
+            ]
+            results = model.translate_batch(
+                tokens, max_batch_size=self.batch_size, max_decoding_length=self.max_length
+            )
+            return [
+                tokenizer.decode(
+                    tokenizer.convert_tokens_to_ids(result.hypotheses[0]),
+                    skip_special_tokens=True,
+                )
+                for result in results
+            ]
+
+        import torch
+
+        inputs = tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+        )
+        with torch.inference_mode():
+            outputs = model.generate(**inputs, max_length=self.max_length)
+        return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def translate_batch(
+        self,
+        text_list: list[str],
+        source_language: str = "english",
+        target_language: str = "vietnamese",
+        context: str = None,
+    ) -> list[str]:
+        if not text_list:
+            return []
+        tokenizer, model = self._load(source_language, target_language)
+        translations = []
+        with metrics.timer("marian_inference"):
+            for start in range(0, len(text_list), self.batch_size):
+                chunk = text_list[start : start + self.batch_size]
+                translations.extend(self._translate_chunk(tokenizer, model, chunk))
+        return translations
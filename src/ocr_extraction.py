@@ -0,0 +1,228 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import fitz  # PyMuPDF
+
+from src.background import page_pixels
+from src.text_extraction import BlockImage, TextExtractor, open_document
+from src.utils.config_utils import get_config
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+OCR_ENGINES = ("easyocr", "tesseract")
+
+# One OCR reader per worker process, loaded by the pool initializer
+_reader = None
+
+
+def _load_reader(engine: str, languages: tuple):
+    global _reader
+    if _reader is not None:
+        return _reader
+    if engine == "easyocr":
+        import easyocr
+
+        _reader = easyocr.Reader(list(languages), gpu=False, verbose=False)
+    else:
+        import pytesseract
+
+        _reader = pytesseract
+    return _reader
+
+
+def is_scanned_page(page: fitz.Page, min_text_chars: int = 1) -> bool:
+    """
+    Cheap check for a page that has images but no usable text layer.
+    """
+    if len(page.get_text("text").strip()) >= min_text_chars:
+        return False
+    return bool(page.get_images(full=False))
+
+
+def _text_color(pixels: np.ndarray) -> int:
+    """
+    Estimate the text color of a box as the median of its darker-than-average pixels.
+    """
+    flat = pixels.reshape(-1, 3).astype(np.int32)
+    luminance = flat @ np.array([299, 587, 114]) // 1000
+    ink = flat[luminance < luminance.mean()]
+    if not len(ink):
+        return 0
+    r, g, b = np.median(ink, axis=0).astype(int)
+    return int(r) << 16 | int(g) << 8 | int(b)
+
+
+def _make_block(pixels: np.ndarray, zoom: float, box: tuple, text: str, line_count: int):
+    left, top, right, bottom = (max(int(coord), 0) for coord in box)
+    line_height = (bottom - top) / zoom / max(line_count, 1)
+    return {
+        "text": text,
+        "bbox": (left / zoom, top / zoom, right / zoom, bottom / zoom),
+        # Glyphs fill roughly 80% of a line's height
+        "font_size": round(line_height * 0.8, 1),
+        "font_color": _text_color(pixels[top:bottom, left:right]),
+        "font_family": "ocr",
+    }
+
+
+def _easyocr_blocks(reader, pixels: np.ndarray, zoom: float) -> list:
+    blocks = []
+    for points, text, _ in reader.readtext(pixels, paragraph=False):
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        box = (min(xs), min(ys), max(xs), max(ys))
+        blocks.append(_make_block(pixels, zoom, box, text + "\n", 1))
+    return blocks
+
+
+def _tesseract_blocks(reader, pixels: np.ndarray, zoom: float, languages: tuple) -> list:
+    from PIL import Image
+
+    data = reader.image_to_data(
+        Image.fromarray(pixels),
+        lang="+".join(languages),
+        output_type=reader.Output.DICT,
+    )
+    # Group words into Tesseract's own blocks, one line of text per line_num
+    grouped = {}
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        block = grouped.setdefault(data["block_num"][i], {"lines": {}, "boxes": []})
+        block["lines"].setdefault(data["line_num"][i], []).append(word)
+        left, top = data["left"][i], data["top"][i]
+        block["boxes"].append((left, top, left + data["width"][i], top + data["height"][i]))
+
+    blocks = []
+    for block in grouped.values():
+        boxes = block["boxes"]
+        box = (
+            min(b[0] for b in boxes),
+            min(b[1] for b in boxes),
+            max(b[2] for b in boxes),
+            max(b[3] for b in boxes),
+        )
+        text = "".join(" ".join(words) + "\n" for words in block["lines"].values())
+        blocks.append(_make_block(pixels, zoom, box, text, len(block["lines"])))
+    return blocks
+
+
+def _ocr_page(pdf_path: str, page_num: int, dpi: int, engine: str, languages: tuple) -> list:
+    """
+    OCR one page and return blocks in the TextExtractor schema, without images.
+    """
+    reader = _load_reader(engine, languages)
+    page = open_document(pdf_path).load_page(page_num)
+    pixels = np.ascontiguousarray(page_pixels(page, dpi))
+    zoom = dpi / 72
+    if engine == "easyocr":
+        blocks = _easyocr_blocks(reader, pixels, zoom)
+    else:
+        blocks = _tesseract_blocks(reader, pixels, zoom, languages)
+    for block_num, block in enumerate(blocks):
+        block["block_num"] = block_num + 1
+    return blocks
+
+
+class OCRTextExtractor(TextExtractor):
+    """
+    Text extractor that falls back to OCR for scanned pages.
+
+    Pages with a text layer go through the regular PyMuPDF extraction.
+    Pages that only carry images are detected up front and OCR'd in a
+    process pool, with one OCR reader loaded per worker and reused for
+    every page it handles. OCR blocks follow the same schema (bbox, text,
+    font_size estimate, color), so redaction and drawing work unchanged.
+
+    Args:
+        input_pdf_path (str): PDF to extract.
+        dpi (int): Resolution used for block images and OCR renders.
+        engine (str): "easyocr" or "tesseract".
+        languages (tuple): OCR language codes for the chosen engine.
+        workers (int): Number of OCR worker processes.
+    """
+
+    def __init__(
+        self,
+        input_pdf_path: str,
+        dpi: int = 300,
+        layout_detector=None,
+        engine: str = "easyocr",
+        languages: tuple = ("en",),
+        workers: int = os.cpu_count(),
+    ):
+        if engine not in OCR_ENGINES:
+            raise ValueError(f"Unknown OCR engine {engine}, expected one of {OCR_ENGINES}")
+        super().__init__(input_pdf_path, dpi, layout_detector)
+        self.engine = engine
+        self.languages = tuple(languages)
+        self.workers = workers
+
+    @classmethod
+    def from_config(cls, input_pdf_path: str, layout_detector=None) -> "OCRTextExtractor":
+        return cls(
+            input_pdf_path,
+            layout_detector=layout_detector,
+            engine=get_config("ocr", "engine", default="easyocr"),
+            languages=get_config("ocr", "languages", default=["en"]),
+            workers=get_config("ocr", "workers", default=os.cpu_count()),
+        )
+
+    def _attach_images(self, page_num: int, blocks: list, doc: fitz.Document) -> list:
+        for block in blocks:
+            block["image"] = BlockImage(
+                self.input_pdf_path, page_num, block["bbox"], self.DPI, doc
+            )
+        metrics.incr("blocks_extracted", len(blocks))
+        return blocks
+
+    def extract_page(
+        self, page: fitz.Page, doc: fitz.Document = None, regions: list = None
+    ) -> list:
+        if not is_scanned_page(page):
+            return super().extract_page(page, doc, regions)
+        # Single pages are OCR'd in this process
+        with metrics.timer("ocr_page"):
+            blocks = _ocr_page(
+                self.input_pdf_path, page.number, self.DPI, self.engine, self.languages
+            )
+        return self._attach_images(page.number, blocks, doc)
+
+    def iter_pages(self, doc: fitz.Document = None):
+        doc = doc or fitz.open(self.input_pdf_path)
+        scanned = [
+            page_num for page_num in range(len(doc)) if is_scanned_page(doc.load_page(page_num))
+        ]
+        metrics.incr("ocr_pages", len(scanned))
+        if not scanned:
+            yield from super().iter_pages(doc)
+            return
+        logger.info(f"OCR fallback for {len(scanned)} of {len(doc)} pages")
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(scanned)),
+            initializer=_load_reader,
+            initargs=(self.engine, self.languages),
+        ) as executor:
+            futures = {
+                page_num: executor.submit(
+                    _ocr_page,
+                    self.input_pdf_path,
+                    page_num,
+                    self.DPI,
+                    self.engine,
+                    self.languages,
+                )
+                for page_num in scanned
+            }
+            # Text pages are extracted here while the pool works on scans
+            for page_num in range(len(doc)):
+                page = doc.load_page(page_num)
+                if page_num in futures:
+                    blocks = self._attach_images(page_num, futures[page_num].result(), doc)
+                else:
+                    blocks = super().extract_page(page, doc)
+                yield page_num, blocks
@@ -0,0 +1,262 @@
+import copy
+import math
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import TYPE_CHECKING
+
+import fitz  # PyMuPDF
+
+from src.block_table import BlockTable, PdfInfoView
+from src.layout_detection import LayoutDetector
+from src.text_extraction import TextExtractor
+from src.redact_text import Redactor
+from src.renderer import BaseRenderer, ReportlabRenderer
+from src.utils.fonts import subset_fonts
+
+if TYPE_CHECKING:
+    from threading import Lock
+
+
+def shard_pages(page_count: int, workers: int, shards_per_worker: int = 4) -> list:
+    """
+    Split `page_count` pages into contiguous (start, stop) ranges.
+
+    Several shards per worker keep the pool busy when some pages (e.g.
+    scanned ones) are much slower than others.
+    """
+    shard_count = max(1, min(page_count, workers * shards_per_worker))
+    size = math.ceil(page_count / shard_count) if page_count else 1
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def merge_shards(
+    shard_paths: list, output_path: str, garbage: int = 3, subset: bool = False
+) -> str:
+    """
+    Concatenate shard PDFs, in order, into `output_path`.
+
+    With `garbage=4`, objects every shard carries an identical copy of
+    (e.g. the embedded font) are merged into one. With `subset`, fonts are
+    subset once the copies are merged, so the document keeps one subset;
+    shards must then embed identical, not separately subset, fonts.
+    """
+    doc = fitz.open()
+    for shard_path in shard_paths:
+        with fitz.open(shard_path) as shard:
+            doc.insert_pdf(shard)
+    if subset:
+        # Duplicates are only merged on save; subsetting first would cut
+        # every copy down to its own shard's glyphs
+        merged = fitz.open("pdf", doc.tobytes(garbage=4))
+        doc.close()
+        doc = merged
+        subset_fonts(doc)
+    doc.save(output_path, garbage=garbage, deflate=True)
+    doc.close()
+    return output_path
+
+
+def _extract_shard(
+    pdf_path: str,
+    dpi: int,
+    start: int,
+    stop: int,
+    layout_detector: LayoutDetector = None,
+) -> BlockTable:
+    # Each worker opens its own document; block images reopen it lazily
+    extractor = TextExtractor(pdf_path, dpi=dpi, layout_detector=layout_detector)
+    doc = fitz.open(pdf_path)
+    pages = [doc.load_page(page_num) for page_num in range(start, stop)]
+    if layout_detector is not None:
+        regions_list = layout_detector.detect(pages)
+    else:
+        regions_list = [None] * len(pages)
+    shard_info = {
+        page.number: extractor.extract_page(page, regions=regions)
+        for page, regions in zip(pages, regions_list)
+    }
+    doc.close()
+    # A few arrays pickle back far cheaper than one dict per block
+    return BlockTable.from_pdf_info(shard_info, pdf_path, dpi)
+
+
+def _redact_shard(
+    redactor: Redactor,
+    pdf_path: str,
+    shard_info: dict,
+    start: int,
+    stop: int,
+    shard_path: str,
+) -> str:
+    doc = fitz.open(pdf_path)
+    for page_num in range(start, stop):
+        redactor.redact_page(doc.load_page(page_num), shard_info.get(page_num, []))
+    doc.select(list(range(start, stop)))
+    doc.save(shard_path)
+    doc.close()
+    return shard_path
+
+
+def _render_shard(
+    renderer: BaseRenderer,
+    shard_info: dict,
+    redacted_pdf_path: str,
+    start: int,
+    stop: int,
+    shard_path: str,
+    overlay_path: str = None,
+) -> tuple:
+    pages = range(start, stop)
+    if overlay_path is not None:
+        renderer.render(shard_info, redacted_pdf_path, shard_path, pages, overlay_path)
+    else:
+        renderer.render(shard_info, redacted_pdf_path, shard_path, pages=pages)
+    # Layout reports live in the worker's copy of the renderer; send them back
+    return shard_path, renderer.layout.shrunk_blocks
+
+
+class ParallelExecutor:
+    """
+    Run the PyMuPDF-heavy stages over page shards in a process pool.
+
+    Every worker opens its own `fitz` document, and shards that produce
+    PDFs are written to a temporary directory and reassembled in page order.
+    A process pool can be shared by several documents through `executor`;
+    otherwise one is started for each stage. `lock` guards only the
+    PyMuPDF calls made in this process (page counts, merging shards), not
+    the wait for workers, so documents sharing a pool overlap their stages.
+    """
+
+    def __init__(
+        self, workers: int = os.cpu_count(), executor: Executor = None, lock: "Lock" = None
+    ):
+        self.workers = workers
+        self.executor = executor
+        self.lock = lock or nullcontext()
+
+    def _pool(self):
+        if self.executor is not None:
+            # Shared pools outlive the stage
+            return nullcontext(self.executor)
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    def _shards(self, pdf_path: str) -> list:
+        with self.lock, fitz.open(pdf_path) as doc:
+            return shard_pages(len(doc), self.workers)
+
+    @staticmethod
+    def _slice(pdf_info: dict, start: int, stop: int) -> dict:
+        if isinstance(pdf_info, PdfInfoView):
+            return pdf_info.select(range(start, stop))
+        return {
+            page_num: pdf_info[page_num]
+            for page_num in range(start, stop)
+            if page_num in pdf_info
+        }
+
+    def extract_text(
+        self, pdf_path: str, dpi: int = 300, layout_detector: LayoutDetector = None
+    ) -> PdfInfoView:
+        shards = self._shards(pdf_path)
+        with self._pool() as executor:
+            futures = [
+                executor.submit(
+                    _extract_shard, pdf_path, dpi, start, stop, layout_detector
+                )
+                for start, stop in shards
+            ]
+            tables = [future.result() for future in futures]
+        return BlockTable.concat(tables).view()
+
+    def _run_pdf_stage(
+        self,
+        pdf_path: str,
+        output_path: str,
+        submit,
+        on_result=None,
+        garbage: int = 3,
+        subset: bool = False,
+    ) -> str:
+        """
+        Run a PDF-producing stage over all shards and merge the shard files.
+
+        `on_result` maps each worker result to its shard path, for stages
+        that send back more than the path.
+        """
+        shards = self._shards(pdf_path)
+        with tempfile.TemporaryDirectory() as tmp_dir, self._pool() as executor:
+            futures = [
+                submit(executor, start, stop, os.path.join(tmp_dir, f"shard_{start}.pdf"))
+                for start, stop in shards
+            ]
+            results = [future.result() for future in futures]
+            shard_paths = [on_result(result) for result in results] if on_result else results
+            with self.lock:
+                return merge_shards(shard_paths, output_path, garbage=garbage, subset=subset)
+
+    def redact(
+        self, redactor: Redactor, pdf_info: dict, pdf_path: str, output_path: str
+    ) -> str:
+        return self._run_pdf_stage(
+            pdf_path,
+            output_path,
+            lambda executor, start, stop, shard_path: executor.submit(
+                _redact_shard,
+                redactor,
+                pdf_path,
+                self._slice(pdf_info, start, stop),
+                start,
+                stop,
+                shard_path,
+            ),
+        )
+
+    def render(
+        self,
+        renderer: BaseRenderer,
+        pdf_info: dict,
+        redacted_pdf_path: str,
+        output_path: str,
+    ) -> str:
+        """
+        Render page shards in the pool and merge them, keeping one font subset.
+
+        Shards embed the font whole and it is subset once, after the merge:
+        separately subset copies differ and could not be merged. Reportlab
+        overlays are drawn here into one file, as reportlab always embeds
+        its own subsets, and the workers merge them onto their pages.
+        """
+
+        def collect(result):
+            shard_path, shrunk_blocks = result
+            renderer.layout.shrunk_blocks.extend(shrunk_blocks)
+            return shard_path
+
+        shard_renderer = copy.copy(renderer)
+        shard_renderer.subset_fonts = False
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            overlay_path = None
+            if isinstance(renderer, ReportlabRenderer):
+                overlay_path = renderer.draw_document_overlay(
+                    pdf_info, redacted_pdf_path, os.path.join(tmp_dir, "overlay.pdf")
+                )
+            return self._run_pdf_stage(
+                redacted_pdf_path,
+                output_path,
+                lambda executor, start, stop, shard_path: executor.submit(
+                    _render_shard,
+                    shard_renderer,
+                    self._slice(pdf_info, start, stop),
+                    redacted_pdf_path,
+                    start,
+                    stop,
+                    shard_path,
+                    overlay_path,
+                ),
+                on_result=collect,
+                # Every shard embeds its own copy of the font
+                garbage=4,
+                subset=renderer.subset_fonts,
+            )
@@ -1,61 +1,287 @@
+import os
+import tempfile
+
 import fitz
-import io
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.colors import Color
-from pypdf import PdfReader, PdfWriter, PageObject
+from contextlib import nullcontext
+from itertools import islice
+from typing import TYPE_CHECKING
+
+
+from src.text_extraction import BlockImage, TextExtractor
+from src.redact_text import BaseRedactor, Redactor
+from src.translator import BaseTranslator, get_translator
+from src.batch_translation import BatchTranslationEngine
+from src.translation_memory import CachedTranslator, TranslationMemory
+from src.block_table import BlockTable, PdfInfoView
+from src.checkpoint import CheckpointStore, page_content_hash, text_hash
+from src.incremental import RunManifest, assemble, block_hash, page_hashes
+from src.repeated_elements import RepeatedElements
+from src.utils.config_utils import get_config
+from src.utils.fonts import subset_fonts
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+from src.utils.pdf_writer import IncrementalPdfWriter
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from threading import Lock
 
+    from src.renderer import BaseRenderer
 
-from src.text_extraction import TextExtractor
-from src.redact_text import Redactor
-from src.translator import OpenAITranslator
+logger = get_logger(__file__)
 
 
-def int_to_rgb(color_int: int) -> tuple:
-    """
-    Convert an integer to an (R, G, B) tuple.
+def __getattr__(name: str):
+    # Kept importable from here; the renderer (reportlab, pypdf) loads on first use
+    if name == "int_to_rgb":
+        from src.renderer import int_to_rgb
 
-    Args:
-        color_int (int): Integer representing the color.
+        return int_to_rgb
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    Returns:
-        tuple: (R, G, B)
-    """
-    r = (color_int >> 16) & 0xFF
-    g = (color_int >> 8) & 0xFF
-    b = color_int & 0xFF
-    return (r / 255, g / 255, b / 255)
+
+RENDER_BACKENDS = ("reportlab", "fitz")
 
 
 class Pipeline:
-    def __init__(self, pdf_path: str, output_path: str):
+    def __init__(
+        self,
+        pdf_path: str,
+        output_path: str,
+        translator: BaseTranslator = None,
+        max_batch_tokens: int = 2000,
+        max_concurrency: int = 4,
+        translation_memory: TranslationMemory = None,
+        workers: int = 1,
+        backend: str = "reportlab",
+        checkpoint_dir: str = None,
+        use_layout_detection: bool = None,
+        use_ocr: bool = None,
+        redactor: BaseRedactor = None,
+        source_language: str = "english",
+        target_language: str = "vietnamese",
+        executor: "Executor" = None,
+        pdf_lock: "Lock" = None,
+        detect_repeats: bool = None,
+        use_block_table: bool = None,
+    ):
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(
+                f"Unknown render backend {backend}, expected one of {RENDER_BACKENDS}"
+            )
         self.pdf_path = pdf_path
         self.output_path = output_path
-        self.text_extractor = TextExtractor(pdf_path)
-        self.redactor = Redactor()
-        self.translator = OpenAITranslator()
+        self.source_language = source_language
+        self.target_language = target_language
+        # Optional stages import their (heavy) modules only when enabled
+        # Layout detection is off unless enabled here or in the config
+        if use_layout_detection is None:
+            use_layout_detection = get_config(
+                "layout_detection_model", "enabled", default=False
+            )
+        self.layout_detector = None
+        if use_layout_detection:
+            from src.layout_detection import LayoutDetector
+
+            self.layout_detector = LayoutDetector.from_config()
+        # Scanned pages come out empty unless the OCR fallback is enabled
+        if use_ocr is None:
+            use_ocr = get_config("ocr", "enabled", default=False)
+        self.use_ocr = use_ocr
+        if use_ocr:
+            from src.ocr_extraction import OCRTextExtractor
+
+            self.text_extractor = OCRTextExtractor.from_config(
+                pdf_path, layout_detector=self.layout_detector
+            )
+        else:
+            self.text_extractor = TextExtractor(
+                pdf_path, layout_detector=self.layout_detector
+            )
+        # Running headers and footers are translated, filled and drawn once
+        if detect_repeats is None:
+            detect_repeats = get_config("repeated_elements", "enabled", default=True)
+        self.repeated_elements = RepeatedElements.from_config() if detect_repeats else None
+        # Extracted blocks are kept in columns rather than one dict per block
+        if use_block_table is None:
+            use_block_table = get_config("block_table", "enabled", default=True)
+        self.use_block_table = use_block_table
+        # Flat fills by default; InpaintRedactor restores textured backgrounds
+        self.redactor = redactor or Redactor()
+        self.translation_memory = translation_memory or TranslationMemory.from_config()
+        self.translator = CachedTranslator(
+            translator or get_translator(), self.translation_memory
+        )
+        self.translation_engine = BatchTranslationEngine(
+            self.translator,
+            max_batch_tokens=max_batch_tokens,
+            max_concurrency=max_concurrency,
+        )
+        # PyMuPDF is not thread-safe: documents run from several threads share
+        # a lock around the PyMuPDF calls of their extract, redact and render
+        # stages; pool workers have their own PyMuPDF and run unlocked
+        self.pdf_lock = pdf_lock or nullcontext()
+        # With workers > 1, PyMuPDF stages run over page shards in a process pool
+        self.workers = workers
+        self.parallel = None
+        if workers > 1:
+            from src.parallel import ParallelExecutor
+
+            self.parallel = ParallelExecutor(workers, executor=executor, lock=pdf_lock)
+        # "reportlab" merges overlays onto a saved redacted PDF with pypdf;
+        # "fitz" redacts and draws text in one open document and saves once
+        self.backend = backend
+        self.shrunk_blocks = []
+        # Per-page extraction and per-block translations survive a crash here
+        self.checkpoint_dir = checkpoint_dir
+        # Page hashes and translations of the last run, for `update`
+        self.manifest = None
+
+    def _make_renderer(
+        self, font_path: str, font_name: str, with_redactor: bool = True
+    ) -> "BaseRenderer":
+        from src.renderer import FitzRenderer, ReportlabRenderer
+
+        # One subset font per document, duplicate objects merged on save
+        options = {
+            "subset_fonts": get_config("render", "subset_fonts", default=True),
+            "garbage": get_config("render", "garbage", default=3),
+        }
+        if self.backend == "fitz":
+            return FitzRenderer(
+                font_path,
+                font_name,
+                redactor=self.redactor if with_redactor else None,
+                **options,
+            )
+        return ReportlabRenderer(font_path, font_name, **options)
+
+    def _open_checkpoint(
+        self, source_language: str, target_language: str
+    ) -> CheckpointStore | None:
+        if not self.checkpoint_dir:
+            return None
+        return CheckpointStore.for_job(
+            self.checkpoint_dir, self.pdf_path, source_language, target_language
+        )
+
+    def _iter_pages(self, doc: fitz.Document, checkpoint: CheckpointStore = None):
+        """
+        Yield (page_num, blocks), reusing checkpointed pages whose content is unchanged.
+        """
+        if checkpoint is None:
+            yield from self.text_extractor.iter_pages(doc)
+            return
+
+        for page_num in range(len(doc)):
+            page = doc.load_page(page_num)
+            page_hash = page_content_hash(page)
+            blocks = checkpoint.load_page(page_num, page_hash)
+            if blocks is None:
+                blocks = self.text_extractor.extract_page(page, doc)
+                checkpoint.save_page(page_num, page_hash, blocks)
+            else:
+                for block in blocks:
+                    block["image"] = BlockImage(
+                        self.pdf_path,
+                        page_num,
+                        block["bbox"],
+                        self.text_extractor.DPI,
+                        doc,
+                    )
+            yield page_num, blocks
+
+    def _translate(
+        self,
+        pdf_info: dict,
+        source_language: str,
+        target_language: str,
+        checkpoint: CheckpointStore = None,
+    ):
+        """
+        Translate `pdf_info` in place, skipping and recording checkpointed blocks.
+        """
+        on_batch_done = None
+        if checkpoint is not None:
+            texts = {}
+            for page_num, page_info in pdf_info.items():
+                for block in page_info:
+                    translated_text = checkpoint.get_translation(
+                        page_num, block["block_num"], block["text"]
+                    )
+                    if translated_text is not None:
+                        block["translated_text"] = translated_text
+                    texts[(page_num, block["block_num"])] = block["text"]
+
+            def on_batch_done(batch_results):
+                for (page_num, block_num), translated_text in batch_results:
+                    checkpoint.save_translation(
+                        page_num, block_num, texts[(page_num, block_num)], translated_text
+                    )
+
+        self.translation_engine.translate_pdf_info(
+            pdf_info,
+            source_language=source_language,
+            target_language=target_language,
+            on_batch_done=on_batch_done,
+        )
 
     def invoke(self):
+        source_language, target_language = self.source_language, self.target_language
+        checkpoint = self._open_checkpoint(source_language, target_language)
+
         # Step 1: Extract text from the PDF
-        pdf_info = self.text_extractor.extract_text()
+        with metrics.timer("stage_extract"):
+            # The OCR extractor runs its own process pool over scanned pages
+            if self.parallel and not self.use_ocr:
+                pdf_info = self.parallel.extract_text(
+                    self.pdf_path,
+                    dpi=self.text_extractor.DPI,
+                    layout_detector=self.layout_detector,
+                )
+            else:
+                with self.pdf_lock:
+                    pdf_info = dict(
+                        self._iter_pages(fitz.open(self.pdf_path), checkpoint)
+                    )
+        if self.use_block_table and not isinstance(pdf_info, PdfInfoView):
+            pdf_info = BlockTable.from_pdf_info(
+                pdf_info, self.pdf_path, self.text_extractor.DPI
+            ).view()
+        elif not self.use_block_table and isinstance(pdf_info, PdfInfoView):
+            pdf_info = pdf_info.table.to_pdf_info()
+        metrics.incr("pages_extracted", len(pdf_info))
+        if self.repeated_elements is not None:
+            self.repeated_elements.detect(pdf_info, scope=self.pdf_path)
 
         # Step 2: Redact the text
-        redacted_pdf_path = self.redactor.redact(
-            pdf_info, self.pdf_path, self.output_path
-        )
+        with metrics.timer("stage_redact"):
+            if self.backend == "fitz":
+                # Background fills are drawn together with the text in draw_pdf
+                redacted_pdf_path = self.pdf_path
+            elif self.parallel:
+                redacted_pdf_path = self.parallel.redact(
+                    self.redactor, pdf_info, self.pdf_path, self.output_path
+                )
+            else:
+                with self.pdf_lock:
+                    redacted_pdf_path = self.redactor.redact(
+                        pdf_info, self.pdf_path, self.output_path
+                    )
 
-        # Step 3: Translate the text
+        # Step 3: Translate the text, many blocks per request
+        try:
+            with metrics.timer("stage_translate"):
+                self._translate(pdf_info, source_language, target_language, checkpoint)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+        with self.pdf_lock, fitz.open(self.pdf_path) as doc:
+            hashes = page_hashes(doc)
+        self.manifest = RunManifest(self.pdf_path, None, source_language, target_language)
         for page_num, page_info in pdf_info.items():
-            for block in page_info:
-                text = block["text"]
-
-                result: str = self.translator.translate(
-                    text,
-                    source_language="english",
-                    target_language="vietnamese",
-                )
-                block["translated_text"] = result
+            self.manifest.set_page(page_num, hashes[page_num], page_info)
+        logger.info(f"Extracted, redacted and translated {len(pdf_info)} pages")
         return pdf_info, redacted_pdf_path
 
     def draw_pdf(
@@ -66,75 +292,223 @@ class Pipeline:
         font_name: str,
         output_path: str = "output_pdf.pdf",
     ):
-        pdfmetrics.registerFont(TTFont(font_name, font_path))
-        # Read original PDF
-        reader = PdfReader(redacted_pdf_path)
-        writer = PdfWriter()
-
-        # For each page, create a transparent canvas with text
-
-        # Process each page
-        for page_number, page in enumerate(reader.pages):
-            block = pdf_info[page_number]
-            print(block)
-            # Get original page size
-            width = float(page.mediabox.width)
-            height = float(page.mediabox.height)
-
-            # Create a transparent PDF with the same size
-            packet = io.BytesIO()
-            can = canvas.Canvas(packet, pagesize=(width, height))
-
-            for text_item in block:
-                print(text_item["translated_text"])
-                print("====")
-                # Get the bounding box and text
-                bbox = text_item["bbox"]
-                x0, y0, x1, y1 = bbox
-                y_position = height - y0
-
-                can.setFont(font_name, text_item["font_size"])
-                can.setFillColor(
-                    int_to_rgb(text_item["font_color"])  # Convert int to RGB tuple
+        renderer = self._make_renderer(font_path, font_name)
+        self._record_output(output_path, font_path, font_name)
+        # Blocks whose translation had to shrink to fit their bbox
+        self.shrunk_blocks = renderer.layout.shrunk_blocks
+        with metrics.timer("stage_render"):
+            if self.parallel:
+                output_path = self.parallel.render(
+                    renderer, pdf_info, redacted_pdf_path, output_path
                 )
-                # Draw the text on the canvas line by line
-                for line in text_item["translated_text"].split('\n'):
-                    can.drawString(x0, y_position, line)
-                    y_position -= 15  # Decrease y position for next line
+            else:
+                with self.pdf_lock:
+                    output_path = renderer.render(pdf_info, redacted_pdf_path, output_path)
+        logger.info(
+            f"Rendered {output_path}; {len(self.shrunk_blocks)} blocks shrunk to fit"
+        )
+        return output_path
+
+    def _record_output(self, output_path: str, font_path: str, font_name: str):
+        if self.manifest is not None:
+            self.manifest.output_path = output_path
+            self.manifest.render = {
+                "backend": self.backend,
+                "font": os.path.basename(font_path),
+                "font_name": font_name,
+            }
 
-                # can.drawString(x0, height - y0, text_item["translated_text"])
-                break
+    def update(
+        self,
+        previous: "RunManifest | str",
+        font_path: str,
+        font_name: str,
+        output_path: str = "output_pdf.pdf",
+    ) -> str:
+        """
+        Translate a revised PDF by diffing it against a previous run's manifest.
 
-            can.save()
-            packet.seek(0)
+        Pages whose content hash is unchanged are copied from the previous
+        translated output. Only the other pages are extracted, redacted and
+        rendered, and of their blocks only those with text not translated
+        before are sent to the translator. Returns the output path; the new
+        run's manifest is left in `self.manifest`.
+        """
+        if isinstance(previous, str):
+            previous = RunManifest.load(previous)
+        source_language, target_language = self.source_language, self.target_language
+        with self.pdf_lock, fitz.open(self.pdf_path) as doc:
+            hashes = page_hashes(doc)
 
-            # Read the overlay PDF
-            overlay_pdf = PdfReader(packet)
-            overlay_page = overlay_pdf.pages[0]
+        same_languages = (previous.source_language, previous.target_language) == (
+            source_language,
+            target_language,
+        )
+        self.manifest = RunManifest(self.pdf_path, None, source_language, target_language)
+        self._record_output(output_path, font_path, font_name)
+        # Copied pages must look like the rest: same languages, backend and font
+        if (
+            same_languages
+            and previous.render == self.manifest.render
+            and previous.output_path
+            and os.path.exists(previous.output_path)
+        ):
+            page_map = previous.match_pages(hashes)
+        else:
+            logger.warning(
+                f"Previous output of {previous.input_path} cannot be reused as is; "
+                "re-rendering every page"
+            )
+            page_map = {}
+        changed = [page_num for page_num in range(len(hashes)) if page_num not in page_map]
+        metrics.incr("incremental_pages_copied", len(page_map))
+        metrics.incr("incremental_pages_changed", len(changed))
 
-            # Merge the overlay onto the original page
-            page.merge_page(overlay_page)
-            writer.add_page(page)
+        # Extract the changed pages and reuse every translation seen before
+        with self.pdf_lock, metrics.timer("stage_extract"), fitz.open(self.pdf_path) as doc:
+            pdf_info = {
+                page_num: self.text_extractor.extract_page(doc.load_page(page_num))
+                for page_num in changed
+            }
+        translations = previous.translations() if same_languages else {}
+        known_blocks = previous.block_hashes()
+        reused = unchanged = 0
+        for page_info in pdf_info.values():
+            for block in page_info:
+                # Same text, bbox and style as before, or same text moved
+                unchanged += block_hash(block) in known_blocks
+                translated_text = translations.get(text_hash(block["text"]))
+                if translated_text is not None:
+                    block["translated_text"] = translated_text
+                    reused += 1
+        metrics.incr("incremental_blocks_unchanged", unchanged)
+        metrics.incr("incremental_blocks_reused", reused)
+        with metrics.timer("stage_translate"):
+            self._translate(pdf_info, source_language, target_language)
 
-        # Save the final PDF
-        with open(output_path, "wb") as f:
-            writer.write(f)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rendered_path = os.path.join(tmp_dir, "changed.pdf")
+            if changed:
+                renderer = self._make_renderer(font_path, font_name)
+                self.shrunk_blocks = renderer.layout.shrunk_blocks
+                with self.pdf_lock, metrics.timer("stage_render"):
+                    source_path = self.pdf_path
+                    if self.backend != "fitz":
+                        source_path = self.redactor.redact(
+                            pdf_info, self.pdf_path, os.path.join(tmp_dir, "redacted.pdf")
+                        )
+                    renderer.render(pdf_info, source_path, rendered_path, pages=changed)
+            rendered_pages = {page_num: index for index, page_num in enumerate(changed)}
+            sources = [
+                (rendered_path, rendered_pages[page_num])
+                if page_num in rendered_pages
+                else (previous.output_path, page_map[page_num])
+                for page_num in range(len(hashes))
+            ]
+            with self.pdf_lock:
+                assemble(output_path, sources)
 
+        for page_num, page_hash in enumerate(hashes):
+            if page_num in pdf_info:
+                self.manifest.set_page(page_num, page_hash, pdf_info[page_num])
+            else:
+                self.manifest.copy_page(page_num, previous.pages[page_map[page_num]])
+        logger.info(
+            f"Updated {output_path}: {len(changed)} of {len(hashes)} pages changed, "
+            f"{unchanged} of their blocks unchanged, "
+            f"{reused} blocks reused a previous translation"
+        )
         return output_path
 
+    def stream(
+        self,
+        font_path: str,
+        font_name: str,
+        output_path: str = "output_pdf.pdf",
+        window_size: int = 8,
+        source_language: str = None,
+        target_language: str = None,
+    ):
+        """
+        Run extraction, translation, redaction and rendering page by page.
+
+        This is a generator: it yields each page number once that page has
+        been written to `output_path`. At most `window_size` pages of
+        extracted data are held in memory; each window is translated in
+        one batched pass and appended to the output with an incremental save.
+        """
+        source_language = source_language or self.source_language
+        target_language = target_language or self.target_language
+        renderer = self._make_renderer(font_path, font_name, with_redactor=False)
+        self.shrunk_blocks = renderer.layout.shrunk_blocks
+        checkpoint = self._open_checkpoint(source_language, target_language)
+        self.manifest = RunManifest(self.pdf_path, None, source_language, target_language)
+        self._record_output(output_path, font_path, font_name)
+        with self.pdf_lock:
+            doc = fitz.open(self.pdf_path)
+        writer = IncrementalPdfWriter(output_path)
+        pages = self._iter_pages(doc, checkpoint)
+
+        try:
+            while True:
+                with self.pdf_lock:
+                    window_info = dict(islice(pages, window_size))
+                if not window_info:
+                    break
+                # Keys match across windows, so later windows reuse earlier work
+                if self.repeated_elements is not None:
+                    self.repeated_elements.detect(window_info, scope=self.pdf_path)
+
+                with metrics.timer("stage_translate"):
+                    self._translate(
+                        window_info, source_language, target_language, checkpoint
+                    )
+
+                # Redact and render a copy of the window, leaving the source untouched
+                with self.pdf_lock:
+                    first_page, last_page = min(window_info), max(window_info)
+                    chunk = fitz.open()
+                    chunk.insert_pdf(doc, from_page=first_page, to_page=last_page)
+                    for page_num, page_info in window_info.items():
+                        page = chunk.load_page(page_num - first_page)
+                        # Background colors are sampled from the original page
+                        self.redactor.redact_page(page, page_info)
+                        renderer.render_page(page, page_info)
+                    # Incremental appends cannot subset afterwards; each window
+                    # carries a subset of the glyphs its own pages use
+                    if renderer.subset_fonts:
+                        subset_fonts(chunk)
+
+                    with metrics.timer("append_output"):
+                        writer.append(chunk)
+                    chunk.close()
+                    for page_num, page_info in window_info.items():
+                        self.manifest.set_page(
+                            page_num, page_content_hash(doc.load_page(page_num)), page_info
+                        )
+                yield from window_info
+        finally:
+            with self.pdf_lock:
+                writer.close()
+                doc.close()
+            if checkpoint is not None:
+                checkpoint.close()
+
 
 if __name__ == "__main__":
-    # Example usage
-    pdf_path = "1st.pdf"
-    output_path = "redacted_1st.pdf"
-    font_path = (
-        "/home/phongmt1/phongmt1/project/pdf_translation/font_family/Roboto-Regular.ttf"
+    # Example usage; see `python -m src.cli --help` for all options. Without
+    # arguments, translates a synthetic PDF with the offline stub translator
+    import sys
+
+    from src.cli import main
+
+    if sys.argv[1:]:
+        sys.exit(main(sys.argv[1:]))
+    from src.utils.synthetic_pdf import make_synthetic_pdf
+
+    tmp_dir = tempfile.gettempdir()
+    input_pdf_path = make_synthetic_pdf(os.path.join(tmp_dir, "synthetic.pdf"), pages=5)
+    output_pdf_path = os.path.join(tmp_dir, "translated_synthetic.pdf")
+    sys.exit(
+        main([input_pdf_path, output_pdf_path, "--translator", "stub", "--metrics", "json"])
     )
-    font_name = "Roboto-Regular"
-    pipeline = Pipeline(pdf_path, output_path)
-    pdf_info, redacted_pdf_path = pipeline.invoke()
-
-    # print(f"PDF Info: {pdf_info}")
-    # print(f"Redacted PDF saved at: {redacted_pdf_path}")
-    # Draw the translated text on the redacted PDF
-    output_path = pipeline.draw_pdf(pdf_info, redacted_pdf_path, font_path, font_name)
@@ -0,0 +1,411 @@
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+
+from src.utils.config_utils import get_config
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+DURATION_PART = re.compile(r"([\d.]+)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling a provider that keeps failing.
+    """
+
+
+def parse_duration(value: str) -> float | None:
+    """
+    Parse rate-limit reset values such as "20ms", "1s" or "6m0s" into seconds.
+    """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = DURATION_PART.findall(value)
+        if not parts:
+            return None
+        return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _status_code(error: Exception) -> int | None:
+    return getattr(error, "status_code", None) or getattr(error, "code", None)
+
+
+def _error_headers(error: Exception):
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` tokens a minute.
+
+    `reserve` takes tokens even when the bucket runs dry and returns how
+    long the caller has to wait for them, so waiting happens outside the
+    lock and works the same for threads (`time.sleep`) and asyncio tasks
+    (`asyncio.sleep`).
+    """
+
+    def __init__(self, per_minute: float):
+        self._lock = threading.Lock()
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= min(amount, self.capacity)
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def set_limit(self, per_minute: float):
+        with self._lock:
+            if per_minute > 0 and per_minute != self.capacity:
+                self._refill(time.monotonic())
+                self.capacity = per_minute
+                self.rate = per_minute / 60
+
+    def sync(self, remaining: float, reset_seconds: float = None):
+        """
+        Align the bucket with what the server reports as remaining.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_seconds:
+                self.paused_until = max(self.paused_until, now + reset_seconds)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """
+    Stop calling a provider after `failure_threshold` consecutive failures.
+
+    While open, calls fail fast with CircuitOpenError. After `reset_timeout`
+    seconds one trial call is let through (half-open); its success closes
+    the circuit, and any failure of it, a 429 or client error included,
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self._lock = threading.Lock()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError while open; return whether this call is the trial.
+
+        A trial must end in `record_success` or `record_failure`, or every
+        later call is rejected.
+        """
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self.trial_running):
+                raise CircuitOpenError(
+                    f"Circuit open after {self.failures} consecutive failures"
+                )
+            if state == "half_open":
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    logger.warning(f"Opening circuit after {self.failures} failures")
+                    metrics.incr("circuit_opened")
+                self.opened_at = time.monotonic()
+
+
+class RateLimiter:
+    """
+    Shared request and token budget for one provider, with retries.
+
+    Every call first reserves one request and its estimated tokens from two
+    token buckets (requests/min and tokens/min). Limits and remaining
+    budgets reported in `x-ratelimit-*` response headers are fed back
+    through `update_from_headers`, and `Retry-After` pauses all callers.
+    Retryable failures (429, 5xx, timeouts, connection errors) are retried
+    with jittered exponential backoff; server and connection failures also
+    feed a circuit breaker. The same instance can be shared by threads
+    (`call`) and asyncio tasks (`call_async`) of one process.
+
+    Args:
+        requests_per_minute (float): Initial request budget.
+        tokens_per_minute (float): Initial token budget.
+        max_retries (int): Retries per call after the first attempt.
+        base_delay (float): First backoff delay, in seconds.
+        max_delay (float): Upper bound of a backoff delay, in seconds.
+        breaker (CircuitBreaker): Circuit breaker shared by all calls.
+        retry_exceptions (tuple): Extra exception types to retry.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 30000,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        breaker: CircuitBreaker = None,
+        retry_exceptions: tuple = (),
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_exceptions = (TimeoutError, ConnectionError, *retry_exceptions)
+
+    @classmethod
+    def from_config(cls, retry_exceptions: tuple = ()) -> "RateLimiter":
+        return cls(
+            requests_per_minute=get_config("rate_limit", "requests_per_minute", default=500),
+            tokens_per_minute=get_config("rate_limit", "tokens_per_minute", default=30000),
+            max_retries=get_config("rate_limit", "max_retries", default=6),
+            breaker=CircuitBreaker(
+                failure_threshold=get_config("rate_limit", "failure_threshold", default=5),
+                reset_timeout=get_config("rate_limit", "reset_timeout", default=30.0),
+            ),
+            retry_exceptions=retry_exceptions,
+        )
+
+    def _reserve(self, tokens: int) -> float:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            metrics.observe("rate_limit_wait", wait)
+        return wait
+
+    def acquire(self, tokens: int = 1):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 1):
+        import asyncio
+
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """
+        Adapt both buckets to OpenAI-style `x-ratelimit-*` headers.
+        """
+        if not headers:
+            return
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            if limit is not None:
+                bucket.set_limit(float(limit))
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is not None:
+                bucket.sync(
+                    float(remaining),
+                    parse_duration(headers.get(f"x-ratelimit-reset-{kind}")),
+                )
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return _status_code(error) in RETRY_STATUSES or isinstance(
+            error, self.retry_exceptions
+        )
+
+    def _record_failure(self, error: Exception, trial: bool):
+        """
+        Feed a failed attempt to the circuit breaker.
+
+        Server and connection failures count towards opening it; any failure
+        of the half-open trial, a 429 or client error included, reopens it.
+        """
+        rate_limited = _status_code(error) == 429
+        if rate_limited:
+            metrics.incr("rate_limited")
+        if trial or (self._is_retryable(error) and not rate_limited):
+            self.breaker.record_failure()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """
+        Return how long to wait before retrying a failed attempt.
+        """
+        headers = _error_headers(error)
+        self.update_from_headers(headers)
+
+        # Full jitter keeps many workers from retrying in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after:
+            # Everyone sharing the limiter waits, not only this caller
+            self.requests.pause(retry_after)
+            delay = max(delay, retry_after)
+        metrics.incr("translation_retries")
+        logger.warning(f"Retrying in {delay:.2f}s after {type(error).__name__}: {error}")
+        return delay
+
+    def call(self, fn, *args, tokens: int = 1, **kwargs):
+        """
+        Call `fn(*args, **kwargs)` within the budget, retrying transient failures.
+        """
+        for attempt in range(self.max_retries + 1):
+            trial = self.breaker.before_call()
+            try:
+                self.acquire(tokens)
+                result = fn(*args, **kwargs)
+            except Exception as error:
+                self._record_failure(error, trial)
+                if attempt == self.max_retries or not self._is_retryable(error):
+                    raise
+                time.sleep(self._backoff(attempt, error))
+                continue
+            except BaseException:
+                # An interrupted trial must not leave the circuit half-open
+                if trial:
+                    self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def call_async(self, fn, *args, tokens: int = 1, **kwargs):
+        """
+        Async counterpart of `call` for a coroutine function `fn`.
+        """
+        import asyncio
+
+        for attempt in range(self.max_retries + 1):
+            trial = self.breaker.before_call()
+            try:
+                await self.acquire_async(tokens)
+                result = await fn(*args, **kwargs)
+            except Exception as error:
+                self._record_failure(error, trial)
+                if attempt == self.max_retries or not self._is_retryable(error):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, error))
+                continue
+            except BaseException:
+                # A cancelled trial must not leave the circuit half-open
+                if trial:
+                    self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            return result
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter(provider: str = "openai", retry_exceptions: tuple = ()) -> RateLimiter:
+    """
+    Process-wide limiter of a provider, shared by every translator and job.
+    """
+    return RateLimiter.from_config(retry_exceptions=retry_exceptions)
+
+
+if __name__ == "__main__":
+    # Drive the limiter against a local server that injects 429s and latency
+    import asyncio
+    import json
+    import urllib.error
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    error_rate, latency = 0.3, 0.02
+
+    class FakeProvider(BaseHTTPRequestHandler):
+        def do_POST(self):
+            time.sleep(random.uniform(0, 2 * latency))
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if random.random() < error_rate:
+                self.send_response(429)
+                self.send_header("retry-after", "0.05")
+                self.send_header("x-ratelimit-remaining-requests", "0")
+                self.send_header("x-ratelimit-reset-requests", "50ms")
+                body = b'{"error": "rate limited"}'
+            else:
+                self.send_response(200)
+                self.send_header("x-ratelimit-limit-requests", "1200")
+                self.send_header("x-ratelimit-remaining-requests", "100")
+                body = b'{"ok": true}'
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/responses"
+    limiter = RateLimiter(requests_per_minute=1200, max_retries=10, base_delay=0.01, max_delay=0.2)
+
+    def post():
+        request = urllib.request.Request(url, data=json.dumps({}).encode(), method="POST")
+        with urllib.request.urlopen(request, timeout=5) as response:
+            limiter.update_from_headers(response.headers)
+            return json.load(response)
+
+    async def post_async():
+        return await asyncio.to_thread(post)
+
+    async def run_tasks(n):
+        return await asyncio.gather(
+            *(limiter.call_async(post_async, tokens=100) for _ in range(n))
+        )
+
+    n = 100
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: limiter.call(post, tokens=100), range(n)))
+    results += asyncio.run(run_tasks(n))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    assert all(result == {"ok": True} for result in results)
+    counters = metrics.snapshot()["counters"]
+    print(
+        f"{len(results)} calls in {elapsed:.2f}s ({len(results) / elapsed * 60:.0f}/min), "
+        f"{counters.get('rate_limited', 0)} x 429, {counters.get('translation_retries', 0)} retries"
+    )
@@ -1,7 +1,19 @@
 import fitz  # PyMuPDF
-from src.translator import OpenAITranslator
+from functools import lru_cache
 
-translator = OpenAITranslator()
+from src.layout import LayoutEngine
+from src.utils.fonts import font_buffer, subset_fonts
+from src.utils.log_utils import get_logger
+from src.translator import get_translator
+from src.translation_memory import CachedTranslator, TranslationMemory
+
+logger = get_logger(__file__)
+
+
+@lru_cache(maxsize=1)
+def get_cached_translator() -> CachedTranslator:
+    # Built on first use so importing this module stays cheap
+    return CachedTranslator(get_translator(), TranslationMemory.from_config())
 
 # Convert integer color to RGB tuple (0-1 range)
 def int_to_rgb(color_int):
@@ -13,7 +25,7 @@ def int_to_rgb(color_int):
 # Normalize the bounding box coordinates
 def normalize_rect(rect):
     if rect.y1 < rect.y0:  # If Y-values are inverted
-        print("change y1 and y0")
+        logger.debug("change y1 and y0")
         rect.y0, rect.y1 = rect.y1, rect.y0
     # Make sure the rectangle is within the page bounds
     rect.x0 = max(rect.x0, 0)
@@ -22,6 +34,9 @@ def normalize_rect(rect):
 
 def redact_and_reverse_text_preserve_style(input_pdf_path, output_pdf_path, font_path=None):
     doc = fitz.open(input_pdf_path)
+    translator = get_cached_translator()
+    # Wrap and shrink translations to their span rect instead of letting insert_text fail
+    layout_engine = LayoutEngine(font_path, keep_line_breaks=True) if font_path else None
 
     # Load custom font if provided
     # custom_font = None
@@ -51,7 +66,7 @@ def redact_and_reverse_text_preserve_style(input_pdf_path, output_pdf_path, font
 
                     # Reverse the text or translate it
                     translated_text = translator.translate(text, target_language="chinese")
-                    print(translated_text)
+                    logger.debug("%s -> %s", text, translated_text)
                     # Save span details for later use
                     reversed_spans.append({
                         "rect": rect,
@@ -63,14 +78,32 @@ def redact_and_reverse_text_preserve_style(input_pdf_path, output_pdf_path, font
 
         # Apply redactions after removing the original text
         page.apply_redactions()
+        # Embed the font once per page (once per document in the file) rather
+        # than passing the font file to every insert_text call
+        if font_path and reversed_spans:
+            page.insert_font(fontname="microsoft-yahei", fontbuffer=font_buffer(font_path))
 
         # Reinsert the reversed text at the same coordinates with the same font, size, and color
         for span in reversed_spans:
+            if layout_engine is not None:
+                layout = layout_engine.fit(
+                    span["text"], tuple(span["rect"]), span["size"], key=page.number
+                )
+                for line, baseline in zip(layout.lines, layout.baselines(span["rect"].y0)):
+                    page.insert_text(
+                        (span["rect"].x0, baseline),
+                        line,
+                        fontname="microsoft-yahei",
+                        fontsize=layout.font_size,
+                        color=span["color"],
+                        overlay=True
+                    )
+                continue
+
             result = page.insert_text(
                 (span["rect"].x0, span["rect"].y1),
                 span["text"],
                 fontname="microsoft-yahei",
-                fontfile=font_path,
                 # fontname=span["font"] if custom_font is None else custom_font.name,  # Use custom font
                 fontsize=span["size"],
                 color=span["color"],
@@ -78,17 +111,35 @@ def redact_and_reverse_text_preserve_style(input_pdf_path, output_pdf_path, font
             )
             # Check if the text is correctly inserted
             if result < 0:
-                print(f"Text did not fit in rect: {span['rect']} for text: {span['text']}")
+                logger.warning(f"Text did not fit in rect: {span['rect']} for text: {span['text']}")
 
-    # Save the final PDF
-    doc.save(output_pdf_path)
+    # Save the final PDF with one subset copy of the font
+    if font_path:
+        subset_fonts(doc)
+    doc.save(output_pdf_path, garbage=3, deflate=True)
     doc.close()
-    print(f"Redacted and reversed PDF saved to: {output_pdf_path}")
+    if layout_engine is not None:
+        logger.info(f"{len(layout_engine.shrunk_blocks)} spans were shrunk to fit their rect")
+    logger.info(f"Redacted and reversed PDF saved to: {output_pdf_path}")
 
 if __name__ == "__main__":
-    input_pdf_path = "1st.pdf"  # Path to the input PDF file
-    output_pdf_path = "trans_output_redacted.pdf"  # Path to save the redacted PDF file
-    font_path = "/home/phongmt1/phongmt1/project/pdf_translation/font_family/Microsoft_Yahei.ttf"
+    # python -m src.redact [input.pdf] [output.pdf]; defaults to a synthetic PDF
+    import os
+    import sys
+    import tempfile
+
+    from src.utils.synthetic_pdf import make_synthetic_pdf
+
+    tmp_dir = tempfile.gettempdir()
+    if len(sys.argv) > 1:
+        input_pdf_path = sys.argv[1]
+    else:
+        input_pdf_path = make_synthetic_pdf(os.path.join(tmp_dir, "synthetic.pdf"), pages=2)
+    # Path to save the redacted PDF file
+    output_pdf_path = (
+        sys.argv[2] if len(sys.argv) > 2 else os.path.join(tmp_dir, "trans_output_redacted.pdf")
+    )
+    font_path = os.path.join(
+        os.path.dirname(__file__), "..", "font_family", "Roboto-Regular.ttf"
+    )
     redact_and_reverse_text_preserve_style(input_pdf_path, output_pdf_path, font_path=font_path)
-
-
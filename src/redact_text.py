@@ -1,8 +1,10 @@
+import os
 from PIL import Image
-from collections import Counter
+from collections import Counter, OrderedDict
 import fitz  # PyMuPDF
 
-from src.text_extraction import TextExtractor
+from src.text_extraction import BlockImage, TextExtractor
+from src.utils.metrics import metrics
 
 
 class BaseRedactor:
@@ -11,18 +13,41 @@ class BaseRedactor:
 
 
 class Redactor(BaseRedactor):
-    def _get_background_color(self, image: Image):
+    def __init__(
+        self,
+        sample_dpi: int = 72,
+        background: str = "ring",
+        tolerance: int = 8,
+        max_cached_colors: int = 4096,
+    ):
+        # Background sampling does not need a full-resolution render
+        self.sample_dpi = sample_dpi
+        # "ring": border-ring histogram over one page render for all blocks;
+        # "corners": per-block vote of the four corner pixels
+        self.background = background
+        self.tolerance = tolerance
+        # Fill colors of repeated blocks (headers, footers), by repeat_key
+        self.max_cached_colors = max_cached_colors
+        self._repeat_colors = OrderedDict()
+
+    def _get_background_color(self, image: BlockImage | Image.Image):
         """
         Get the background color of the image.
         """
-        # Get image dimensions
-        width, height = image.size
-
-        # Extract colors from the 4 corners
-        top_left = image.getpixel((0, 0))
-        top_right = image.getpixel((width - 1, 0))
-        bottom_left = image.getpixel((0, height - 1))
-        bottom_right = image.getpixel((width - 1, height - 1))
+        if isinstance(image, BlockImage):
+            # Sample the corners straight from a low-resolution pixmap
+            top_left, top_right, bottom_left, bottom_right = image.corner_pixels(
+                self.sample_dpi
+            )
+        else:
+            # Get image dimensions
+            width, height = image.size
+
+            # Extract colors from the 4 corners
+            top_left = image.getpixel((0, 0))
+            top_right = image.getpixel((width - 1, 0))
+            bottom_left = image.getpixel((0, height - 1))
+            bottom_right = image.getpixel((width - 1, height - 1))
 
         # Convert to HEX
         top_left_hex = self.rgb_to_hex(top_left)
@@ -67,41 +92,104 @@ class Redactor(BaseRedactor):
 
         return (r, g, b)
 
+    def redact_page(self, page: fitz.Page, page_info: list):
+        """
+        Paint the background color over every block of a single page.
+        """
+        with metrics.timer("redact_page"):
+            self._redact_page(page, page_info)
+
+    def _redact_page(self, page: fitz.Page, page_info: list):
+        # Repeated blocks reuse the color estimated on their first page; a page
+        # holding nothing else is not rendered at all
+        colors = [
+            self._repeat_colors.get(block.get("repeat_key")) for block in page_info
+        ]
+        todo = [block for block, color in zip(page_info, colors) if color is None]
+        metrics.incr("repeat_color_hits", len(page_info) - len(todo))
+        if not todo:
+            estimated = []
+        elif self.background == "ring":
+            from src.background import estimate_background_colors
+
+            # Estimate every fill before drawing, from a single page render
+            estimated = estimate_background_colors(
+                page,
+                [block["bbox"] for block in todo],
+                dpi=self.sample_dpi,
+                tolerance=self.tolerance,
+            )
+        else:
+            estimated = [
+                self.hex_to_rgb(self._get_background_color(block["image"]))
+                for block in todo
+            ]
+        for block, color in zip(todo, estimated):
+            if block.get("repeat_key") is not None:
+                self._repeat_colors[block["repeat_key"]] = color
+                if len(self._repeat_colors) > self.max_cached_colors:
+                    self._repeat_colors.popitem(last=False)
+        estimated = iter(estimated)
+        colors = [color if color is not None else next(estimated) for color in colors]
+
+        self.fill_blocks(page, [block["bbox"] for block in page_info], colors)
+
+    def fill_blocks(self, page: fitz.Page, bboxes: list, colors: list):
+        """
+        Paint flat rectangles of (R, G, B) colors over blocks with a single shape.
+        """
+        if not bboxes:
+            return
+        shape = page.new_shape()
+        for bbox, (red, green, blue) in zip(bboxes, colors):
+            shape.draw_rect(fitz.Rect(bbox))
+            shape.finish(
+                fill=(red / 255, green / 255, blue / 255), fill_opacity=1.0, width=0
+            )
+        shape.commit()
+
+    def fill_block(self, page: fitz.Page, bbox: tuple, color: tuple):
+        """
+        Paint a flat rectangle of an (R, G, B) color over a block.
+        """
+        red, green, blue = color
+        x0, y0, x1, y1 = bbox
+        rect = fitz.Rect(x0, y0, x1, y1)
+
+        # draw new shape
+        shape = page.new_shape()
+        shape.draw_rect(rect)
+        shape.finish(
+            fill=(red / 255, green / 255, blue / 255), fill_opacity=1.0, width=0
+        )
+        shape.commit()
+
     def redact(self, pdf_info: dict, pdf_path: str, output_path: str):
         doc = fitz.open(pdf_path)
 
         for page_num, page_info in pdf_info.items():
             page = doc.load_page(int(page_num))
+            self.redact_page(page, page_info)
 
-            for block in page_info:
-                bbox = block["bbox"]
-                x0, y0, x1, y1 = bbox
-                rect = fitz.Rect(x0, y0, x1, y1)
-                image = block["image"]
-
-                # Get the background color
-                background_color = self._get_background_color(image)
-
-                # Convert to RGB
-                red, green, blue = self.hex_to_rgb(background_color)
-
-                # draw new shape
-                shape = page.new_shape()
-                shape.draw_rect(rect)
-                shape.finish(
-                    fill=(red / 255, green / 255, blue / 255), fill_opacity=1.0, width=0
-                )
-                shape.commit()
-
-        doc.save(output_path)
+        with metrics.timer("save_redacted_pdf"):
+            doc.save(output_path)
+        metrics.incr("bytes_written", os.path.getsize(output_path))
 
         return output_path
 
-
 if __name__ == "__main__":
-    # Example usage
-    pdf_path = "1st.pdf"
-    output_path = "redacted_1st.pdf"
+    # python -m src.redact_text [input.pdf] [output.pdf]; defaults to a synthetic PDF
+    import sys
+    import tempfile
+
+    from src.utils.synthetic_pdf import make_synthetic_pdf
+
+    tmp_dir = tempfile.gettempdir()
+    if len(sys.argv) > 1:
+        pdf_path = sys.argv[1]
+    else:
+        pdf_path = make_synthetic_pdf(os.path.join(tmp_dir, "synthetic.pdf"), pages=2)
+    output_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tmp_dir, "redacted.pdf")
     text_extractor = TextExtractor(pdf_path)
     pdf_info = text_extractor.extract_text()
 
@@ -0,0 +1,524 @@
+import io
+import logging
+import os
+import time
+
+import fitz  # PyMuPDF
+from reportlab.pdfgen import canvas
+from pypdf import PdfReader, PdfWriter
+
+from src.layout import LayoutEngine
+from src.utils.fonts import compact_pdf, font_buffer, register_reportlab_font, subset_fonts
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+
+def int_to_rgb(color_int: int) -> tuple:
+    """
+    Convert an integer to an (R, G, B) tuple.
+
+    Args:
+        color_int (int): Integer representing the color.
+
+    Returns:
+        tuple: (R, G, B)
+    """
+    r = (color_int >> 16) & 0xFF
+    g = (color_int >> 8) & 0xFF
+    b = color_int & 0xFF
+    return (r / 255, g / 255, b / 255)
+
+
+class BaseRenderer:
+    def render_page(self, page: fitz.Page, page_info: list):
+        """
+        Draw the translated blocks of one page onto an open fitz page.
+        """
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def render(
+        self,
+        pdf_info: dict,
+        pdf_path: str,
+        output_path: str,
+        pages: range = None,
+    ) -> str:
+        raise NotImplementedError("Subclasses should implement this method.")
+
+
+class ReportlabRenderer(BaseRenderer):
+    """
+    Draw translated text with reportlab and merge it onto the redacted PDF with pypdf.
+
+    The overlays of all pages are drawn on one reportlab canvas, so the
+    font is embedded once as a subset shared by every page instead of
+    once per page. The renderer only holds the font path and name, so it
+    can be pickled and sent to worker processes.
+
+    Args:
+        font_path (str): Path to the TTF font embedded for the translated text.
+        font_name (str): Name the font is registered under.
+        subset_fonts (bool): Subset all fonts of the output to the glyphs used.
+        garbage (int): Garbage-collection level of the final rewrite; 4 also
+            merges duplicate streams. With `subset_fonts` off, 0 keeps the
+            file as pypdf wrote it.
+    """
+
+    def __init__(
+        self, font_path: str, font_name: str, subset_fonts: bool = True, garbage: int = 3
+    ):
+        self.font_path = font_path
+        self.font_name = font_name
+        self.subset_fonts = subset_fonts
+        self.garbage = garbage
+        self.layout = LayoutEngine(font_path)
+
+    def register_font(self):
+        # Parsed and registered once per process
+        register_reportlab_font(self.font_name, self.font_path)
+
+    def _draw_page(
+        self, can: canvas.Canvas, page_info: list, height: float, page_num: int = None
+    ):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for text_item in page_info:
+            if debug:
+                logger.debug(
+                    "page %s block %d: %s",
+                    page_num,
+                    text_item["block_num"],
+                    text_item["translated_text"],
+                )
+            # Get the bounding box and text
+            bbox = text_item["bbox"]
+            x0, y0, x1, y1 = bbox
+            layout = self.layout.fit(
+                text_item["translated_text"],
+                bbox,
+                text_item["font_size"],
+                key=(page_num, text_item["block_num"]),
+            )
+
+            can.setFont(self.font_name, layout.font_size)
+            can.setFillColor(
+                int_to_rgb(text_item["font_color"])  # Convert int to RGB tuple
+            )
+            # Draw the wrapped text line by line (reportlab's y axis points up)
+            for line, baseline in zip(layout.lines, layout.baselines(y0)):
+                can.drawString(x0, height - baseline, line)
+
+    def draw_overlay(
+        self, page_info: list, width: float, height: float, page_num: int = None
+    ) -> bytes:
+        """
+        Draw the translated blocks of one page on a transparent single-page PDF.
+        """
+        return self.draw_overlays([(page_info, width, height, page_num)])
+
+    def draw_overlays(self, pages: list) -> bytes:
+        """
+        Draw many pages, as (page_info, width, height, page_num), into one PDF.
+        """
+        self.register_font()
+        packet = io.BytesIO()
+        can = canvas.Canvas(packet)
+        for page_info, width, height, page_num in pages:
+            can.setPageSize((width, height))
+            self._draw_page(can, page_info, height, page_num)
+            can.showPage()
+        can.save()
+        return packet.getvalue()
+
+    def render_page(self, page: fitz.Page, page_info: list):
+        with metrics.timer("render_page"):
+            self._render_page(page, page_info)
+
+    def _render_page(self, page: fitz.Page, page_info: list):
+        overlay = fitz.open(
+            stream=self.draw_overlay(
+                page_info, page.rect.width, page.rect.height, page.number
+            ),
+            filetype="pdf",
+        )
+        page.show_pdf_page(page.rect, overlay, 0)
+        overlay.close()
+
+    def _draw_reader_overlays(self, pdf_info: dict, reader: PdfReader, pages) -> bytes:
+        # Overlays have the same page sizes as the originals
+        with metrics.timer("draw_overlay"):
+            return self.draw_overlays(
+                [
+                    (
+                        pdf_info[page_number],
+                        float(reader.pages[page_number].mediabox.width),
+                        float(reader.pages[page_number].mediabox.height),
+                        page_number,
+                    )
+                    for page_number in pages
+                ]
+            )
+
+    def draw_document_overlay(
+        self, pdf_info: dict, redacted_pdf_path: str, overlay_path: str
+    ) -> str:
+        """
+        Draw the overlays of every page into `overlay_path`, for `render(overlay_path=...)`.
+
+        Page shards rendered against this one file share its font subset,
+        so merging them keeps a single copy of the font.
+        """
+        reader = PdfReader(redacted_pdf_path)
+        with open(overlay_path, "wb") as f:
+            f.write(self._draw_reader_overlays(pdf_info, reader, range(len(reader.pages))))
+        return overlay_path
+
+    def render(
+        self,
+        pdf_info: dict,
+        redacted_pdf_path: str,
+        output_path: str,
+        pages: range = None,
+        overlay_path: str = None,
+    ) -> str:
+        """
+        Merge the text overlays onto the redacted PDF and save it.
+
+        Only the pages in `pages` are written when it is given, which lets
+        worker processes render disjoint page ranges. `overlay_path` is a
+        PDF from `draw_document_overlay` to take the overlays from instead
+        of drawing them.
+        """
+        # Read original PDF
+        reader = PdfReader(redacted_pdf_path)
+        writer = PdfWriter()
+        pages = pages if pages is not None else range(len(reader.pages))
+
+        # Draw the overlays of all pages in one document, sharing one font subset
+        if overlay_path is None:
+            overlay_pdf = PdfReader(
+                io.BytesIO(self._draw_reader_overlays(pdf_info, reader, pages))
+            )
+            overlay_pages = overlay_pdf.pages
+        else:
+            overlay_pdf = PdfReader(overlay_path)
+            overlay_pages = [overlay_pdf.pages[page_number] for page_number in pages]
+
+        # Merge each overlay page onto its original page
+        for page_number, overlay_page in zip(pages, overlay_pages):
+            with metrics.timer("merge_page"):
+                page = reader.pages[page_number]
+                page.merge_page(overlay_page)
+                writer.add_page(page)
+
+        # Save the final PDF
+        with metrics.timer("save_output_pdf"), open(output_path, "wb") as f:
+            writer.write(f)
+        if self.subset_fonts or self.garbage:
+            compact_pdf(output_path, subset=self.subset_fonts, garbage=self.garbage)
+        metrics.incr("bytes_written", os.path.getsize(output_path))
+
+        return output_path
+
+
+class FitzRenderer(BaseRenderer):
+    """
+    Draw background fills and translated text in one open fitz document.
+
+    Unlike ReportlabRenderer there is no intermediate redacted PDF, no
+    per-page overlay document and no pypdf re-parse: when a redactor is
+    given, each page is redacted and written in the same pass and the
+    document is saved once. Blocks tagged with a `repeat_key` (see
+    RepeatedElements) are laid out once into a form XObject that every
+    page they appear on references.
+
+    Args:
+        font_path (str): Path to the TTF font embedded for the translated text.
+        font_name (str): Resource name of the font inside the PDF.
+        redactor: Optional Redactor whose `redact_page` runs before drawing.
+        garbage (int): Garbage-collection level passed to `Document.save`;
+            4 also merges duplicate streams.
+        deflate (bool): Compress streams on save.
+        subset_fonts (bool): Subset all fonts to the glyphs used before saving.
+        incremental (bool): Append changes to the input file instead of
+            writing a new one; `output_path` must then equal `pdf_path`.
+    """
+
+    def __init__(
+        self,
+        font_path: str,
+        font_name: str,
+        redactor=None,
+        garbage: int = 3,
+        deflate: bool = True,
+        incremental: bool = False,
+        subset_fonts: bool = True,
+    ):
+        self.font_path = font_path
+        self.font_name = font_name
+        self.redactor = redactor
+        self.garbage = garbage
+        self.deflate = deflate
+        self.incremental = incremental
+        self.subset_fonts = subset_fonts
+        self.layout = LayoutEngine(font_path)
+        # Repeated blocks: content stream drawn once per renderer, and the
+        # form XObject holding it in the document being rendered
+        self.repeat_margin = 4
+        self._repeat_streams = {}
+        self._xobject_doc = None
+        self._xobjects = {}
+
+    def __getstate__(self):
+        # Open documents cannot be pickled; each worker makes its own XObjects
+        state = self.__dict__.copy()
+        state["_xobject_doc"] = None
+        state["_xobjects"] = {}
+        return state
+
+    def render_page(self, page: fitz.Page, page_info: list):
+        with metrics.timer("render_page"):
+            self._render_page(page, page_info)
+
+    def _draw_block(
+        self, shape: fitz.Shape, text_item: dict, key: tuple, origin: tuple = (0, 0)
+    ):
+        """
+        Lay out one block's translation and add it to `shape`, shifted by -`origin`.
+        """
+        x0, y0, x1, y1 = text_item["bbox"]
+        layout = self.layout.fit(
+            text_item["translated_text"],
+            text_item["bbox"],
+            text_item["font_size"],
+            key=key,
+        )
+        for line, baseline in zip(layout.lines, layout.baselines(y0)):
+            shape.insert_text(
+                (x0 - origin[0], baseline - origin[1]),
+                line,
+                fontname=self.font_name,
+                fontsize=layout.font_size,
+                color=int_to_rgb(text_item["font_color"]),
+            )
+
+    def _repeat_rect(self, text_item: dict) -> fitz.Rect:
+        margin = self.repeat_margin
+        return fitz.Rect(text_item["bbox"]) + (-margin, -margin, margin, margin)
+
+    def _repeat_stream(self, page_num: int, text_item: dict) -> tuple:
+        """
+        Return the content stream, width and height of a repeated block.
+
+        The block is laid out and drawn once, on a scratch page of its own
+        size, and the stream is reused for every document this renderer draws.
+        """
+        repeat_key = text_item["repeat_key"]
+        if repeat_key not in self._repeat_streams:
+            rect = self._repeat_rect(text_item)
+            scratch = fitz.open()
+            overlay = scratch.new_page(width=rect.width, height=rect.height)
+            overlay.insert_font(
+                fontname=self.font_name, fontbuffer=font_buffer(self.font_path)
+            )
+            shape = overlay.new_shape()
+            self._draw_block(
+                shape,
+                text_item,
+                key=(page_num, text_item["block_num"]),
+                origin=(rect.x0, rect.y0),
+            )
+            shape.commit()
+            self._repeat_streams[repeat_key] = (
+                overlay.read_contents(),
+                rect.width,
+                rect.height,
+            )
+            scratch.close()
+        return self._repeat_streams[repeat_key]
+
+    @staticmethod
+    def _add_xobjects(page: fitz.Page, entries: dict):
+        """
+        Add `entries` ({name: xref}) to the page's XObject resources in one write.
+
+        PyMuPDF only sets keys along paths of direct objects, so indirect
+        /Resources and /XObject dictionaries are followed at every level and
+        the entries are merged into the object they end in.
+        """
+        doc = page.parent
+        parent, path, keys = page.xref, [], ["Resources", "XObject"]
+        while keys:
+            path.append(keys.pop(0))
+            kind, value = doc.xref_get_key(parent, "/".join(path))
+            if kind == "xref":
+                # Continue inside the referenced object
+                parent, path = int(value.split()[0]), []
+            elif kind != "dict":
+                # Missing: created together with the entries
+                path += keys
+                break
+        if path:
+            current = value if kind == "dict" else "<<>>"
+        else:
+            current = doc.xref_object(parent, compressed=True)
+        added = "".join(
+            f"/{name} {xref} 0 R"
+            for name, xref in entries.items()
+            if f"/{name} " not in current
+        )
+        if not added:
+            return
+        merged = f"{current[:-2]}{added}>>"
+        if path:
+            doc.xref_set_key(parent, "/".join(path), merged)
+        else:
+            doc.update_object(parent, merged)
+
+    def _show_repeated(self, page: fitz.Page, text_items: list, font_xref: int):
+        """
+        Draw repeated blocks as references to one form XObject each.
+
+        The XObject is created in the page's document on first use and
+        points at the document's own copy of the font, so nothing but a
+        `Do` operator is added to the other pages.
+        """
+        doc = page.parent
+        if doc is not self._xobject_doc:
+            self._xobject_doc, self._xobjects = doc, {}
+        if not page.is_wrapped:
+            page.wrap_contents()
+        to_pdf = ~page.transformation_matrix
+
+        operators, names = [], {}
+        for text_item in text_items:
+            repeat_key = text_item["repeat_key"]
+            xref = self._xobjects.get(repeat_key)
+            if xref is None:
+                content, width, height = self._repeat_stream(page.number, text_item)
+                xref = self._xobjects[repeat_key] = doc.get_new_xref()
+                doc.update_object(
+                    xref,
+                    f"<</Type/XObject/Subtype/Form/BBox[0 0 {width:g} {height:g}]"
+                    f"/Resources<</Font<</{self.font_name} {font_xref} 0 R>>>>>>",
+                )
+                doc.update_stream(xref, content)
+            else:
+                metrics.incr("repeat_xobjects_reused")
+            name = f"fzRep{xref}"
+            names[name] = xref
+            # The XObject's origin goes to the block's bottom-left corner
+            rect = self._repeat_rect(text_item)
+            x, y = fitz.Point(rect.x0, rect.y1) * to_pdf
+            operators.append(f"q 1 0 0 1 {x:g} {y:g} cm /{name} Do Q")
+
+        self._add_xobjects(page, names)
+        stream_xref = doc.get_new_xref()
+        doc.update_object(stream_xref, "<<>>")
+        doc.update_stream(stream_xref, "\n".join(operators).encode())
+        kind, contents = doc.xref_get_key(page.xref, "Contents")
+        if kind == "xref" and not doc.xref_is_stream(int(contents.split()[0])):
+            # An indirect array of streams: splice in its entries
+            kind, contents = "array", doc.xref_object(int(contents.split()[0]), compressed=True)
+        contents = contents[1:-1] if kind == "array" else contents
+        doc.xref_set_key(page.xref, "Contents", f"[{contents} {stream_xref} 0 R]")
+
+    def _render_page(self, page: fitz.Page, page_info: list):
+        if self.redactor is not None:
+            self.redactor.redact_page(page, page_info)
+
+        # The font is read once per process, embedded once per document and
+        # reused by every page
+        font_xref = page.insert_font(
+            fontname=self.font_name, fontbuffer=font_buffer(self.font_path)
+        )
+        debug = logger.isEnabledFor(logging.DEBUG)
+        # All lines of the page go into one shape: every shape rescans the
+        # page's resources when created and committed
+        shape = page.new_shape()
+        repeated = []
+        for text_item in page_info:
+            if debug:
+                logger.debug(
+                    "page %d block %d: %s",
+                    page.number,
+                    text_item["block_num"],
+                    text_item["translated_text"],
+                )
+            # Rotated pages keep the direct drawing path
+            if text_item.get("repeat_key") is not None and not page.rotation:
+                repeated.append(text_item)
+            else:
+                self._draw_block(shape, text_item, key=(page.number, text_item["block_num"]))
+        shape.commit()
+        if repeated:
+            self._show_repeated(page, repeated, font_xref)
+
+    def render(
+        self,
+        pdf_info: dict,
+        pdf_path: str,
+        output_path: str,
+        pages: range = None,
+    ) -> str:
+        if self.incremental and (pages is not None or output_path != pdf_path):
+            raise ValueError(
+                "Incremental save writes back to the input PDF; "
+                "output_path must equal pdf_path and all pages must be rendered."
+            )
+
+        doc = fitz.open(pdf_path)
+        pages = pages if pages is not None else range(len(doc))
+        for page_number in pages:
+            self.render_page(doc.load_page(page_number), pdf_info.get(page_number, []))
+
+        with metrics.timer("save_output_pdf"):
+            if self.incremental:
+                doc.saveIncr()
+            else:
+                if len(pages) != len(doc):
+                    doc.select(list(pages))
+                if self.subset_fonts:
+                    # Only the glyphs of this document's translations are kept
+                    subset_fonts(doc)
+                doc.save(output_path, garbage=self.garbage, deflate=self.deflate)
+        doc.close()
+        metrics.incr("bytes_written", os.path.getsize(output_path))
+        return output_path
+
+
+if __name__ == "__main__":
+    # Compare output size and time per page of the two backends
+    import sys
+
+    from src.text_extraction import TextExtractor
+    from src.redact_text import Redactor
+
+    pdf_path = sys.argv[1]
+    font_path = os.path.join(
+        os.path.dirname(__file__), "..", "font_family", "Roboto-Regular.ttf"
+    )
+    pdf_info = TextExtractor(pdf_path).extract_text()
+    for page_info in pdf_info.values():
+        for block in page_info:
+            block["translated_text"] = block["text"]
+    page_count = len(pdf_info)
+
+    start = time.perf_counter()
+    redacted_path = Redactor().redact(pdf_info, pdf_path, "redacted_reportlab.pdf")
+    reportlab_renderer = ReportlabRenderer(font_path, "Roboto")
+    reportlab_renderer.render(pdf_info, redacted_path, "output_reportlab.pdf")
+    reportlab_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fitz_renderer = FitzRenderer(font_path, "Roboto", redactor=Redactor())
+    fitz_renderer.render(pdf_info, pdf_path, "output_fitz.pdf")
+    fitz_time = time.perf_counter() - start
+
+    for name, elapsed in [("reportlab", reportlab_time), ("fitz", fitz_time)]:
+        size = os.path.getsize(f"output_{name}.pdf")
+        print(
+            f"{name:9s}: {elapsed / page_count * 1000:.1f} ms/page, {size / 1024:.0f} KiB"
+        )
+    print(f"blocks shrunk to fit: {len(fitz_renderer.layout.shrunk_blocks)}")
@@ -0,0 +1,84 @@
+import hashlib
+from collections import defaultdict
+
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+
+def block_fingerprint(block: dict, tolerance: float = 2.0, scope: str = "") -> str:
+    """
+    Hash a block's text, snapped position and style into a short key.
+
+    Coordinates are rounded to a `tolerance`-point grid so the same header
+    drawn a fraction of a point off on another page still matches. `scope`
+    (e.g. the document path) keeps keys of different documents apart in
+    caches shared between them.
+    """
+    text = " ".join(block["text"].split())
+    position = ",".join(str(round(value / tolerance)) for value in block["bbox"])
+    style = f"{block['font_size']:.1f}\x00{block['font_color']}"
+    key = f"{scope}\x00{text}\x00{position}\x00{style}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class RepeatedElements:
+    """
+    Find blocks repeated across pages: running headers, footers, logos' captions.
+
+    `detect` tags every block that appears at the same position with the
+    same text and style on at least `min_pages` pages with a shared
+    `repeat_key`. Downstream stages use the key to translate the group
+    once (BatchTranslationEngine), estimate its fill color once (Redactor)
+    and draw its text once into a PDF form XObject that every page shows
+    (FitzRenderer). Page numbers differ from page to page and are left to
+    the skip classifier.
+
+    Args:
+        min_pages (int): Fewest pages a block must appear on to be grouped.
+        tolerance (float): Position grid, in points, for matching bboxes.
+    """
+
+    def __init__(self, min_pages: int = 3, tolerance: float = 2.0):
+        self.min_pages = min_pages
+        self.tolerance = tolerance
+
+    @classmethod
+    def from_config(cls) -> "RepeatedElements":
+        from src.utils.config_utils import get_config
+
+        return cls(
+            min_pages=get_config("repeated_elements", "min_pages", default=3),
+            tolerance=get_config("repeated_elements", "tolerance", default=2.0),
+        )
+
+    def detect(self, pdf_info: dict, scope: str = "") -> dict:
+        """
+        Tag repeated blocks of `pdf_info` in place; return {repeat_key: [page_num, ...]}.
+        """
+        groups = defaultdict(list)
+        for page_num, page_info in pdf_info.items():
+            for block in page_info:
+                if block["text"].strip():
+                    groups[block_fingerprint(block, self.tolerance, scope)].append(
+                        (page_num, block)
+                    )
+
+        repeated = {}
+        for key, members in groups.items():
+            pages = sorted({page_num for page_num, _ in members})
+            if len(pages) < self.min_pages:
+                continue
+            repeated[key] = pages
+            for _, block in members:
+                block["repeat_key"] = key
+
+        blocks = sum(len(pages) for pages in repeated.values())
+        metrics.incr("repeated_groups", len(repeated))
+        metrics.incr("repeated_blocks", blocks)
+        if repeated:
+            logger.info(
+                f"Found {len(repeated)} repeated elements covering {blocks} blocks"
+            )
+        return repeated
@@ -1,7 +1,110 @@
+import logging
+import os
+import threading
 import fitz  # PyMuPDF
 from PIL import Image
-import io
-from collections import Counter
+from collections import Counter, OrderedDict
+
+from src.layout_detection import LayoutDetector, group_blocks_by_regions
+from src.utils.log_utils import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__file__)
+
+
+MAX_OPEN_DOCUMENTS = 8
+_open_documents = OrderedDict()
+_open_documents_lock = threading.Lock()
+
+
+def open_document(pdf_path: str) -> fitz.Document:
+    """
+    Open a PDF once per process and share it between lazy block images.
+
+    Documents are cached by path, modification time and size, so a file
+    replaced at the same path is opened again. The previous version and
+    documents evicted beyond MAX_OPEN_DOCUMENTS are closed.
+    """
+    stat = os.stat(pdf_path)
+    path = os.path.abspath(pdf_path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _open_documents_lock:
+        doc = _open_documents.get(key)
+        if doc is not None:
+            _open_documents.move_to_end(key)
+            return doc
+        for stale_key in [cached for cached in _open_documents if cached[0] == path]:
+            _open_documents.pop(stale_key).close()
+        doc = _open_documents[key] = fitz.open(pdf_path)
+        while len(_open_documents) > MAX_OPEN_DOCUMENTS:
+            _open_documents.popitem(last=False)[1].close()
+        return doc
+
+
+class BlockImage:
+    """
+    Lazy handle to the pixels of a text block.
+
+    Nothing is rendered at extraction time; the block's clip is rasterized
+    straight from the page only when a consumer asks for it, and the pixmap
+    samples are read directly without a PNG encode/decode round-trip.
+    """
+
+    def __init__(
+        self,
+        pdf_path: str,
+        page_num: int,
+        bbox: tuple,
+        dpi: int = 300,
+        doc: fitz.Document = None,
+    ):
+        self.pdf_path = pdf_path
+        self.page_num = page_num
+        self.bbox = tuple(bbox)
+        self.dpi = dpi
+        self._doc = doc
+
+    def __getstate__(self):
+        # Open documents cannot be pickled; reopen from the path on demand
+        state = self.__dict__.copy()
+        state["_doc"] = None
+        return state
+
+    def _load_page(self) -> fitz.Page:
+        # The shared document is looked up each time: it is reopened when the
+        # file changes and may have been closed since
+        doc = self._doc if self._doc is not None else open_document(self.pdf_path)
+        return doc.load_page(self.page_num)
+
+    def pixmap(self, dpi: int = None) -> fitz.Pixmap:
+        """
+        Render the block's clip to an RGB pixmap at `dpi` (default: the handle's DPI).
+        """
+        zoom = (dpi or self.dpi) / 72
+        with metrics.timer("block_pixmap"):
+            return self._load_page().get_pixmap(
+                matrix=fitz.Matrix(zoom, zoom), clip=fitz.Rect(self.bbox), alpha=False
+            )
+
+    def render(self, dpi: int = None) -> Image.Image:
+        """
+        Render the block to a PIL image.
+        """
+        pix = self.pixmap(dpi)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    def corner_pixels(self, dpi: int = None) -> list[tuple]:
+        """
+        Return the RGB values of the four corners of the block.
+        """
+        pix = self.pixmap(dpi)
+        right, bottom = pix.width - 1, pix.height - 1
+        return [
+            pix.pixel(0, 0),
+            pix.pixel(right, 0),
+            pix.pixel(0, bottom),
+            pix.pixel(right, bottom),
+        ]
 
 
 class BaseTextExtractor:
@@ -9,9 +112,9 @@ class BaseTextExtractor:
     Base class for text extraction from PDF files.
     """
 
-    def __init__(self, input_pdf_path: str):
+    def __init__(self, input_pdf_path: str, dpi: int = 300):
         self.input_pdf_path = input_pdf_path
-        self.DPI = 300
+        self.DPI = dpi
 
     def extract_text(self) -> dict:
         """
@@ -23,78 +126,131 @@ class BaseTextExtractor:
 class TextExtractor(BaseTextExtractor):
     """
     Text extractor for PDF files using PyMuPDF.
+
+    With a `layout_detector`, PyMuPDF's lines are regrouped into the
+    regions found by the layout model instead of PyMuPDF's own blocks,
+    which keeps table cells and columns together.
     """
 
+    def __init__(
+        self,
+        input_pdf_path: str,
+        dpi: int = 300,
+        layout_detector: LayoutDetector = None,
+    ):
+        super().__init__(input_pdf_path, dpi)
+        self.layout_detector = layout_detector
+
     def consensus(self, items: list):
         item_count = Counter(items)
         most_common_item, _ = item_count.most_common(1)[0]
         return most_common_item
 
-    def extract_text(self) -> dict:
+    def extract_page(
+        self, page: fitz.Page, doc: fitz.Document = None, regions: list = None
+    ) -> list:
         """
-        Extract text from the PDF file using PyMuPDF.
+        Extract the text blocks of a single page.
+
+        `regions` are the page's layout detections; they are computed here
+        if a layout detector is configured and none are passed in.
+        """
+        page_num = page.number
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        # Extract text block-level data
+        with metrics.timer("get_text"):
+            text_blocks = page.get_text("dict")["blocks"]
+
+        if regions is None and self.layout_detector is not None:
+            regions = self.layout_detector.detect([page])[0]
+        if regions:
+            text_blocks = group_blocks_by_regions(text_blocks, regions)
+
+        # Initialize a list to hold block data
+        blocks_data = []
+
+        # Iterate through each block and extract text and bounding box
+        for block_num, block in enumerate(text_blocks):
+            if debug:
+                logger.debug("page %d block %d: %s", page_num, block_num, block)
+            if block["type"] == 0:
+                # Extract text and bounding box
+                block_text = ""
+                font_size, font_color, font_family = [], [], []
+
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        block_text += span["text"] + "\n"
+                        font_size.append(span["size"])
+                        font_color.append(span["color"])
+                        font_family.append(span["font"])
+
+                # Keep only a lazy handle; pixels are rendered on demand
+                image = BlockImage(
+                    self.input_pdf_path, page_num, block["bbox"], self.DPI, doc
+                )
+
+                blocks_data.append(
+                    {
+                        "block_num": block_num + 1,
+                        "text": block_text,
+                        "bbox": block["bbox"],
+                        "image": image,
+                        "font_size": self.consensus(font_size),
+                        "font_color": self.consensus(font_color),
+                        "font_family": self.consensus(font_family),
+                    }
+                )
+        metrics.incr("blocks_extracted", len(blocks_data))
+        return blocks_data
+
+    def iter_pages(self, doc: fitz.Document = None):
+        """
+        Yield (page_num, blocks) one page at a time.
         """
         # Open the PDF
-        doc = fitz.open(self.input_pdf_path)
+        doc = doc or fitz.open(self.input_pdf_path)
 
-        # Initialize a dictionary to hold text data
-        text_data = {}
+        # Detect layout a batch of pages at a time
+        batch_size = self.layout_detector.batch_size if self.layout_detector else 1
 
         # Iterate through the pages
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-
-            # Extract text block-level data
-            text_blocks = page.get_text("dict")["blocks"]
+        for first_page in range(0, len(doc), batch_size):
+            pages = [
+                doc.load_page(page_num)
+                for page_num in range(first_page, min(first_page + batch_size, len(doc)))
+            ]
+            if self.layout_detector is not None:
+                regions_list = self.layout_detector.detect(pages)
+            else:
+                regions_list = [None] * len(pages)
 
-            # Initialize a list to hold block data
-            blocks_data = []
-
-            # Iterate through each block and extract text and bounding box
-            for block_num, block in enumerate(text_blocks):
-                print(block)
-                if block["type"] == 0:
-                    # Extract text and bounding box
-                    block_text = ""
-                    font_size, font_color, font_family = [], [], []
-
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            block_text += span["text"] + "\n"
-                            font_size.append(span["size"])
-                            font_color.append(span["color"])
-                            font_family.append(span["font"])
-
-                    # get image
-                    x0, y0, x1, y1 = block["bbox"]
-                    print(block["bbox"])
-                    rect = fitz.Rect(x0, y0, x1, y1)
-                    cropped_page = page.get_pixmap(
-                        matrix=fitz.Matrix(self.DPI / 72, self.DPI / 72), clip=rect
-                    )
-                    image_bytes = cropped_page.tobytes("png")
-
-                    # Wrap bytes in a BytesIO object (so PIL can read it like a file)
-                    image_stream = io.BytesIO(image_bytes)
-                    image = Image.open(image_stream)
-
-                    blocks_data.append(
-                        {
-                            "block_num": block_num + 1,
-                            "text": block_text,
-                            "bbox": block["bbox"],
-                            "image": image,
-                            "font_size": self.consensus(font_size),
-                            "font_color": self.consensus(font_color),
-                            "font_family": self.consensus(font_family),
-                        }
-                    )
-            text_data[page_num] = blocks_data
-        return text_data
+            for page, regions in zip(pages, regions_list):
+                with metrics.timer("extract_page"):
+                    blocks = self.extract_page(page, doc, regions)
+                yield page.number, blocks
 
+    def extract_text(self) -> dict:
+        """
+        Extract text from the PDF file using PyMuPDF.
+        """
+        return dict(self.iter_pages())
 
 if __name__ == "__main__":
-    input_pdf_path = "/home/phongmt1/phongmt1/project/pdf_translation/1st.pdf"
+    # python -m src.text_extraction [input.pdf]; defaults to a synthetic PDF
+    import os
+    import sys
+    import tempfile
+
+    from src.utils.synthetic_pdf import make_synthetic_pdf
+
+    if len(sys.argv) > 1:
+        input_pdf_path = sys.argv[1]
+    else:
+        input_pdf_path = make_synthetic_pdf(
+            os.path.join(tempfile.gettempdir(), "synthetic.pdf"), pages=2
+        )
     extractor = TextExtractor(input_pdf_path)
     text_data = extractor.extract_text()
 
@@ -104,5 +260,5 @@ if __name__ == "__main__":
         for block in blocks:
             print(f"Block {block['block_num']}:")
             print(block["font_size"])
-            # Save the image if needed
-            # block["image"].save(f"block_{page_num}_{block['block_num']}.png")
+            # Render and save the image if needed
+            # block["image"].render().save(f"block_{page_num}_{block['block_num']}.png")
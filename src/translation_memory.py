@@ -0,0 +1,197 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from src.translator import BaseTranslator
+from src.utils.config_utils import get_config
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text before hashing so trivial whitespace differences share an entry.
+
+    Runs of spaces are collapsed within each line and empty lines are
+    dropped; line order is kept since it drives how the translation is laid out.
+    """
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class TranslationMemory:
+    """
+    Two-tier translation cache: an in-process LRU in front of an SQLite file.
+
+    Entries are content-addressed by a hash of the normalized text, the
+    language pair and the model, so they survive restarts and are shared by
+    every job that points at the same database.
+    """
+
+    def __init__(self, db_path: str = None, max_entries: int = 10000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, translation TEXT NOT NULL)"
+            )
+            self._conn.commit()
+        self.stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+        }
+
+    @classmethod
+    def from_config(cls) -> "TranslationMemory":
+        return cls(
+            db_path=get_config("translation_memory", "db_path"),
+            max_entries=get_config("translation_memory", "max_entries", default=10000),
+        )
+
+    @staticmethod
+    def make_key(
+        text: str, source_language: str, target_language: str, model: str
+    ) -> str:
+        payload = "\x1f".join(
+            [normalize_text(text), source_language, target_language, model]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, translation: str):
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str, text: str = "") -> str | None:
+        """
+        Look up a translation, counting a hit or a miss.
+
+        `text` is only used to account for the bytes that did not have to
+        be sent to the translator.
+        """
+        with self._lock:
+            translation = self._lru.get(key)
+            if translation is not None:
+                self._lru.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT translation FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    translation = row[0]
+                    self._remember(key, translation)
+                    self.stats["disk_hits"] += 1
+
+            if translation is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(text.encode("utf-8")) + len(
+                translation.encode("utf-8")
+            )
+            return translation
+
+    def put(self, key: str, translation: str):
+        self.put_many([(key, translation)])
+
+    def put_many(self, items: list):
+        """
+        Store (key, translation) pairs, committing them to disk in one transaction.
+        """
+        with self._lock:
+            for key, translation in items:
+                self._remember(key, translation)
+            if self._conn is not None and items:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO translations (key, translation) VALUES (?, ?)",
+                    items,
+                )
+                self._conn.commit()
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class CachedTranslator(BaseTranslator):
+    """
+    Translator wrapper that consults a TranslationMemory before the real backend.
+    """
+
+    def __init__(self, translator: BaseTranslator, memory: TranslationMemory):
+        self.translator = translator
+        self.memory = memory
+        self.model = translator.model
+
+    def translate(
+        self,
+        text: str,
+        source_language: str = "english",
+        target_language: str = "vietnamese",
+    ) -> str:
+        return self.translate_batch(
+            [text],
+            source_language=source_language,
+            target_language=target_language,
+        )[0]
+
+    def translate_batch(
+        self,
+        text_list: list[str],
+        source_language: str = "english",
+        target_language: str = "vietnamese",
+        context: str = None,
+    ) -> list[str]:
+        keys = [
+            self.memory.make_key(text, source_language, target_language, self.model)
+            for text in text_list
+        ]
+        results = [self.memory.get(key, text) for key, text in zip(keys, text_list)]
+
+        # Translate each distinct missing text once, even if it repeats in the batch
+        missing = {}
+        for key, text, result in zip(keys, text_list, results):
+            if result is None and key not in missing:
+                missing[key] = text
+        if missing:
+            translations = self.translator.translate_batch(
+                list(missing.values()),
+                source_language=source_language,
+                target_language=target_language,
+                context=context,
+            )
+            # One commit per batch rather than one per translation
+            translated = list(zip(missing, translations))
+            self.memory.put_many(translated)
+            missing.update(translated)
+
+        return [
+            result if result is not None else missing[key]
+            for key, result in zip(keys, results)
+        ]
+
+
+if __name__ == "__main__":
+    from src.translator import StubTranslator
+
+    memory = TranslationMemory(db_path="cache/translation_memory.sqlite3")
+    translator = CachedTranslator(StubTranslator(), memory)
+    texts = ["Confidential", "Page 1", "Confidential", "  Confidential "]
+    print(translator.translate_batch(texts))
+    print(memory.stats, f"hit rate: {memory.hit_rate():.0%}")
@@ -1,57 +1,375 @@
-from openai import OpenAI
-from pydantic import BaseModel
+import importlib
+import json
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from src.utils.config_utils import get_env
+from src.chunking import estimate_tokens
+from src.rate_limit import RateLimiter, get_rate_limiter
+from src.utils.config_utils import get_config, get_env
+from src.utils.metrics import metrics
 
-client = OpenAI(api_key=get_env("OPENAI_API_KEY"))
+if TYPE_CHECKING:
+    # The SDK and pydantic are slow to import; they load with the first OpenAI backend
+    import openai
+    from pydantic import BaseModel
 
 
-class TranslatorOutput(BaseModel):
-    translated_text: str
+@lru_cache(maxsize=None)
+def get_client(
+    timeout: float = None, base_url: str = None, api_key: str = None
+) -> "openai.OpenAI":
+    """
+    Create an OpenAI(-compatible) client on first use; retries are left to the rate limiter.
+    """
+    import openai
+
+    timeout = timeout or get_config("rate_limit", "timeout", default=60)
+    return openai.OpenAI(
+        api_key=api_key or get_env("OPENAI_API_KEY"),
+        base_url=base_url,
+        timeout=timeout,
+        max_retries=0,
+    )
+
+
+@lru_cache(maxsize=1)
+def output_models() -> tuple:
+    """
+    Structured-output models (TranslatorOutput, BatchTranslatorOutput), built on first use.
+    """
+    from pydantic import BaseModel
+
+    class TranslatorOutput(BaseModel):
+        translated_text: str
+
+    class BatchTranslatorOutput(BaseModel):
+        translated_texts: list[str]
+
+    return TranslatorOutput, BatchTranslatorOutput
+
+
+def __getattr__(name: str):
+    if name == "TranslatorOutput":
+        return output_models()[0]
+    if name == "BatchTranslatorOutput":
+        return output_models()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class BaseTranslator:
+    """
+    Interface of every translation backend.
+
+    Backends implement `translate` (one text), `translate_batch` (many texts
+    in one go) or both; each default is written in terms of the other.
+    `model` identifies the backend's outputs in the translation memory.
+    """
+
+    model: str = ""
+
     def translate(
+        self,
+        text: str,
+        source_language: str = "english",
+        target_language: str = "vietnamese",
+    ) -> str:
+        if type(self).translate_batch is BaseTranslator.translate_batch:
+            raise NotImplementedError("Subclasses should implement this method.")
+        return self.translate_batch(
+            [text], source_language=source_language, target_language=target_language
+        )[0]
+
+    def translate_batch(
         self,
         text_list: list[str],
         source_language: str = "english",
         target_language: str = "vietnamese",
-    ) -> TranslatorOutput:
-        raise NotImplementedError("Subclasses should implement this method.")
+        context: str = None,
+    ) -> list[str]:
+        """
+        Translate a list of strings, one result per input, in the same order.
+
+        Subclasses that can pack several texts into one request should
+        override this; the default falls back to one call per text.
+        `context` is shared background for all texts (e.g. the page title)
+        and is not translated itself.
+        """
+        return [
+            self.translate(
+                text,
+                source_language=source_language,
+                target_language=target_language,
+            )
+            for text in text_list
+        ]
 
 
 class OpenAITranslator(BaseTranslator):
+    model = "gpt-4o"
+
+    def __init__(
+        self, model: str = None, rate_limiter: RateLimiter = None, timeout: float = None
+    ):
+        import openai
+
+        self.model = model or self.model
+        # One limiter per provider is shared by every translator in the process
+        self.rate_limiter = rate_limiter or get_rate_limiter(
+            "openai", (openai.APIConnectionError,)
+        )
+        self.timeout = timeout
+
+    @property
+    def client(self) -> "openai.OpenAI":
+        return get_client(self.timeout)
+
+    @staticmethod
+    def _record_usage(response):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.incr("openai_input_tokens", usage.input_tokens)
+            metrics.incr("openai_output_tokens", usage.output_tokens)
+
+    def _parse(self, messages: list[dict], text_format: "type[BaseModel]"):
+        """
+        Call `responses.parse` through the rate limiter and return the parsed output.
+        """
+
+        def request():
+            raw = self.client.responses.with_raw_response.parse(
+                model=self.model, input=messages, text_format=text_format
+            )
+            self.rate_limiter.update_from_headers(raw.headers)
+            return raw.parse()
+
+        # Budget the prompt plus a translation of about the same length
+        tokens = 2 * sum(estimate_tokens(message["content"]) for message in messages)
+        response = self.rate_limiter.call(request, tokens=tokens)
+        self._record_usage(response)
+        return response.output_parsed
+
     def translate(
         self,
         text: str,
         source_language: str = "english",
         target_language: str = "vietnamese",
-    ) -> TranslatorOutput:
+    ) -> str:
         """
-        Translate a list of strings using OpenAI's GPT-4o model.
+        Translate a string using OpenAI's GPT-4o model.
         """
         # Call the OpenAI API to get the translation
-        response = client.responses.parse(
-            model="gpt-4o",
-            input=[
+        output = self._parse(
+            [
                 {
                     "role": "system",
                     "content": f"Translate the following text from {source_language} to {target_language}.",
                 },
                 {"role": "user", "content": text},
             ],
-            text_format=TranslatorOutput,
+            output_models()[0],
+        )
+        return output.translated_text
+
+    def translate_batch(
+        self,
+        text_list: list[str],
+        source_language: str = "english",
+        target_language: str = "vietnamese",
+        context: str = None,
+    ) -> list[str]:
+        """
+        Translate a list of strings in a single request with a structured list output.
+        """
+        if not text_list:
+            return []
+        context_note = (
+            f" For context only, the items come from a page titled: {context!r}."
+            if context
+            else ""
+        )
+
+        output = self._parse(
+            [
+                {
+                    "role": "system",
+                    "content": (
+                        f"Translate each item of the following JSON list from {source_language} "
+                        f"to {target_language}. Return exactly one translation per item, "
+                        "in the same order, and keep line breaks inside each item."
+                        + context_note
+                    ),
+                },
+                {"role": "user", "content": json.dumps(text_list, ensure_ascii=False)},
+            ],
+            output_models()[1],
         )
+        translated_texts = output.translated_texts
+
+        # The model occasionally merges or drops items; retry one by one
+        # rather than mapping translations onto the wrong blocks.
+        if len(translated_texts) != len(text_list):
+            return super().translate_batch(
+                text_list,
+                source_language=source_language,
+                target_language=target_language,
+            )
+        return translated_texts
+
+
+class OpenAICompatibleTranslator(OpenAITranslator):
+    """
+    Translator for any server that speaks the OpenAI chat completions API.
+
+    Point `base_url` at a local vLLM or llama.cpp server (or another
+    provider) to move jobs off the paid API. The structured outputs are
+    requested as a JSON object and validated with the same pydantic
+    models, since such servers rarely support `responses.parse`.
+
+    Args:
+        base_url (str): API root, e.g. "http://localhost:8000/v1".
+        model (str): Model name as served.
+        api_key (str): Key, if the server expects one.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: str = "EMPTY",
+        rate_limiter: RateLimiter = None,
+        timeout: float = None,
+    ):
+        import openai
+
+        super().__init__(
+            model=model,
+            rate_limiter=rate_limiter
+            or get_rate_limiter(base_url, (openai.APIConnectionError,)),
+            timeout=timeout,
+        )
+        self.base_url = base_url
+        self.api_key = api_key
+
+    @property
+    def client(self) -> "openai.OpenAI":
+        return get_client(self.timeout, self.base_url, self.api_key)
+
+    def _parse(self, messages: list[dict], text_format: "type[BaseModel]"):
+        schema = json.dumps(text_format.model_json_schema())
+        messages = [
+            {
+                "role": "system",
+                "content": messages[0]["content"]
+                + f" Answer with a JSON object that follows this schema: {schema}",
+            },
+            *messages[1:],
+        ]
+
+        def request():
+            raw = self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0,
+            )
+            self.rate_limiter.update_from_headers(raw.headers)
+            return raw.parse()
+
+        tokens = 2 * sum(estimate_tokens(message["content"]) for message in messages)
+        completion = self.rate_limiter.call(request, tokens=tokens)
+        if completion.usage is not None:
+            metrics.incr("openai_compatible_input_tokens", completion.usage.prompt_tokens)
+            metrics.incr(
+                "openai_compatible_output_tokens", completion.usage.completion_tokens
+            )
+        return text_format.model_validate_json(completion.choices[0].message.content)
+
+
+class StubTranslator(BaseTranslator):
+    """
+    Offline translator for tests and benchmarks.
+
+    It does not call any API: each request sleeps for `latency` seconds to
+    simulate a network round-trip and returns the input tagged with the
+    target language.
+    """
+
+    model = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def translate(
+        self,
+        text: str,
+        source_language: str = "english",
+        target_language: str = "vietnamese",
+    ) -> str:
+        time.sleep(self.latency)
+        return f"[{target_language}] {text}"
+
+    def translate_batch(
+        self,
+        text_list: list[str],
+        source_language: str = "english",
+        target_language: str = "vietnamese",
+        context: str = None,
+    ) -> list[str]:
+        time.sleep(self.latency)
+        return [f"[{target_language}] {text}" for text in text_list]
 
-        return response.output_parsed.translated_text
+
+# Backend name -> "module:Class"; a backend's module is only imported when selected
+TRANSLATOR_BACKENDS = {
+    "openai": "src.translator:OpenAITranslator",
+    "openai_compatible": "src.translator:OpenAICompatibleTranslator",
+    "marian": "src.local_translator:MarianTranslator",
+    "stub": "src.translator:StubTranslator",
+}
+
+
+def register_translator(name: str, path: str):
+    """
+    Register a translator backend as "module:Class" under `name`.
+    """
+    TRANSLATOR_BACKENDS[name] = path
+
+
+def get_translator(backend: str = None, **options) -> BaseTranslator:
+    """
+    Build a translator backend by name.
+
+    The backend defaults to `translator.backend` in the config, and its
+    constructor options to the config section of the same name; keyword
+    arguments override them.
+    """
+    backend = backend or get_config("translator", "backend", default="openai")
+    if backend not in TRANSLATOR_BACKENDS:
+        raise ValueError(
+            f"Unknown translator backend {backend}, expected one of {list(TRANSLATOR_BACKENDS)}"
+        )
+    configured = (get_config("translator", default={}) or {}).get(backend) or {}
+    module_name, class_name = TRANSLATOR_BACKENDS[backend].split(":")
+    translator_class = getattr(importlib.import_module(module_name), class_name)
+    return translator_class(**{**configured, **options})
 
 
 if __name__ == "__main__":
-    # Example usage
-    translator = OpenAITranslator()
-    result = translator.translate(
-        ["Hello, how are you?", "This is a test."],
-        source_language="english",
-        target_language="vietnamese",
-    )
-    print(result.translated_text)
+    # Throughput of each backend given on the command line, e.g. "stub marian"
+    import sys
+
+    texts = [
+        f"Sentence {i}: the quarterly report shows revenue growth in every region."
+        for i in range(64)
+    ]
+    for backend in sys.argv[1:] or ["stub"]:
+        translator = get_translator(backend)
+        translator.translate_batch(texts[:2])  # load models and connections
+        start = time.perf_counter()
+        results = translator.translate_batch(texts)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{backend:18s}: {len(texts) / elapsed:8.1f} blocks/s, "
+            f"{sum(map(len, texts)) / elapsed:10.0f} chars/s  {results[0]!r}"
+        )
@@ -1,29 +1,38 @@
 import os
-
-import yaml
-from dotenv import load_dotenv
+from functools import lru_cache
 
 from .log_utils import get_logger
 
 SOURCE_DIR = os.path.join(os.path.dirname(__file__), "..")
 CONFIG_DIR = os.path.join(SOURCE_DIR, "configs")
 ENV_PATH = os.path.join(CONFIG_DIR, ".env")
-if not os.path.exists(ENV_PATH):
-    raise FileNotFoundError(f"Environment file not found at {ENV_PATH}")
-load_dotenv(ENV_PATH)
 
-ENV = os.environ.get("ENV", "dev")  # default to dev
-CONFIG_PATH = os.path.join(CONFIG_DIR, f"config.{ENV}.yml")
+logger = get_logger(__file__)
 
-if not os.path.exists(CONFIG_PATH):
-    raise FileNotFoundError(f"Config file not found at {CONFIG_PATH}")
 
-with open(CONFIG_PATH, "r") as f:
-    configs = yaml.safe_load(f)
-logger = get_logger(__file__)
+@lru_cache(maxsize=1)
+def load_config() -> dict:
+    """
+    Read `.env` and `config.{ENV}.yml` once, on first use rather than at import.
+    """
+    import yaml
+    from dotenv import load_dotenv
+
+    if not os.path.exists(ENV_PATH):
+        raise FileNotFoundError(f"Environment file not found at {ENV_PATH}")
+    load_dotenv(ENV_PATH)
+
+    env = os.environ.get("ENV", "dev")  # default to dev
+    config_path = os.path.join(CONFIG_DIR, f"config.{env}.yml")
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"Config file not found at {config_path}")
+
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f)
 
 
 def get_env(env_name: str, default=None):
+    load_config()
     if env_name not in os.environ:
         logger.warning(f"Environment variable {env_name} not found")
     value = os.environ.get(env_name, default=default)
@@ -31,6 +40,7 @@ def get_env(env_name: str, default=None):
 
 
 def get_config(key: str, sub_key: str = None, default=None):
+    configs = load_config()
     if key not in configs:
         logger.warning(f"Key {key} not found in config")
         return default
@@ -0,0 +1,12 @@
+import json
+import os
+
+
+def write_json(path: str, data):
+    """
+    Write `data` to `path` atomically, so readers never see a partial file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,63 @@
+import os
+from functools import lru_cache
+
+import fitz  # PyMuPDF
+
+from .log_utils import get_logger
+from .metrics import metrics
+
+logger = get_logger(__file__)
+
+
+@lru_cache(maxsize=None)
+def font_buffer(font_path: str) -> bytes:
+    """
+    Read a font file once per process; PyMuPDF embeds it from memory.
+    """
+    with open(font_path, "rb") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def register_reportlab_font(font_name: str, font_path: str) -> str:
+    """
+    Parse a TTF and register it with reportlab once per process.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont(font_name, font_path))
+    return font_name
+
+
+def subset_fonts(doc: fitz.Document) -> bool:
+    """
+    Cut every embedded font of `doc` down to the glyphs its pages use.
+
+    Text drawn inside form XObjects counts as used. Fonts MuPDF cannot
+    subset are left whole; returns whether subsetting ran.
+    """
+    try:
+        with metrics.timer("subset_fonts"):
+            doc.subset_fonts()
+    except Exception as error:
+        logger.warning(f"Font subsetting skipped: {error}")
+        return False
+    return True
+
+
+def compact_pdf(pdf_path: str, subset: bool = True, garbage: int = 4) -> str:
+    """
+    Rewrite a saved PDF with subset fonts and duplicate objects merged.
+
+    `garbage=4` also merges identical streams, e.g. the same font
+    embedded by separately drawn overlay pages or page shards.
+    """
+    tmp_path = f"{pdf_path}.tmp"
+    with fitz.open(pdf_path) as doc:
+        if subset:
+            subset_fonts(doc)
+        with metrics.timer("compact_pdf"):
+            doc.save(tmp_path, garbage=garbage, deflate=True)
+    os.replace(tmp_path, pdf_path)
+    return pdf_path
@@ -1,21 +1,62 @@
+from typing import Iterable, Union
+
+import fitz  # PyMuPDF
 from PIL import Image  # install by > python3 -m pip install --upgrade Pillow
 
+from src.utils.pdf_writer import IncrementalPdfWriter
+
+
+def _to_pixmap(image: Image.Image) -> fitz.Pixmap:
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return fitz.Pixmap(fitz.csRGB, image.width, image.height, image.tobytes(), False)
+
+
+def write_images_to_pdf(
+    images: Iterable[Union[Image.Image, str]],
+    pdf_path: str,
+    resolution: float = 100.0,
+    pages_per_chunk: int = 16,
+) -> int:
+    """
+    Streams images (PIL images or paths) into a PDF, one page per image.
+
+    Images are consumed lazily and pages are flushed to disk every
+    `pages_per_chunk` pages, so only one chunk is held in memory.
+
+    :param images: Iterable of PIL images or paths to image files.
+    :param pdf_path: Path to save the output PDF file.
+    :param resolution: Resolution of the images, in pixels per inch.
+    :param pages_per_chunk: Number of pages kept in memory between writes.
+    :return: Number of pages written.
+    """
+    writer = IncrementalPdfWriter(pdf_path)
+    chunk = fitz.open()
+    scale = 72 / resolution
+    for image in images:
+        if isinstance(image, str):
+            with Image.open(image) as opened:
+                pixmap = _to_pixmap(opened)
+        else:
+            pixmap = _to_pixmap(image)
+        page = chunk.new_page(width=pixmap.width * scale, height=pixmap.height * scale)
+        page.insert_image(page.rect, pixmap=pixmap)
+        if len(chunk) >= pages_per_chunk:
+            writer.append(chunk)
+            chunk = fitz.open()
+    if len(chunk):
+        writer.append(chunk)
+    writer.close()
+    return writer.page_count
+
 
 def images_to_pdf(image_paths, pdf_path, resolution=100.0):
     """
     Converts a list of image paths to a single PDF file.
 
-    :param image_paths: List of paths to image files.
+    :param image_paths: List (or any iterable) of paths to image files.
     :param pdf_path: Path to save the output PDF file.
     :param resolution: Resolution of the output PDF.
     """
-    if not image_paths:
+    if not write_images_to_pdf(image_paths, pdf_path, resolution=resolution):
         raise ValueError("The image_paths list cannot be empty.")
-
-    # Open the images
-    images = [Image.open(image_path) for image_path in image_paths]
-
-    # Save the first image as PDF and append the rest
-    images[0].save(
-        pdf_path, "PDF", resolution=resolution, save_all=True, append_images=images[1:]
-    )
@@ -0,0 +1,31 @@
+# Language names used across the pipeline -> ISO-style codes (as in OPUS-MT model names)
+LANGUAGE_CODES = {
+    "english": "en",
+    "vietnamese": "vi",
+    "chinese": "zh",
+    "japanese": "jap",
+    "korean": "ko",
+    "french": "fr",
+    "german": "de",
+    "spanish": "es",
+    "russian": "ru",
+}
+
+LANGUAGE_NAMES = {code: name for name, code in LANGUAGE_CODES.items()}
+LANGUAGE_NAMES["ja"] = "japanese"
+
+
+def language_name(language: str) -> str:
+    """
+    Accept a language code ("vi") or name ("Vietnamese") and return the name.
+    """
+    language = language.strip().lower()
+    return LANGUAGE_NAMES.get(language, language)
+
+
+def language_code(language: str) -> str:
+    """
+    Accept a language name or code and return the code.
+    """
+    language = language.strip().lower()
+    return LANGUAGE_CODES.get(language, language)
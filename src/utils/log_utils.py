@@ -12,6 +12,13 @@ os.makedirs(DEFAULT_LOG_DIR, exist_ok=True)
 
 DEFAULT_LOG_FILE = "rag4sac.log"
 
+# Debug output (e.g. per-block dumps) is skipped entirely unless LOG_LEVEL=DEBUG
+DEFAULT_LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# Console stream for loggers created from now on; the CLI moves it to stderr
+# so that stdout carries only its JSON results
+DEFAULT_LOG_STREAM = sys.stdout
+
 
 def namer(name):
     return name
@@ -25,16 +32,19 @@ def get_file_handler(formatter, log_filename):
 
 
 def get_stream_handler(formatter):
-    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler = logging.StreamHandler(DEFAULT_LOG_STREAM)
     stream_handler.setLevel(logging.DEBUG)
     stream_handler.setFormatter(formatter)
     return stream_handler
 
 
 def get_logger(name, formatter=DEFAULT_FORMAT, log_filename=DEFAULT_LOG_FILE):
-    log_filename = os.path.join(DEFAULT_LOG_DIR, log_filename)
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    # Modules call this at import; only the first call attaches handlers
+    if logger.handlers:
+        return logger
+    log_filename = os.path.join(DEFAULT_LOG_DIR, log_filename) if log_filename else None
+    logger.setLevel(DEFAULT_LOG_LEVEL)
     logger.addHandler(get_stream_handler(formatter))
     if log_filename:
         logger.addHandler(get_file_handler(formatter, log_filename))
@@ -53,6 +63,8 @@ def get_app_log(record):
         "level": record.levelname,
         "message": record.message,
     }
+    if hasattr(record, "metrics"):
+        json_obj["metrics"] = record.metrics
 
     return json_obj
 
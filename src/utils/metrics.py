@@ -0,0 +1,150 @@
+import bisect
+import itertools
+import logging
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from .log_utils import CustomFormatter
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+METRIC_PREFIX = "pdf_translation"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            # Cumulative like Prometheus: observations of at most each bound
+            "buckets": dict(
+                zip(
+                    [*map(str, self.buckets), "+Inf"],
+                    itertools.accumulate(self.bucket_counts),
+                )
+            ),
+        }
+
+
+def peak_rss_bytes() -> int:
+    """
+    Peak resident set size of this process.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and duration histograms.
+
+    Stages wrap their work in `timer(name)`, and counts such as blocks,
+    tokens or bytes written go through `incr(name, value)`. The registry
+    can be exported as a JSON log line or as Prometheus text.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "durations_seconds": {
+                    name: histogram.to_dict()
+                    for name, histogram in self.histograms.items()
+                },
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+
+    def to_json(self) -> str:
+        """
+        Export the metrics as one JSON log line, formatted by CustomFormatter.
+        """
+        record = logging.makeLogRecord(
+            {
+                "name": METRIC_PREFIX,
+                "levelno": logging.INFO,
+                "levelname": "INFO",
+                "msg": "metrics",
+                "metrics": self.snapshot(),
+            }
+        )
+        return CustomFormatter("%(message)s").format(record)
+
+    def to_prometheus(self) -> str:
+        """
+        Export the metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+
+        for name, histogram in sorted(snapshot["durations_seconds"].items()):
+            metric = f"{METRIC_PREFIX}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+            lines += [
+                f"{metric}_sum {histogram['sum']}",
+                f"{metric}_count {histogram['count']}",
+            ]
+
+        metric = f"{METRIC_PREFIX}_peak_rss_bytes"
+        lines += [f"# TYPE {metric} gauge", f"{metric} {snapshot['peak_rss_bytes']}"]
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by all pipeline components
+metrics = Metrics()
@@ -1,14 +1,97 @@
+import mmap
 import os
 import shutil
-from typing import List
-from pdf2image import convert_from_path
-from PIL.Image import Image
+import tempfile
+from typing import Iterator, List
+
+import fitz  # PyMuPDF
+from PIL import Image
 
-from src.utils.config_utils import get_config
 from src.utils.log_utils import get_logger
 
 logger = get_logger(__file__)
 
+# Pages whose raw RGB pixels exceed this many bytes are spilled to a memory map
+DEFAULT_SPILL_BYTES = 256 * 1024 * 1024
+
+
+def _render_in_memory(page: fitz.Page, matrix: fitz.Matrix) -> Image.Image:
+    pix = page.get_pixmap(matrix=matrix, alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def _render_spilled(
+    page: fitz.Page, matrix: fitz.Matrix, spill_dir: str = None, band_height: int = 1024
+) -> Image.Image:
+    """
+    Render a page band by band into an anonymous, memory-mapped temporary file.
+
+    Only one band of pixels is held in memory at a time; the returned image
+    reads its pixels from the map, so the OS can page them out.
+    """
+    irect = page.rect.transform(matrix).irect
+    width, height = irect.width, irect.height
+    stride = width * 3
+    with tempfile.TemporaryFile(dir=spill_dir) as f:
+        f.truncate(stride * height)
+        buffer = mmap.mmap(f.fileno(), stride * height)
+
+    zoom_y = matrix.d
+    for top in range(0, height, band_height):
+        bottom = min(top + band_height, height)
+        clip = fitz.Rect(
+            page.rect.x0,
+            page.rect.y0 + (irect.y0 + top) / zoom_y,
+            page.rect.x1,
+            page.rect.y0 + (irect.y0 + bottom) / zoom_y,
+        )
+        pix = page.get_pixmap(matrix=matrix, clip=clip, alpha=False)
+        # Rounding can make a band a row taller or shorter than requested
+        row = pix.y - irect.y0
+        rows = min(pix.height, height - row)
+        if pix.x != irect.x0 or pix.width != width or rows <= 0:
+            continue
+        buffer[row * stride : (row + rows) * stride] = pix.samples[: rows * stride]
+
+    return Image.frombuffer("RGB", (width, height), buffer, "raw", "RGB", 0, 1)
+
+
+def iter_pdf_images(
+    pdf_path: str,
+    dpi: int = 300,
+    pages: range = None,
+    spill_bytes: int = DEFAULT_SPILL_BYTES,
+    spill_dir: str = None,
+) -> Iterator[Image.Image]:
+    """
+    Render the pages of a PDF one at a time with PyMuPDF.
+
+    Nothing is written to disk: each page is rendered into an in-memory
+    buffer and yielded before the next one is rendered. Pages larger than
+    `spill_bytes` are rendered into a memory-mapped temporary file instead.
+
+    Args:
+        pdf_path (str): The path to the PDF file to render.
+        dpi (int): Resolution in DPI (default is 300).
+        pages (range): Optional subset of page numbers (0-based).
+        spill_bytes (int): Raw page size above which pixels are memory mapped.
+        spill_dir (str): Directory for spill files (system temp dir by default).
+
+    Yields:
+        Image: One RGB PIL image per page.
+    """
+    matrix = fitz.Matrix(dpi / 72, dpi / 72)
+    with fitz.open(pdf_path) as doc:
+        for page_num in pages if pages is not None else range(len(doc)):
+            page = doc.load_page(page_num)
+            irect = page.rect.transform(matrix).irect
+            if irect.width * irect.height * 3 > spill_bytes:
+                logger.debug(f"Spilling page {page_num} ({irect.width}x{irect.height})")
+                yield _render_spilled(page, matrix, spill_dir)
+            else:
+                yield _render_in_memory(page, matrix)
+
+
 def convert_pdf_to_images(
     pdf_path: str,
     output_dir: str = "output_images",
@@ -19,6 +102,7 @@ def convert_pdf_to_images(
     Converts a PDF file into PNG images, one per page, and saves them in a specified directory.
 
     If the output directory exists, it will be deleted before saving new images.
+    Prefer `iter_pdf_images` when the images do not need to be on disk.
 
     Args:
         pdf_path (str): The path to the PDF file to convert.
@@ -36,10 +120,9 @@ def convert_pdf_to_images(
     os.makedirs(output_dir)
 
     logger.info("Converting PDFs to images ")
-    images: List[Image] = convert_from_path(pdf_path, dpi=dpi)
     output_paths: List[str] = []
 
-    for i, img in enumerate(images):
+    for i, img in enumerate(iter_pdf_images(pdf_path, dpi=dpi)):
         output_path = os.path.join(output_dir, f"{output_prefix}_{i + 1}.png")
         img.save(output_path, "PNG")
         output_paths.append(output_path)
@@ -47,5 +130,15 @@ def convert_pdf_to_images(
     return output_paths
 
 if __name__ == "__main__":
-    path = "/home/phongmt1/phongmt1/project/pdf_translation/tmp/1st.pdf"
-    convert_pdf_to_images(path)
\ No newline at end of file
+    # Time and peak memory of rendering every page as a stream
+    import sys
+    import time
+
+    from src.utils.metrics import peak_rss_bytes
+
+    path = sys.argv[1]
+    dpi = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    start = time.perf_counter()
+    page_count = sum(1 for _ in iter_pdf_images(path, dpi=dpi))
+    elapsed = time.perf_counter() - start
+    print(f"{page_count} pages in {elapsed:.2f}s, peak RSS {peak_rss_bytes() / 2**20:.0f} MiB")
@@ -0,0 +1,40 @@
+import os
+
+import fitz  # PyMuPDF
+
+from .metrics import metrics
+
+
+class IncrementalPdfWriter:
+    """
+    Append pages to a PDF on disk without keeping the whole output in memory.
+
+    The first chunk is written with a full save; later chunks are appended
+    with incremental saves. The output is reopened after every save so only
+    the cross-reference table stays resident, not the page objects.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.page_count = 0
+        self._doc = None
+
+    def append(self, chunk: fitz.Document):
+        """
+        Append every page of `chunk` to the output file.
+        """
+        if self._doc is None:
+            chunk.save(self.output_path, garbage=1, deflate=True)
+        else:
+            self._doc.insert_pdf(chunk)
+            self._doc.saveIncr()
+            self._doc.close()
+        self._doc = fitz.open(self.output_path)
+        self.page_count = len(self._doc)
+
+    def close(self) -> str:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+            metrics.incr("bytes_written", os.path.getsize(self.output_path))
+        return self.output_path
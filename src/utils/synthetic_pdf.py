@@ -0,0 +1,128 @@
+import random
+from dataclasses import asdict, dataclass
+
+import fitz  # PyMuPDF
+
+WORDS = (
+    "revenue growth margin quarter fiscal year operating income expenses net "
+    "assets liabilities equity cash flow statement company market customers "
+    "contract agreement party obligations terms period payment delivery notice "
+    "services products risk management board directors shareholders report "
+    "results increase decrease compared previous significant strategy investment"
+).split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4
+MARGIN = 56
+COLUMN_GAP = 18
+
+
+@dataclass
+class SyntheticSpec:
+    """
+    Shape of a generated test document.
+
+    Args:
+        pages (int): Page count.
+        blocks_per_page (int): Text blocks in the body of each page.
+        columns (int): Body columns; blocks fill them top to bottom.
+        scanned_ratio (float): Fraction of pages turned into images with no
+            text layer, as a scanner would produce.
+        repeated_header_ratio (float): Fraction of pages carrying the running
+            header and footer.
+        seed (int): Seed of the text and layout choices.
+    """
+
+    pages: int = 20
+    blocks_per_page: int = 12
+    columns: int = 1
+    scanned_ratio: float = 0.0
+    repeated_header_ratio: float = 1.0
+    seed: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 14))
+    return " ".join(words).capitalize() + "."
+
+
+def _draw_page(page: fitz.Page, spec: SyntheticSpec, page_num: int, rng: random.Random):
+    if rng.random() < spec.repeated_header_ratio:
+        page.draw_rect(
+            fitz.Rect(0, 0, PAGE_WIDTH, 44), color=None, fill=(0.88, 0.91, 0.97)
+        )
+        page.insert_text(
+            (MARGIN, 28), "ACME Holdings - Annual Report - Confidential", fontsize=10
+        )
+        page.insert_text(
+            (MARGIN, PAGE_HEIGHT - 24),
+            "This document contains forward-looking statements.",
+            fontsize=7,
+        )
+    # Page numbers differ on every page and are never grouped as repeated
+    page.insert_text((PAGE_WIDTH - MARGIN, PAGE_HEIGHT - 24), str(page_num + 1), fontsize=8)
+
+    top, bottom = 72, PAGE_HEIGHT - 48
+    column_width = (PAGE_WIDTH - 2 * MARGIN - (spec.columns - 1) * COLUMN_GAP) / spec.columns
+    per_column = max(1, -(-spec.blocks_per_page // spec.columns))
+    slot = (bottom - top) / per_column
+    for block in range(spec.blocks_per_page):
+        column, row = divmod(block, per_column)
+        x0 = MARGIN + column * (column_width + COLUMN_GAP)
+        y0 = top + row * slot
+        rect = fitz.Rect(x0, y0, x0 + column_width, y0 + slot - 6)
+        if block % 5 == 4:
+            # Tinted boxes give the redactor non-white backgrounds to match
+            page.draw_rect(rect, color=None, fill=(0.95, 0.93, 0.85))
+        font_size = 12 if row == 0 else rng.choice((9, 10, 11))
+        sentences = [_sentence(rng) for _ in range(rng.randint(1, 3))]
+        # insert_textbox writes nothing when the text does not fit: drop
+        # sentences, then shrink, until it does
+        while page.insert_textbox(
+            rect, " ".join(sentences), fontsize=font_size, color=(0.1, 0.1, 0.1)
+        ) < 0:
+            if len(sentences) > 1:
+                sentences.pop()
+            elif font_size > 5:
+                font_size -= 1
+            else:
+                page.insert_text((rect.x0, rect.y1), sentences[0].split()[0], fontsize=5)
+                break
+
+
+def make_synthetic_pdf(path: str, spec: SyntheticSpec = None, **overrides) -> str:
+    """
+    Write a deterministic synthetic PDF described by `spec` to `path`.
+
+    Keyword arguments override single fields of `spec`. The same spec
+    always produces the same pages, so timings of different runs compare.
+    """
+    spec = SyntheticSpec(**{**(spec or SyntheticSpec()).to_dict(), **overrides})
+    rng = random.Random(spec.seed)
+    doc = fitz.open()
+    for page_num in range(spec.pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        _draw_page(page, spec, page_num, rng)
+        if rng.random() < spec.scanned_ratio:
+            # Replace the page by a 100 dpi picture of itself
+            pixmap = page.get_pixmap(dpi=100)
+            doc.delete_page(page_num)
+            scanned = doc.new_page(page_num, width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            scanned.insert_image(scanned.rect, pixmap=pixmap)
+    # No dates or random file ID, so equal specs give byte-identical files
+    doc.set_metadata({})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return path
+
+
+if __name__ == "__main__":
+    # python -m src.utils.synthetic_pdf out.pdf [pages] [columns]
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "synthetic.pdf"
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    columns = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    print(make_synthetic_pdf(path, pages=pages, columns=columns))
@@ -0,0 +1,98 @@
+import pickle
+
+import pytest
+
+from src.block_table import BlockTable
+from src.text_extraction import BlockImage
+
+
+def make_pdf_info(pages=(0, 1, 2), blocks=3) -> dict:
+    return {
+        page_num: [
+            {
+                "block_num": block_num + 1,
+                "text": f"Block {block_num} of page {page_num} — số liệu",
+                "bbox": (72.0, 60.0 + block_num * 18, 540.0, 74.0 + block_num * 18),
+                "image": BlockImage("doc.pdf", page_num, (72, 60, 540, 74), 300),
+                "font_size": 10.5,
+                "font_color": 0x1F1F1F,
+                "font_family": ["Helvetica", "Times-Roman"][block_num % 2],
+            }
+            for block_num in range(blocks)
+        ]
+        for page_num in pages
+    }
+
+
+def without_images(pdf_info: dict) -> dict:
+    return {
+        page_num: [{k: v for k, v in block.items() if k != "image"} for block in page_info]
+        for page_num, page_info in pdf_info.items()
+    }
+
+
+@pytest.fixture
+def pdf_info():
+    pdf_info = make_pdf_info()
+    pdf_info[1][0]["translated_text"] = "Khối 0"
+    pdf_info[1][1]["repeat_key"] = "header"
+    pdf_info[2][2]["label"] = "table"
+    pdf_info[3] = []
+    return pdf_info
+
+
+def test_pdf_info_round_trip(pdf_info):
+    table = BlockTable.from_pdf_info(pdf_info, "doc.pdf")
+    assert table.to_pdf_info(with_images=False) == without_images(pdf_info)
+
+    block = table.to_pdf_info()[0][0]
+    assert isinstance(block["image"], BlockImage)
+    assert (block["image"].page_num, block["image"].bbox) == (0, block["bbox"])
+
+
+def test_save_and_load(tmp_path, pdf_info):
+    table = BlockTable.from_pdf_info(pdf_info, "doc.pdf", dpi=150)
+    path = str(tmp_path / "blocks.bin")
+    table.save(path)
+
+    loaded = BlockTable.load(path)
+    assert (loaded.pdf_path, loaded.dpi) == ("doc.pdf", 150)
+    assert loaded.to_pdf_info(with_images=False) == without_images(pdf_info)
+
+
+def test_loaded_table_accepts_translations(tmp_path):
+    path = str(tmp_path / "blocks.bin")
+    BlockTable.from_pdf_info(make_pdf_info(), "doc.pdf").save(path)
+
+    view = BlockTable.load(path).view()
+    view[0][0]["translated_text"] = "Đã dịch"
+    assert view[0][0]["translated_text"] == "Đã dịch"
+    assert "translated_text" not in view[0][1]
+
+
+def test_pickle_round_trip(pdf_info):
+    table = BlockTable.from_pdf_info(pdf_info, "doc.pdf")
+    restored = pickle.loads(pickle.dumps(table))
+    assert restored.to_pdf_info(with_images=False) == without_images(pdf_info)
+
+
+def test_select_pages_and_concat():
+    pdf_info = make_pdf_info(pages=range(5))
+    pdf_info[3][1]["repeat_key"] = "footer"
+    pdf_info[4][0]["label"] = "figure"
+    table = BlockTable.from_pdf_info(pdf_info, "doc.pdf")
+
+    shards = [table.select_pages([3, 4]), table.select_pages([0, 1, 2])]
+    assert list(shards[0].to_pdf_info(with_images=False)) == [3, 4]
+
+    joined = BlockTable.concat(shards)
+    assert joined.to_pdf_info(with_images=False) == without_images(pdf_info)
+
+
+def test_view_matches_pdf_info(pdf_info):
+    view = BlockTable.from_pdf_info(pdf_info, "doc.pdf").view()
+    assert list(view) == [0, 1, 2, 3]
+    assert len(view[3]) == 0
+    assert view[1][1]["repeat_key"] == "header"
+    assert view[2][2]["label"] == "table"
+    assert view[0][0].get("translated_text") is None
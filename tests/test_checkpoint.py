@@ -0,0 +1,79 @@
+import fitz  # PyMuPDF
+
+from src.checkpoint import CheckpointStore, page_content_hash
+
+BLOCK = {
+    "block_num": 1,
+    "text": "Revenue",
+    "bbox": [72.0, 72.0, 200.0, 90.0],
+    "font_size": 10.0,
+    "font_color": 0,
+    "font_family": "Helvetica",
+}
+
+
+def test_resume_reuses_unchanged_pages_and_blocks(tmp_path):
+    store = CheckpointStore(str(tmp_path), "job")
+    store.save_page(0, "hash-0", [{**BLOCK, "image": object()}])
+    store.save_translation(0, 1, "Revenue", "Doanh thu")
+    store.close()
+
+    store = CheckpointStore(str(tmp_path), "job")
+    assert store.load_page(0, "hash-0") == [BLOCK]
+    assert store.load_page(0, "changed") is None
+    assert store.load_page(1, "hash-0") is None
+    assert store.get_translation(0, 1, "Revenue") == "Doanh thu"
+    assert store.get_translation(0, 1, "Net revenue") is None
+    store.close()
+
+
+def test_latest_record_wins(tmp_path):
+    store = CheckpointStore(str(tmp_path), "job")
+    store.save_translation(0, 1, "Revenue", "first")
+    store.save_translation(0, 1, "Revenue", "second")
+    store.close()
+
+    store = CheckpointStore(str(tmp_path), "job")
+    assert store.get_translation(0, 1, "Revenue") == "second"
+    store.close()
+
+
+def test_torn_line_is_dropped_and_later_records_are_kept(tmp_path):
+    store = CheckpointStore(str(tmp_path), "job")
+    store.save_translation(0, 1, "Revenue", "Doanh thu")
+    store.close()
+    # A crash in the middle of a write leaves half a line without a newline
+    with open(store.translations_path, "a", encoding="utf-8") as f:
+        f.write('{"page_num": 0, "block_num": 2, "text_')
+
+    store = CheckpointStore(str(tmp_path), "job")
+    assert store.get_translation(0, 1, "Revenue") == "Doanh thu"
+    store.save_translation(0, 2, "Cost", "Chi phí")
+    store.close()
+
+    store = CheckpointStore(str(tmp_path), "job")
+    assert store.get_translation(0, 1, "Revenue") == "Doanh thu"
+    assert store.get_translation(0, 2, "Cost") == "Chi phí"
+    store.close()
+
+
+def test_job_id_depends_on_path_and_languages(tmp_path):
+    def job_dir(pdf_path, target):
+        store = CheckpointStore.for_job(str(tmp_path), pdf_path, "english", target)
+        store.close()
+        return store.job_dir
+
+    assert job_dir("a.pdf", "vietnamese") == job_dir("a.pdf", "vietnamese")
+    assert job_dir("a.pdf", "vietnamese") != job_dir("b.pdf", "vietnamese")
+    assert job_dir("a.pdf", "vietnamese") != job_dir("a.pdf", "french")
+
+
+def test_page_hash_follows_content():
+    def page_hash(text):
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+        return page_content_hash(page)
+
+    assert page_hash("Revenue") == page_hash("Revenue")
+    assert page_hash("Revenue") != page_hash("Expenses")
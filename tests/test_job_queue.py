@@ -0,0 +1,65 @@
+import pytest
+
+from src.job_server import JOB_STATES, FileJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return FileJobQueue(str(tmp_path))
+
+
+def test_submit_assigns_a_pending_id(queue):
+    job = queue.submit({"input": "a.pdf"})
+    assert len(job["id"]) == 12
+    assert job["status"] == "pending"
+    assert queue.get(job["id"]) == job
+    assert queue.counts() == {"pending": 1, "running": 0, "done": 0, "failed": 0}
+
+
+@pytest.mark.parametrize("job_id", ["../../etc/passwd", "ABCDEF012345", "abc", 12])
+def test_invalid_ids_are_rejected(queue, job_id):
+    with pytest.raises(ValueError):
+        queue.submit({"id": job_id, "input": "a.pdf"})
+    assert queue.counts()["pending"] == 0
+
+
+def test_duplicate_ids_are_rejected(queue):
+    job = queue.submit({"input": "a.pdf"})
+    queue.update({**job, "status": "done"})
+    with pytest.raises(ValueError):
+        queue.submit({"id": job["id"], "input": "b.pdf"})
+    assert queue.get(job["id"])["input"] == "a.pdf"
+
+
+def test_claim_takes_the_shortest_job_first(queue):
+    long_job = queue.submit({"input": "long.pdf", "pages": 100})
+    short_job = queue.submit({"input": "short.pdf", "pages": 2})
+
+    assert queue.claim()["id"] == short_job["id"]
+    assert queue.claim()["id"] == long_job["id"]
+    assert queue.claim() is None
+    assert queue.counts()["running"] == 2
+
+
+def test_update_moves_the_job_between_states(queue):
+    queue.submit({"input": "a.pdf"})
+    job = queue.claim()
+    queue.update({**job, "status": "failed", "error": "boom"})
+
+    assert queue.get(job["id"])["status"] == "failed"
+    assert [state for state in JOB_STATES if queue.list(state)] == ["failed"]
+
+
+def test_recover_requeues_running_jobs(queue):
+    queue.submit({"input": "a.pdf"})
+    job = queue.claim()
+
+    assert queue.recover() == 1
+    assert queue.get(job["id"])["status"] == "pending"
+    assert queue.counts()["running"] == 0
+
+
+def test_unknown_status_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.list("../pending")
+    assert queue.get("../pending/x") is None
@@ -0,0 +1,162 @@
+import time
+
+import pytest
+
+from src import rate_limit
+from src.rate_limit import CircuitBreaker, CircuitOpenError, RateLimiter, parse_duration
+
+
+class Response:
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+class APIError(Exception):
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = Response(headers or {})
+
+
+class Flaky:
+    """
+    Raise the given errors in turn, then return "ok".
+    """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limit.time, "sleep", slept.append)
+    return slept
+
+
+def open_breaker(failure_threshold: int = 1) -> CircuitBreaker:
+    """
+    A breaker that has just turned half-open.
+    """
+    breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=30.0)
+    for _ in range(failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_parse_duration():
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration(None) is None
+    assert parse_duration("soon") is None
+
+
+def test_429_waits_for_retry_after_without_tripping_the_breaker(sleeps):
+    limiter = RateLimiter(max_retries=2, breaker=CircuitBreaker(failure_threshold=1))
+    fn = Flaky(APIError(429, {"retry-after": "7"}))
+
+    assert limiter.call(fn) == "ok"
+    assert fn.calls == 2
+    assert max(sleeps) >= 7
+    # Everyone sharing the limiter is paused, not only the caller
+    assert limiter.requests.paused_until > time.monotonic() + 5
+    assert limiter.breaker.state == "closed"
+
+
+def test_rate_limit_headers_adjust_the_buckets():
+    limiter = RateLimiter(requests_per_minute=500)
+    limiter.update_from_headers(
+        {
+            "x-ratelimit-limit-requests": "60",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2s",
+        }
+    )
+    assert limiter.requests.capacity == 60
+    assert limiter.requests.reserve(1) > 1
+
+
+def test_client_errors_are_not_retried(sleeps):
+    limiter = RateLimiter(max_retries=3)
+    fn = Flaky(APIError(400))
+    with pytest.raises(APIError):
+        limiter.call(fn)
+    assert fn.calls == 1
+    assert limiter.breaker.failures == 0
+
+
+def test_server_errors_open_the_circuit(sleeps):
+    limiter = RateLimiter(max_retries=5, breaker=CircuitBreaker(failure_threshold=2))
+    fn = Flaky(*[APIError(503)] * 5)
+    with pytest.raises(CircuitOpenError):
+        limiter.call(fn)
+    assert fn.calls == 2
+    assert limiter.breaker.state == "open"
+
+
+def test_successful_trial_closes_the_circuit(sleeps):
+    limiter = RateLimiter(breaker=open_breaker())
+    assert limiter.call(Flaky()) == "ok"
+    assert limiter.breaker.state == "closed"
+    assert limiter.breaker.failures == 0
+
+
+@pytest.mark.parametrize("status_code", [400, 429])
+def test_failed_trial_reopens_the_circuit(sleeps, status_code):
+    limiter = RateLimiter(max_retries=3, breaker=open_breaker())
+    fn = Flaky(*[APIError(status_code)] * 4)
+    with pytest.raises((APIError, CircuitOpenError)):
+        limiter.call(fn)
+    # Only the trial went through, and the circuit is open rather than stuck half-open
+    assert fn.calls == 1
+    assert limiter.breaker.state == "open"
+    assert not limiter.breaker.trial_running
+
+
+def test_trial_on_the_last_attempt_reopens_the_circuit(sleeps):
+    limiter = RateLimiter(max_retries=0, breaker=open_breaker())
+    with pytest.raises(APIError):
+        limiter.call(Flaky(APIError(503)))
+    assert limiter.breaker.state == "open"
+    assert not limiter.breaker.trial_running
+
+
+def test_interrupted_trial_reopens_the_circuit(sleeps):
+    limiter = RateLimiter(breaker=open_breaker())
+    with pytest.raises(KeyboardInterrupt):
+        limiter.call(Flaky(KeyboardInterrupt()))
+    assert limiter.breaker.state == "open"
+    assert not limiter.breaker.trial_running
+
+
+def test_only_one_trial_at_a_time():
+    breaker = open_breaker()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.before_call() is False
+
+
+def test_cancelled_async_trial_reopens_the_circuit():
+    import asyncio
+
+    limiter = RateLimiter(breaker=open_breaker())
+
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(limiter.call_async(cancelled))
+    assert limiter.breaker.state == "open"
+    assert not limiter.breaker.trial_running
@@ -0,0 +1,66 @@
+import pytest
+
+from src.skip_translation import SkipClassifier, detect_language
+
+
+@pytest.mark.parametrize(
+    "text, reason",
+    [
+        ("", "empty"),
+        ("12,345.67", "number"),
+        ("(1,234)", "number"),
+        ("$ 4.5M", "number"),
+        ("15%", "number"),
+        ("2024-03-31", "date"),
+        ("March 31, 2024", "date"),
+        ("31 Dec 2023", "date"),
+        ("Sept. 2024", "date"),
+        ("https://example.com/report.pdf", "url"),
+        ("ir@example.com", "url"),
+        ("ABC-1234-X", "code"),
+        ("•", "symbol"),
+        ("Báo cáo tài chính hợp nhất cho năm tài chính kết thúc", "target_language"),
+    ],
+)
+def test_skipped(text, reason):
+    assert SkipClassifier().classify(text) == reason
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Consolidated statements of cash flows for the year",
+        "Total",
+        # Words starting with a month abbreviation
+        "Marketing",
+        "Market",
+        "Decisions",
+        "Junior",
+        "Novel",
+        "Mayor",
+        "Separately",
+        "Augmented",
+        "Octopus",
+        "Decline 12",
+    ],
+)
+def test_translated(text):
+    assert SkipClassifier().classify(text) is None
+
+
+def test_target_language_detection_can_be_disabled():
+    text = "Báo cáo tài chính hợp nhất cho năm tài chính kết thúc"
+    assert SkipClassifier(detect_target_language=False).classify(text) is None
+    assert SkipClassifier().classify(text, target_language="english") is None
+
+
+def test_detect_language():
+    assert detect_language("The results of the year and the outlook for next year") == "english"
+    assert detect_language("Short") is None
+
+
+def test_counts():
+    classifier = SkipClassifier()
+    for text in ["12", "13", "Total"]:
+        classifier.classify(text)
+    assert classifier.counts == {"number": 2, "translate": 1}